@@ -0,0 +1,281 @@
+import base64
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+
+from fasthtml.common import Link, Script
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped, gzip is always written
+    brotli = None
+
+# Self-hosted page assets: CodeMirror is vendored into static/vendor, bundled with
+# our own script and stylesheet into content-hashed files under static/dist, and
+# served from /assets/ with long-lived immutable caching.  Without a build the
+# page falls back to the CDN and the unbundled files in static/.
+
+CODEMIRROR_CDN = 'https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2'
+CODEMIRROR_FILES = ['codemirror.min.js', 'addon/mode/simple.min.js', 'mode/python/python.min.js', 'codemirror.min.css']
+VENDOR_DIR = 'static/vendor/codemirror'
+# subresource-integrity hashes of the CodeMirror files, as cdnjs lists them for the release
+VENDOR_HASHES = 'static/vendor-hashes.json'
+DIST_DIR = 'static/dist'
+URL_PREFIX = '/assets/'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+BUNDLES = {
+    'app.js': [f'{VENDOR_DIR}/codemirror.min.js', f'{VENDOR_DIR}/addon/mode/simple.min.js',
+               f'{VENDOR_DIR}/mode/python/python.min.js', 'static/script.js'],
+    'app.css': [f'{VENDOR_DIR}/codemirror.min.css', 'static/styles.css'],
+}
+
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def integrity(data: bytes) -> str:
+    return 'sha512-' + base64.b64encode(hashlib.sha512(data).digest()).decode()
+
+
+def vendor(dest: str = VENDOR_DIR, base_url: str = CODEMIRROR_CDN, hashes_path: str = VENDOR_HASHES,
+           pin: bool = False) -> list:
+    """Download the CodeMirror files that are not vendored yet, returns the paths written.
+
+    Downloaded and already vendored files alike must match their hash in
+    `hashes_path`, otherwise ValueError is raised and nothing more is written.
+    With `pin`, files without a hash are accepted and their hashes recorded.
+    """
+    try:
+        with open(hashes_path) as f:
+            hashes = json.load(f)
+    except FileNotFoundError:
+        hashes = {}
+    written = []
+    for name in CODEMIRROR_FILES:
+        path = os.path.join(dest, name)
+        exists = os.path.exists(path)
+        if exists:
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            with urllib.request.urlopen(f"{base_url}/{name}", timeout=30) as response:
+                data = response.read()
+        if name not in hashes and pin:
+            hashes[name] = integrity(data)
+        elif name not in hashes:
+            raise ValueError(f"{name} has no hash in {hashes_path}, record it with build_assets.py --pin")
+        elif integrity(data) != hashes[name]:
+            raise ValueError(f"{path if exists else f'{base_url}/{name}'} does not match its hash in {hashes_path}")
+        if not exists:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            written.append(path)
+    if pin:
+        with open(hashes_path, 'w') as f:
+            json.dump(hashes, f, indent=2)
+            f.write('\n')
+    return written
+
+
+# strings and comments, the parts of a stylesheet whitespace rules do not apply to
+CSS_TOKENS = re.compile(r'("(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|/\*.*?\*/)', re.S)
+
+# a `/` after one of these (or a keyword like `return`) starts a regular expression, elsewhere it divides
+REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORD = re.compile(r'\b(?:return|typeof|case|in|of|void|delete)\s*$')
+
+
+def minify_css(text: str) -> str:
+    def collapse(css):
+        css = re.sub(r'\s+', ' ', css)
+        return re.sub(r'\s*([{};,>])\s*', r'\1', css).replace(';}', '}')
+
+    parts, code = [], ''
+    for i, token in enumerate(CSS_TOKENS.split(text)):
+        if i % 2 == 0:
+            code += token
+        elif not token.startswith('/*'):
+            # a quoted string is kept exactly as written
+            parts += [collapse(code), token]
+            code = ''
+    return ''.join(parts + [collapse(code)]).strip()
+
+
+def js_continued_lines(text: str) -> set:
+    """Numbers of the lines of `text` that begin inside a string or template literal.
+
+    A small scanner over JavaScript: it follows comments, quoted strings,
+    template literals with their nested `${}` expressions and regular
+    expression literals, which is all it takes to know where literals are.
+    """
+    continued = set()
+    line, i, n = 0, 0, len(text)
+    quote = None   # the open literal's quote character, None in code
+    templates = []  # brace depth of the code around each `${` expression we are in
+    depth = 0
+    previous = ''  # last non-blank code character
+    while i < n:
+        c = text[i]
+        if c == '\n':
+            line += 1
+            if quote == '`':
+                continued.add(line)
+            elif quote:
+                quote = None  # unterminated, a quoted string cannot span lines
+        elif quote:
+            if c == '\\':
+                i += 1
+                if text[i:i + 1] == '\n':
+                    line += 1
+                    continued.add(line)
+            elif c == quote:
+                quote, previous = None, c
+            elif quote == '`' and text.startswith('${', i):
+                templates.append(depth)
+                quote, previous = None, '{'
+                i += 1
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = (n if end == -1 else end) - 1
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            line += text.count('\n', i, end)
+            i = end - 1
+        elif c == '/' and (previous in REGEX_AFTER or previous == '' or REGEX_KEYWORD.search(text, 0, i)):
+            in_class = False
+            i += 1
+            while i < n and text[i] != '\n' and (text[i] != '/' or in_class):
+                if text[i] == '\\':
+                    i += 1
+                elif text[i] in '[]':
+                    in_class = text[i] == '['
+                i += 1
+            previous = '/'
+        elif c in '\'"`':
+            quote = c
+        elif c == '}' and templates and depth == templates[-1]:
+            templates.pop()
+            quote = '`'
+        else:
+            depth += (c == '{') - (c == '}')
+            if not c.isspace():
+                previous = c
+        i += 1
+    return continued
+
+
+def minify_js(text: str) -> str:
+    # conservative: drops indentation, blank lines and whole-line comments only, and leaves
+    # lines that continue a string or template literal exactly as written
+    continued = js_continued_lines(text)
+    lines = []
+    for number, line in enumerate(text.split('\n')):
+        if number in continued:
+            lines.append(line)
+            continue
+        line = line.lstrip() if number + 1 in continued else line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def bundle(paths: list) -> bytes:
+    parts = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        if '.min.' not in path:
+            text = minify_css(text) if path.endswith('.css') else minify_js(text)
+        parts.append(text)
+    separator = '\n' if paths[0].endswith('.css') else ';\n'
+    return separator.join(parts).encode('utf-8')
+
+
+def write_asset(dist: str, name: str, content: bytes) -> str:
+    """Write `content` as name.<hash>.ext plus its compressed variants, returns the hashed name."""
+    stem, ext = os.path.splitext(name)
+    hashed = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+    path = os.path.join(dist, hashed)
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+    return hashed
+
+
+def build(dist: str = DIST_DIR, bundles: dict = BUNDLES) -> dict:
+    """Build every bundle into `dist` and write manifest.json, {logical name: hashed name}."""
+    os.makedirs(dist, exist_ok=True)
+    manifest = {name: write_asset(dist, name, bundle(paths)) for name, paths in bundles.items()}
+    with open(os.path.join(dist, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(dist: str = DIST_DIR) -> dict:
+    try:
+        with open(os.path.join(dist, 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_headers(manifest: dict) -> list:
+    """Page headers for CodeMirror and our script and styles, bundled when built."""
+    if 'app.js' in manifest and 'app.css' in manifest:
+        return [
+            Link(rel="stylesheet", href=URL_PREFIX + manifest['app.css']),
+            Script(src=URL_PREFIX + manifest['app.js'], defer=True),
+        ]
+    return [
+        Link(rel="stylesheet", href="/static/styles.css"),
+        Link(rel="stylesheet", href=f"{CODEMIRROR_CDN}/codemirror.min.css"),
+        Script(src=f"{CODEMIRROR_CDN}/codemirror.min.js"),
+        Script(src=f"{CODEMIRROR_CDN}/addon/mode/simple.min.js"),
+        Script(src=f"{CODEMIRROR_CDN}/mode/python/python.min.js"),
+        Script(src="/static/script.js", defer=True),
+    ]
+
+
+def negotiate(path: str, accept_encoding: str) -> tuple:
+    """(file to send, content encoding or None) for the best precompressed variant the client accepts."""
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+class AssetMiddleware:
+    """Serves built assets under /assets/ with immutable caching, before routing."""
+
+    def __init__(self, app, dist: str = DIST_DIR):
+        self.app = app
+        self.dist = dist
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(URL_PREFIX):
+            return await self.app(scope, receive, send)
+
+        name = scope['path'][len(URL_PREFIX):]
+        path = os.path.join(self.dist, name)
+        if '/' in name or name.startswith('.') or not os.path.isfile(path):
+            return await Response(status_code=404)(scope, receive, send)
+
+        headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+        filename, encoding = negotiate(path, headers.get('accept-encoding', ''))
+        response_headers = {'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if encoding:
+            response_headers['Content-Encoding'] = encoding
+        media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        await FileResponse(filename, headers=response_headers, media_type=media_type)(scope, receive, send)
@@ -0,0 +1,19 @@
+import subprocess
+import types
+
+
+def load_baseline(path: str, rev: str = None):
+    """Module `path` as of git revision `rev` (default: the first commit), returns (rev, module).
+
+    The module is executed outside sys.modules, inside its package of today,
+    so its relative imports resolve to the current tree.
+    """
+    if rev is None:
+        rev = subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'], capture_output=True, text=True,
+                             check=True).stdout.split()[0]
+    source = subprocess.run(['git', 'show', f"{rev}:{path}"], capture_output=True, text=True, check=True).stdout
+    package, _, name = path[:-len('.py')].replace('/', '.').rpartition('.')
+    module = types.ModuleType(f"baseline_{name}")
+    module.__package__ = package
+    exec(compile(source, f"{rev}:{path}", 'exec'), module.__dict__)
+    return rev, module
@@ -0,0 +1,62 @@
+"""CodeSnippetAnalyzer.analyze_code against the previous visitor-based implementation.
+
+Run from the repository root of a git checkout:
+
+    python -m benchmarks.bench_analyze_code
+    python -m benchmarks.bench_analyze_code --lines 1000 10000 -n 20 --baseline 3313ae1
+
+The legacy implementation is the analyze_code of --baseline (default: the
+first commit), loaded from git.  Both implementations run on synthetic
+node/tool snippets (benchmarks/synthetic.py) of roughly the requested number
+of lines. "parse" is ast.parse alone, the floor for any AST-based analysis;
+"walk" is the time spent after parsing.
+"""
+import argparse
+import ast
+import time
+
+from benchmarks.baseline import load_baseline
+from benchmarks.synthetic import make_code
+from code_utils.code_snippet_analyzer import CodeSnippetAnalyzer, collect_symbols
+
+ANALYZER_PATH = 'code_utils/code_snippet_analyzer.py'
+LINES_PER_FUNCTION = 10
+
+
+def bench(fn, iterations):
+    fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('-n', '--iterations', type=int, default=20)
+    parser.add_argument('--baseline', help="git revision of the legacy analyzer (default: the first commit)")
+    args = parser.parse_args()
+
+    rev, baseline = load_baseline(ANALYZER_PATH, args.baseline)
+    legacy_analyzer = baseline.CodeSnippetAnalyzer()
+    analyzer = CodeSnippetAnalyzer()
+    print(f"legacy analyzer from {rev}")
+    print(f"{'lines':>7} {'parse ms':>9} {'legacy ms':>10} {'new ms':>8} {'speedup':>8} "
+          f"{'legacy walk':>12} {'new walk':>9} {'walk speedup':>13}")
+    for lines in args.lines:
+        code = make_code(max(1, lines // LINES_PER_FUNCTION))
+        tree = ast.parse(code)
+        parse = bench(lambda: ast.parse(code), args.iterations)
+        legacy = bench(lambda: legacy_analyzer.analyze_code(code), args.iterations)
+        new = bench(lambda: analyzer.analyze_code(code), args.iterations)
+        walk = bench(lambda: collect_symbols(tree), args.iterations)
+        legacy_walk = legacy - parse
+        print(f"{code.count(chr(10)) + 1:>7} {parse:>9.2f} {legacy:>10.2f} {new:>8.2f} {legacy / new:>7.1f}x "
+              f"{legacy_walk:>12.2f} {walk:>9.2f} {legacy_walk / walk:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
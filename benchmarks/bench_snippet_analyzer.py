@@ -0,0 +1,99 @@
+"""Per-request analysis cost of CodeSnippetAnalyzer on the data/gen_graph.db catalog.
+
+Run from the repository root of a git checkout:
+
+    python -m benchmarks.bench_snippet_analyzer
+    python -m benchmarks.bench_snippet_analyzer --baseline 3313ae1 -n 500
+
+Every request is one keystroke: the generated graph code changes, the stored
+snippets do not.  Three ways of analyzing it are timed:
+
+  baseline   the CodeSnippetAnalyzer of --baseline (default: the first commit),
+             loaded from git, with a new analyzer per request as
+             analyze_architecture_code did there
+  fresh      today's analyzer, still new per request: every snippet is looked
+             up in the shared analysis cache and all_defined is rebuilt
+  reused     one analyzer per editor, as /get_code keeps it: only the graph
+             snippet is analyzed again
+
+Code generation is done ahead of time, only the analysis is timed.
+"""
+import argparse
+import time
+
+from fastlite import database
+from langgraph_codegen import gen_graph
+
+from benchmarks.baseline import load_baseline
+from benchmarks.db_copy import temporary_copy
+from code_utils.code_snippet_analyzer import CodeSnippetAnalyzer, analysis_cache
+from code_utils.pipeline import mk_name
+
+FIELDS = ['state', 'nodes', 'conditions', 'tools', 'data', 'llms']
+ANALYZER_PATH = 'code_utils/code_snippet_analyzer.py'
+
+
+def load_snippets(db_path):
+    # opening the database with fastlite writes to it, so read a copy
+    with temporary_copy(db_path, prefix='bench_snippet_analyzer') as db_copy:
+        db = database(db_copy)
+        archs = list(db.t.arch())
+        db.conn.close()
+    catalog = []
+    for arch in archs:
+        snippets = {f: arch[f].strip() for f in FIELDS if arch.get(f) and arch[f].strip()}
+        snippets['graph'] = gen_graph(mk_name(arch['name']), arch['graph_spec']).strip()
+        catalog.append((arch['name'], snippets))
+    return catalog
+
+
+def keystrokes(snippets, iterations):
+    # the snippets of each request, a new graph snippet every time
+    return [{**snippets, 'graph': f"{snippets['graph']}\n# keystroke {i}"} for i in range(iterations)]
+
+
+def analyze(analyzer, snippets):
+    for name, code in snippets.items():
+        analyzer.add_snippet(name, code)
+    analyzer.analyze_all_snippets()
+    return analyzer.get_all_summaries()
+
+
+def bench(requests, new_analyzer, snippets):
+    # only the stored snippets start out in the shared cache, every keystroke's graph code is new
+    analysis_cache.clear()
+    analyze(CodeSnippetAnalyzer(), snippets)
+    start = time.perf_counter()
+    for request in requests:
+        analyze(new_analyzer(), request)
+    return (time.perf_counter() - start) / len(requests) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='data/gen_graph.db')
+    parser.add_argument('--baseline', help="git revision of the baseline analyzer (default: the first commit)")
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rev, baseline = load_baseline(ANALYZER_PATH, args.baseline)
+    BaselineAnalyzer = baseline.CodeSnippetAnalyzer
+    catalog = load_snippets(args.db)
+    print(f"baseline analyzer from {rev}")
+    print(f"{'architecture':<35} {'snippets':>8} {'baseline ms':>11} {'fresh ms':>9} {'reused ms':>9} {'speedup':>8}")
+    totals = [0.0, 0.0, 0.0]
+    for name, snippets in catalog:
+        requests = keystrokes(snippets, args.iterations)
+        editor = CodeSnippetAnalyzer()
+        times = [bench(requests, BaselineAnalyzer, snippets),
+                 bench(requests, CodeSnippetAnalyzer, snippets),
+                 bench(requests, lambda: editor, snippets)]
+        totals = [total + t for total, t in zip(totals, times)]
+        print(f"{name:<35} {len(snippets):>8} {times[0]:>11.3f} {times[1]:>9.3f} {times[2]:>9.3f} "
+              f"{times[0] / times[2]:>7.1f}x")
+    means = [total / len(catalog) for total in totals]
+    print(f"{'mean':<35} {'':>8} {means[0]:>11.3f} {means[1]:>9.3f} {means[2]:>9.3f} {means[0] / means[2]:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Latency and memory benchmarks for the code generation + analysis request path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_suite                          # all sizes, print a table
+    python -m benchmarks.bench_suite --sizes 10 100 --save benchmarks/baseline.json
+    python -m benchmarks.bench_suite --compare benchmarks/baseline.json
+
+Each benchmark runs on synthetic DSL specs (see benchmarks/synthetic.py). Every
+iteration uses a different state class name, so the in-process caches never
+hide the generation and analysis cost. With --compare, the exit status is 1 if
+any p50 regressed by more than --threshold. The get_code benchmark runs the app
+on a temporary copy of --db, so the drafts it writes are thrown away with it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from importlib.metadata import version
+
+from benchmarks.db_copy import temporary_copy
+from benchmarks.synthetic import make_code, make_dsl
+from code_utils import pipeline
+from code_utils.code_snippet_analyzer import CodeSnippetAnalyzer
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list, peak_bytes: int) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        'iterations': len(ms),
+        'mean_ms': sum(ms) / len(ms),
+        'p50_ms': percentile(ms, 50),
+        'p95_ms': percentile(ms, 95),
+        'p99_ms': percentile(ms, 99),
+        'peak_kb': peak_bytes / 1024,
+    }
+
+
+def synthetic_arch(n_nodes: int) -> dict:
+    return {'id': 0, 'name': f'Synthetic {n_nodes}', 'category': 'Benchmarks', 'readme': '',
+            'graph_spec': make_dsl(n_nodes), 'state': '', 'nodes': make_code(max(1, n_nodes // 10)),
+            'conditions': '', 'tools': '', 'data': '', 'llms': ''}
+
+
+def run_sync(fn, iterations: int) -> dict:
+    # timing pass first, then one traced pass for the allocation peak
+    fn(-1)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(samples, peak)
+
+
+async def run_async(fn, iterations: int) -> dict:
+    await fn(-1)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    await fn(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(samples, peak)
+
+
+def bench_parse_graph_spec(n_nodes: int, iterations: int) -> dict:
+    from gen_graph_x import parse_graph_spec
+    dsls = {i: make_dsl(n_nodes, state=f'State{i}') for i in range(-1, iterations + 1)}
+    return run_sync(lambda i: parse_graph_spec(dsls[i]), iterations)
+
+
+def bench_check_graph(n_nodes: int, iterations: int) -> dict:
+    from gen_graph_x import parse_lines
+    from validation import check_ops
+    ops = {i: parse_lines(make_dsl(n_nodes, state=f'State{i}').splitlines()) for i in range(-1, iterations + 1)}
+    return run_sync(lambda i: check_ops(ops[i]), iterations)
+
+
+def bench_check_keystroke(n_nodes: int, iterations: int) -> dict:
+    from incremental import IncrementalSpec
+    dsl = make_dsl(n_nodes)
+    line = "typed_node => node_0, END"
+    editor = IncrementalSpec()
+    editor.check(dsl)
+    # one more character of a new last line per iteration, as an editor checks it on every keystroke
+    return run_sync(lambda i: editor.check(f"{dsl}\n\n{line[:i % len(line) + 1]}"), iterations)
+
+
+def bench_generate_code(n_nodes: int, iterations: int) -> dict:
+    arch = synthetic_arch(n_nodes)
+    return run_sync(lambda i: pipeline.generate_code(arch, 'GRAPH', False, make_dsl(n_nodes, state=f'State{i}')),
+                    iterations)
+
+
+def bench_analyze_architecture_code(n_nodes: int, iterations: int) -> dict:
+    arch = synthetic_arch(n_nodes)
+    dsls = {i: make_dsl(n_nodes, state=f'State{i}') for i in range(-1, iterations + 1)}
+    # code generation is cached ahead of time so only the analysis is timed
+    for dsl in dsls.values():
+        pipeline.generate_code(arch, 'GRAPH', False, dsl)
+    return run_sync(lambda i: pipeline.analyze_architecture_code(arch, dsls[i]), iterations)
+
+
+def bench_analyze_code(n_nodes: int, iterations: int) -> dict:
+    analyzer = CodeSnippetAnalyzer()
+    code = make_code(max(1, n_nodes // 10))
+    return run_sync(lambda i: analyzer.analyze_code(code), iterations)
+
+
+def bench_get_code(n_nodes: int, iterations: int) -> dict:
+    import httpx
+    import main
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            arch_id = main.catalog.first_id
+
+            async def request(i):
+                response = await client.post('/get_code/GRAPH', data={
+                    'dsl': make_dsl(n_nodes, state=f'State{i}'), 'architecture_id': str(arch_id)})
+                response.raise_for_status()
+
+            return await run_async(request, iterations)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        main.drafts.stop()
+
+
+BENCHMARKS = {
+    'parse_graph_spec': bench_parse_graph_spec,
+    'check_graph': bench_check_graph,
+    'check_keystroke': bench_check_keystroke,
+    'generate_code': bench_generate_code,
+    'analyze_architecture_code': bench_analyze_architecture_code,
+    'analyze_code': bench_analyze_code,
+    'get_code': bench_get_code,
+}
+
+
+def default_iterations(n_nodes: int) -> int:
+    return min(50, max(3, 2000 // n_nodes))
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, sizes in results.items():
+        for size, stats in sizes.items():
+            base = baseline.get('results', {}).get(name, {}).get(size)
+            if base is None:
+                continue
+            ratio = stats['p50_ms'] / base['p50_ms'] if base['p50_ms'] else 1.0
+            stats['baseline_p50_ms'] = base['p50_ms']
+            stats['ratio'] = ratio
+            if ratio > threshold:
+                regressions.append(f"{name}[{size}] p50 {base['p50_ms']:.3f}ms -> {stats['p50_ms']:.3f}ms ({ratio:.2f}x)")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'benchmark':<28} {'nodes':>6} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} "
+          f"{'peak KiB':>10} {'vs base':>8}")
+    for name, sizes in results.items():
+        for size, s in sizes.items():
+            ratio = f"{s['ratio']:.2f}x" if 'ratio' in s else ''
+            print(f"{name:<28} {size:>6} {s['iterations']:>4} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} "
+                  f"{s['p99_ms']:>10.3f} {s['peak_kb']:>10.1f} {ratio:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="node counts")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('-n', '--iterations', type=int, help="iterations per size (default scales with size)")
+    parser.add_argument('--save', help="write results as a JSON baseline")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="p50 ratio that counts as a regression")
+    parser.add_argument('--db', default='data/gen_graph.db', help="database the app's copy is made from")
+    args = parser.parse_args()
+
+    results = {}
+    with temporary_copy(args.db, prefix='bench_suite') as db_copy:
+        os.environ['GEN_GRAPH_DB'] = db_copy
+        for name in args.only or BENCHMARKS:
+            results[name] = {}
+            for size in args.sizes:
+                iterations = args.iterations or default_iterations(size)
+                results[name][str(size)] = BENCHMARKS[name](size, iterations)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'langgraph_codegen': version('langgraph-codegen'),
+                },
+                'results': results,
+            }, f, indent=2)
+
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import contextlib
+import os
+import sqlite3
+import tempfile
+
+
+@contextlib.contextmanager
+def temporary_copy(db_path: str = 'data/gen_graph.db', prefix: str = 'gen_graph'):
+    """A copy of `db_path` in a temporary directory, removed on exit.
+
+    Benchmarks and tests run on the copy, so the drafts, artifacts and sqlite_stat
+    tables they write never reach the tracked database.
+    """
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+        copy = os.path.join(tmp, os.path.basename(db_path))
+        # the backup API also copies what is still in the source's write-ahead log
+        with contextlib.closing(sqlite3.connect(db_path)) as source, \
+                contextlib.closing(sqlite3.connect(copy)) as target:
+            source.backup(target)
+        yield copy
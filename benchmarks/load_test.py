@@ -0,0 +1,207 @@
+"""Concurrent editing sessions against the app in-process, to find where one worker saturates.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --duration 20 --workers 8 --queue 32
+    python -m benchmarks.load_test --think 0 --save load.json
+
+Every simulated session has its own cookie jar and loops through what an
+editor does: pick an architecture with /architecture/{id}, type a new line
+into its DSL one keystroke at a time (a /get_code/GRAPH refresh per
+keystroke, with --think ms of mean pause between them), then click through
+the other tabs.  Requests go through the ASGI interface, so the numbers
+include routing, sessions, the work pool and rendering but no network.
+
+For each concurrency level the sessions run for --duration seconds.  A 503
+from the full work pool counts as rejected, a 204 for a refresh overtaken by
+a newer one as superseded; everything else over 400 is an error.  The level
+where throughput stops growing by --gain, or rejections and errors pass
+--max-errors, is reported as the saturation point.
+
+The app runs on a temporary copy of --db, so the drafts and artifacts the
+sessions write are thrown away with it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.bench_suite import percentile
+from benchmarks.db_copy import temporary_copy
+
+TABS = ['STATE', 'NODES', 'CONDITIONS', 'GRAPH', 'README']
+OUTCOMES = ['ok', 'superseded', 'rejected', 'error']
+
+
+def typed_line(rng: random.Random) -> str:
+    # a new node and its edge to the end, the kind of line people add while editing
+    return f"\n\nreview_{rng.randrange(1000)} => END\n"
+
+
+def outcome(status: int) -> str:
+    if status == 204:
+        return 'superseded'
+    if status == 503:
+        return 'rejected'
+    return 'error' if status >= 400 else 'ok'
+
+
+async def session(app, arch_ids: list, graph_specs: dict, args, deadline: float, seed: int, samples: list):
+    import httpx
+
+    rng = random.Random(seed)
+    page = f"load-{seed}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=60) as client:
+
+        async def request(kind, method, url, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                result = outcome(response.status_code)
+            except Exception:
+                result = 'error'
+            samples.append((kind, time.perf_counter() - start, result))
+
+        async def pause():
+            if args.think:
+                await asyncio.sleep(min(rng.expovariate(1000 / args.think), 10 * args.think / 1000))
+
+        seq = 0
+        while time.perf_counter() < deadline:
+            arch_id = rng.choice(arch_ids)
+            await request('switch', 'GET', f"/architecture/{arch_id}", headers={'HX-Request': 'true'})
+            dsl = graph_specs[arch_id]
+            for char in typed_line(rng)[:args.keystrokes]:
+                if time.perf_counter() >= deadline:
+                    return
+                await pause()
+                dsl += char
+                seq += 1
+                await request('type', 'POST', '/get_code/GRAPH', headers={'HX-Request': 'true'}, data={
+                    'dsl': dsl, 'architecture_id': str(arch_id), 'seq': str(seq), 'page': page})
+            for tab in TABS:
+                if time.perf_counter() >= deadline:
+                    return
+                await pause()
+                seq += 1
+                await request('tab', 'POST', f"/get_code/{tab}", headers={'HX-Request': 'true'}, data={
+                    'dsl': dsl, 'architecture_id': str(arch_id), 'seq': str(seq), 'page': page})
+
+
+def summarize(sessions: int, samples: list, elapsed: float) -> dict:
+    counts = {name: 0 for name in OUTCOMES}
+    for _, _, result in samples:
+        counts[result] += 1
+    ms = [latency * 1000 for _, latency, result in samples if result in ('ok', 'superseded')] or [0.0]
+    total = len(samples) or 1
+    return {
+        'sessions': sessions,
+        'requests': len(samples),
+        'throughput': counts['ok'] / elapsed,
+        'p50_ms': percentile(ms, 50),
+        'p95_ms': percentile(ms, 95),
+        'p99_ms': percentile(ms, 99),
+        'max_ms': max(ms),
+        'superseded_pct': 100 * counts['superseded'] / total,
+        'rejected_pct': 100 * counts['rejected'] / total,
+        'error_pct': 100 * counts['error'] / total,
+        'by_kind': {kind: percentile([l * 1000 for k, l, r in samples if k == kind and r == 'ok'] or [0.0], 50)
+                    for kind in ('switch', 'type', 'tab')},
+    }
+
+
+def saturation(levels: list, gain: float, max_errors: float):
+    """The first level that adds less than `gain` throughput or fails too often, None if there is none."""
+    for previous, level in zip([None] + levels, levels):
+        if level['rejected_pct'] + level['error_pct'] > max_errors:
+            return level
+        if previous is not None and level['throughput'] < previous['throughput'] * (1 + gain):
+            return level
+    return None
+
+
+async def run_level(app, arch_ids: list, graph_specs: dict, args, sessions: int) -> dict:
+    samples = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[session(app, arch_ids, graph_specs, args, deadline, seed=sessions * 10_000 + i,
+                                   samples=samples) for i in range(sessions)])
+    return summarize(sessions, samples, time.perf_counter() - start)
+
+
+def print_table(levels: list):
+    print(f"{'sessions':>8} {'requests':>8} {'ok req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'type p50':>9} {'superseded':>10} {'rejected':>9} {'errors':>7}")
+    for s in levels:
+        print(f"{s['sessions']:>8} {s['requests']:>8} {s['throughput']:>9.1f} {s['p50_ms']:>9.1f} "
+              f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['by_kind']['type']:>9.1f} "
+              f"{s['superseded_pct']:>9.1f}% {s['rejected_pct']:>8.1f}% {s['error_pct']:>6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help="sessions per level")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per level")
+    parser.add_argument('--think', type=float, default=120.0, help="mean ms between keystrokes and clicks, 0 for none")
+    parser.add_argument('--keystrokes', type=int, default=20, help="keystrokes typed per architecture")
+    parser.add_argument('--workers', type=int, help="work pool threads (default: the app's)")
+    parser.add_argument('--queue', type=int, help="work pool queue length (default: the app's)")
+    parser.add_argument('--timeout', type=float, help="work pool time budget in seconds (default: the app's)")
+    parser.add_argument('--cpu-budget', type=float, help="work pool CPU seconds per task (default: the app's)")
+    parser.add_argument('--gain', type=float, default=0.1, help="throughput growth below which a level saturates")
+    parser.add_argument('--max-errors', type=float, default=1.0, help="rejected plus error percent that saturates")
+    parser.add_argument('--db', default='data/gen_graph.db', help="database the app's copy is made from")
+    parser.add_argument('--save', help="write the results as JSON")
+    args = parser.parse_args()
+
+    with temporary_copy(args.db, prefix='load_test') as db_copy:
+        os.environ['GEN_GRAPH_DB'] = db_copy
+        run(args)
+
+
+def run(args):
+    import main as web
+    import workpool
+
+    pool = web.work_pool
+    web.work_pool = workpool.WorkPool(max_workers=args.workers or pool.max_workers,
+                                      max_queue=pool.max_queue if args.queue is None else args.queue,
+                                      timeout=args.timeout or pool.timeout,
+                                      cpu_budget=args.cpu_budget or pool.cpu_budget)
+    pool.shutdown()
+    config = {'workers': web.work_pool.max_workers, 'queue': web.work_pool.max_queue,
+              'timeout': web.work_pool.timeout, 'cpu_budget': web.work_pool.cpu_budget, 'think_ms': args.think, 'duration': args.duration}
+    print(f"work pool: {config['workers']} workers, queue {config['queue']}, timeout {config['timeout']:g}s; "
+          f"think {args.think:g} ms, {args.duration:g}s per level")
+
+    arch_ids = list(web.catalog.architectures)
+    graph_specs = {arch_id: arch['graph_spec'] for arch_id, arch in web.catalog.architectures.items()}
+    levels = []
+    try:
+        for sessions in args.concurrency:
+            levels.append(asyncio.run(run_level(web.app, arch_ids, graph_specs, args, sessions)))
+    finally:
+        web.work_pool.shutdown()
+        web.drafts.stop()
+        web.catalog.stop()
+
+    print_table(levels)
+    saturated = saturation(levels, args.gain, args.max_errors)
+    if saturated is None:
+        print(f"\nnot saturated up to {levels[-1]['sessions']} sessions")
+    else:
+        print(f"\nsaturates at {saturated['sessions']} sessions: {saturated['throughput']:.1f} ok req/s, "
+              f"p95 {saturated['p95_ms']:.1f} ms, {saturated['rejected_pct'] + saturated['error_pct']:.1f}% failed")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'config': config, 'levels': levels,
+                       'saturation': saturated and saturated['sessions']}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import random
+
+
+def make_dsl(n_nodes: int, seed: int = 0, state: str = 'State') -> str:
+    """A DSL spec with `n_nodes` nodes mixing plain edges, conditional blocks and fan-out/fan-in lines."""
+    rng = random.Random(seed)
+    blocks = [f"# synthetic graph, {n_nodes} nodes", f"START({state}) => node_0"]
+    i = 0
+    while i < n_nodes - 1:
+        kind = rng.random()
+        if kind < 0.3 and i + 2 < n_nodes:
+            # conditional block, jumping forward, back, or ending the graph
+            back = rng.randrange(0, i + 1)
+            blocks.append(f"node_{i}\n"
+                          f"  is_ready_{i} => node_{i + 1}\n"
+                          f"  needs_retry_{i} => node_{back}\n"
+                          f"  => node_{i + 2}")
+            i += 1
+        elif kind < 0.45 and i + 3 < n_nodes:
+            blocks.append(f"node_{i} => node_{i + 1}, node_{i + 2}")
+            blocks.append(f"node_{i + 1}, node_{i + 2} => node_{i + 3}")
+            i += 3
+        else:
+            blocks.append(f"node_{i} => node_{i + 1}")
+            i += 1
+    blocks.append(f"node_{n_nodes - 1} => END")
+    return "\n\n".join(blocks) + "\n"
+
+
+def make_code(n_functions: int, seed: int = 0) -> str:
+    """Python source shaped like the stored node/tool snippets, `n_functions` functions long."""
+    rng = random.Random(seed)
+    parts = ["from typing import TypedDict", "", "class State(TypedDict):", "    messages: list", ""]
+    for i in range(n_functions):
+        callee = f"node_{rng.randrange(0, n_functions)}"
+        parts += [
+            f"async def node_{i}(state: State, config=None):",
+            f"    items = [m for m in state['messages'] if m]",
+            f"    total = sum(len(x) for x in items)",
+            f"    try:",
+            f"        result = await {callee}(state)",
+            f"    except ValueError as e:",
+            f"        result = {{'error': str(e), 'count': total}}",
+            f"    key = lambda v: v.get('score', 0)",
+            f"    return {{'messages': sorted(items, key=key), 'result': result}}",
+            "",
+        ]
+    return "\n".join(parts)
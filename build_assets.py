@@ -0,0 +1,36 @@
+"""Vendor CodeMirror and build the hashed, precompressed page bundles.
+
+    python build_assets.py [--dist static/dist] [--no-vendor] [--pin]
+
+Writes static/dist/app.<hash>.js and app.<hash>.css with .gz (and .br when the
+brotli package is installed) variants plus manifest.json, which the web app
+reads at startup.  Without a manifest the app loads CodeMirror from the CDN.
+
+Vendored files are checked against static/vendor-hashes.json.  --pin records
+the hashes of files that have none yet; compare them with the ones cdnjs lists
+for the release before committing the file.
+"""
+import argparse
+import time
+
+import assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dist', default=assets.DIST_DIR)
+    parser.add_argument('--no-vendor', action='store_true', help="use the files already in static/vendor")
+    parser.add_argument('--pin', action='store_true', help="record the hashes of vendored files that have none")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not args.no_vendor:
+        for path in assets.vendor(pin=args.pin):
+            print(f"vendored {path}")
+    manifest = assets.build(args.dist)
+    print(f"built {', '.join(manifest.values())} in {time.perf_counter() - start:.2f}s"
+          f"{'' if assets.brotli else ' (no brotli, gzip only)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from code_utils import pipeline
+from code_utils.imports import ImportResolver
+
+# (imports table, resolver) last used by this process, rebuilt when the table changes
+_resolver = (None, None)
+
+def resolver_for(imports: dict) -> ImportResolver:
+    global _resolver
+    if _resolver[0] != imports:
+        _resolver = (imports, ImportResolver(imports))
+    return _resolver[1]
+
+def generate_record(index: int, line, imports: dict) -> dict:
+    """The output record for one NDJSON input line (str or UTF-8 bytes); a bad spec gets an `error` instead of code."""
+    try:
+        spec = json.loads(line.decode('utf-8') if isinstance(line, bytes) else line)
+        record = pipeline.generate_spec(spec, resolver_for(imports))
+    except Exception as e:
+        return {'index': index, 'error': f"{type(e).__name__}: {e}"}
+    if 'id' in spec:
+        record['id'] = spec['id']
+    return {'index': index, **record}
+
+async def spool(chunks, max_size: int = 1 << 20):
+    """A request body in a temporary file that only stays in memory while it is small.
+
+    The body has to be read before the response starts: a streaming response
+    listens for the client disconnecting and would swallow the rest of it.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=max_size)
+    async for chunk in chunks:
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+def ndjson_lines(body):
+    """Non-blank lines of an NDJSON file as bytes, closing it at the end.
+
+    Lines are decoded by generate_record, so one that is not UTF-8 becomes an
+    error record rather than ending the response halfway.
+    """
+    with body:
+        for line in body:
+            if line.strip():
+                yield line
+
+
+class BulkGenerator:
+    """Batch code generation: NDJSON specs in, one NDJSON record per spec out as each finishes.
+
+    Specs are generated in a process pool, one per core by default.  At most
+    `max_in_flight` specs are read ahead of the output, so memory use follows
+    the pool size rather than the batch size.  Records are written in
+    completion order and carry the `index` of their spec among the non-blank
+    input lines.
+    """
+
+    def __init__(self, max_workers: int = None, max_in_flight: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.max_workers
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # the server has threads running, and a forked worker could inherit a lock one of them holds
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    async def stream(self, lines, imports: dict):
+        pending = set()
+        try:
+            index = 0
+            for line in lines:
+                while len(pending) >= self.max_in_flight:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        yield json.dumps(future.result()) + '\n'
+                pending.add(asyncio.wrap_future(self.executor.submit(generate_record, index, line, imports)))
+                index += 1
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield json.dumps(future.result()) + '\n'
+        finally:
+            # the client went away, drop what has not started
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
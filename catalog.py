@@ -0,0 +1,338 @@
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from code_utils.imports import ImportResolver
+from gen_graph_x import parse_graph_spec
+
+
+def filename_to_url(name: str) -> str:
+    name = name.lower().replace(' ', '-').replace(',', '').replace('(', '').replace(')', '')
+    return re.sub(r'[^a-z0-9-]', '', name)
+
+def category_order(raw_category: str):
+    # "2_How To" sorts as category "How To" at position 2, unnumbered categories go last
+    parts = raw_category.split('_', 1)
+    if len(parts) == 2 and parts[0].isdigit():
+        return int(parts[0]), parts[1]
+    return float('inf'), raw_category
+
+def get_grouped_architectures(architectures: dict) -> dict:
+    # First pass: collect all categories and their order
+    category_info = {}
+    for arch in architectures.values():
+        order, category = category_order(arch.get('category') or 'Uncategorized')
+        if category not in category_info:
+            category_info[category] = {
+                'order': order,
+                'architectures': []
+            }
+        category_info[category]['architectures'].append(arch)
+
+    # Sort categories by order and create final ordered dictionary
+    sorted_categories = sorted(
+        category_info.items(),
+        key=lambda x: (x[1]['order'], x[0].lower())  # Sort by order first, then alphabetically
+    )
+    return {category: info['architectures'] for category, info in sorted_categories}
+
+
+# columns every catalog version keeps in memory; the rest (readme and code) is read on demand
+METADATA_FIELDS = ['id', 'name', 'category', 'graph_spec']
+
+
+class TextCache:
+    """Bounded LRU of the large text columns of `arch` rows, read one row at a time on first access.
+
+    The bound is on the total length of the cached text rather than the number
+    of rows, so a few long READMEs cannot crowd out memory.  `discard()` drops
+    rows that changed; a read that raced with it is not cached.
+    """
+
+    def __init__(self, db, fields: list, max_chars: int = 4 << 20):
+        self.db = db
+        self.fields = fields
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, arch_id: int) -> dict:
+        with self._lock:
+            texts = self._entries.get(arch_id)
+            if texts is not None:
+                self._entries.move_to_end(arch_id)
+                self.hits += 1
+                return texts
+            self.misses += 1
+            generation = self._generation
+        if not self.fields:
+            return {}
+        columns = ', '.join(f'[{field}]' for field in self.fields)
+        rows = self.db.q(f"SELECT {columns} FROM arch WHERE id = ?", [arch_id])
+        texts = rows[0] if rows else dict.fromkeys(self.fields)
+        with self._lock:
+            if generation == self._generation and arch_id not in self._entries:
+                self._entries[arch_id] = texts
+                self.chars += self._size(texts)
+                # the entry just read stays even when it alone is over the bound
+                while self.chars > self.max_chars and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.chars -= self._size(evicted)
+                    self.evictions += 1
+        return texts
+
+    @staticmethod
+    def _size(texts: dict) -> int:
+        return sum(len(text) for text in texts.values() if isinstance(text, str))
+
+    def discard(self, arch_ids):
+        with self._lock:
+            self._generation += 1
+            for arch_id in arch_ids:
+                texts = self._entries.pop(arch_id, None)
+                if texts is not None:
+                    self.chars -= self._size(texts)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.chars = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'chars': self.chars,
+                'max_chars': self.max_chars,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class ArchRow(Mapping):
+    """An `arch` row whose metadata is held in memory and whose text columns come from a TextCache."""
+
+    __slots__ = ('row', 'texts')
+
+    def __init__(self, row: dict, texts: TextCache):
+        self.row = row
+        self.texts = texts
+
+    def __getitem__(self, key):
+        if key in self.row:
+            return self.row[key]
+        if key in self.texts.fields:
+            return self.texts.get(self.row['id'])[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.row
+        yield from (field for field in self.texts.fields if field not in self.row)
+
+    def __len__(self):
+        return len(set(self.row) | set(self.texts.fields))
+
+    def __repr__(self):
+        return f"ArchRow({self.row!r})"
+
+
+class CatalogSnapshot:
+    """One immutable version of the catalog and the lookup structures derived from it.
+
+    Given the `previous` snapshot and the ids of the rows that `changed` since,
+    the parsed graphs and fingerprints of the other rows are carried over and
+    only the changed graph specs are parsed again.
+    """
+
+    def __init__(self, rows: list, imports: dict, version: int, import_resolver: ImportResolver = None,
+                 previous: 'CatalogSnapshot' = None, changed=()):
+        architectures = {row['id']: row for row in sorted(rows, key=lambda row: row['name'].lower())}
+        self.slugs = {arch_id: filename_to_url(arch['name']) for arch_id, arch in architectures.items()}
+        self.ids_by_slug = {slug: arch_id for arch_id, slug in self.slugs.items()}
+        self.ids_by_name = {arch['name']: arch_id for arch_id, arch in architectures.items()}
+        self.grouped = get_grouped_architectures(architectures)
+        self.first_id = next(iter(architectures), None)
+        if previous is None:
+            self.graphs, self.fingerprints, self.ids_by_fingerprint = {}, {}, {}
+            changed = architectures
+        else:
+            # the index lists are shared with the previous snapshot, so they are replaced rather than changed
+            self.graphs = {arch_id: graph for arch_id, graph in previous.graphs.items() if arch_id not in changed}
+            self.fingerprints = {arch_id: fingerprint for arch_id, fingerprint in previous.fingerprints.items()
+                                 if arch_id not in changed}
+            self.ids_by_fingerprint = dict(previous.ids_by_fingerprint)
+            for fingerprint in {previous.fingerprints[arch_id] for arch_id in changed if arch_id in previous.fingerprints}:
+                ids = [arch_id for arch_id in self.ids_by_fingerprint.pop(fingerprint) if arch_id not in changed]
+                if ids:
+                    self.ids_by_fingerprint[fingerprint] = ids
+        added = {}
+        for arch_id in changed:
+            if arch_id not in architectures:
+                continue
+            try:
+                graph = parse_graph_spec(architectures[arch_id]['graph_spec'] or '')
+            except ValueError:
+                continue
+            self.graphs[arch_id] = graph
+            self.fingerprints[arch_id] = fingerprint = graph.fingerprint()
+            added.setdefault(fingerprint, []).append(arch_id)
+        for fingerprint, ids in added.items():
+            ids = self.ids_by_fingerprint.get(fingerprint, []) + ids
+            self.ids_by_fingerprint[fingerprint] = sorted(ids, key=lambda arch_id: architectures[arch_id]['name'].lower())
+        self.architectures = architectures
+        self.imports = imports
+        # reused while the imports table is unchanged, keeping its memoized import blocks
+        self.import_resolver = import_resolver or ImportResolver(imports)
+        self.version = version
+
+
+CHANGE_LOG_SQL = [
+    """CREATE TABLE IF NOT EXISTS catalog_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        row_id INTEGER
+    )""",
+    *[f"""CREATE TRIGGER IF NOT EXISTS {tbl}_changed_{event.lower()} AFTER {event} ON {tbl} BEGIN
+        INSERT INTO catalog_changes (tbl, row_id) VALUES ('{tbl}', {row}.id);
+    END""" for tbl in ('arch', 'imports') for event, row in (('INSERT', 'new'), ('UPDATE', 'old'), ('DELETE', 'old'))],
+    # an update can change the primary key, so log the new id as well
+    *[f"""CREATE TRIGGER IF NOT EXISTS {tbl}_changed_update_id AFTER UPDATE OF id ON {tbl} BEGIN
+        INSERT INTO catalog_changes (tbl, row_id) VALUES ('{tbl}', new.id);
+    END""" for tbl in ('arch', 'imports')],
+]
+
+
+class Catalog:
+    """The `arch` and `imports` tables plus the lookup structures derived from them.
+
+    Everything is built once per catalog version, so routes resolve slugs and
+    names in O(1) and the left column is rendered from the precomputed grouping.
+    Only the metadata columns are loaded; the README and code columns of a row
+    are read on first access and kept in the bounded `texts` cache.
+
+    Triggers on `arch` and `imports` append the ids of changed rows to
+    `catalog_changes`.  `refresh()` (called by the watcher thread started with
+    `start()`) re-reads only those rows and swaps in a new snapshot in a single
+    assignment, so readers see either the old catalog or the new one.
+    """
+
+    def __init__(self, db, keep_changes: int = 10_000, max_text_chars: int = 4 << 20):
+        self.db = db
+        self.keep_changes = keep_changes
+        self.max_text_chars = max_text_chars
+        self.texts = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self.current = None
+        for sql in CHANGE_LOG_SQL:
+            self.db.execute(sql)
+        self.load()
+
+    architectures = property(lambda self: self.current.architectures)
+    imports = property(lambda self: self.current.imports)
+    import_resolver = property(lambda self: self.current.import_resolver)
+    slugs = property(lambda self: self.current.slugs)
+    grouped = property(lambda self: self.current.grouped)
+    first_id = property(lambda self: self.current.first_id)
+    version = property(lambda self: self.current.version)
+
+    def _last_change(self) -> int:
+        return self.db.q("SELECT coalesce(max(seq), 0) AS seq FROM catalog_changes")[0]['seq']
+
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        self._seen = self._last_change()
+        version = self.current.version + 1 if self.current else 1
+        columns = list(self.db.t.arch.columns_dict)
+        self._metadata = [field for field in METADATA_FIELDS if field in columns]
+        if self.texts is not None:
+            self.texts.clear()
+        self.texts = TextCache(self.db, [field for field in columns if field not in METADATA_FIELDS], self.max_text_chars)
+        rows = self._load_rows("SELECT {columns} FROM arch")
+        self.current = CatalogSnapshot(rows, self._load_imports(), version)
+
+    def _load_rows(self, sql: str, args: list = None) -> list:
+        columns = ', '.join(f'[{field}]' for field in self._metadata)
+        return [ArchRow(row, self.texts) for row in self.db.q(sql.format(columns=columns), args)]
+
+    def _load_imports(self) -> dict:
+        return {row['what']: row['frm'] for row in self.db.t.imports()}
+
+    def refresh(self) -> bool:
+        """Apply rows changed since the last load; returns True if the catalog changed."""
+        with self._lock:
+            last = self._last_change()
+            if last == self._seen:
+                return False
+            changes = self.db.q("SELECT seq, tbl, row_id FROM catalog_changes WHERE seq > ? ORDER BY seq", [self._seen])
+            if not changes or changes[0]['seq'] > self._seen + 1:
+                # the change log was pruned past our position
+                self._load()
+                return True
+
+            current = self.current
+            architectures = dict(current.architectures)
+            arch_ids = list({c['row_id'] for c in changes if c['tbl'] == 'arch'})
+            for arch_id in arch_ids:
+                architectures.pop(arch_id, None)
+            self.texts.discard(arch_ids)
+            if arch_ids:
+                placeholders = ', '.join('?' * len(arch_ids))
+                for row in self._load_rows(f"SELECT {{columns}} FROM arch WHERE id IN ({placeholders})", arch_ids):
+                    architectures[row['id']] = row
+            imports_changed = any(c['tbl'] == 'imports' for c in changes)
+            imports = self._load_imports() if imports_changed else current.imports
+            resolver = None if imports_changed else current.import_resolver
+            self.current = CatalogSnapshot(list(architectures.values()), imports, current.version + 1, resolver,
+                                           current, set(arch_ids))
+            self._seen = changes[-1]['seq']
+            self.db.execute("DELETE FROM catalog_changes WHERE seq <= ?", [self._seen - self.keep_changes])
+            return True
+
+    def start(self, interval: float = 2.0):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._run, args=(interval,), name='catalog-watcher', daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self.refresh()
+
+    def get(self, arch_id: int):
+        return self.current.architectures.get(arch_id)
+
+    def by_slug(self, slug: str):
+        current = self.current
+        arch_id = current.ids_by_slug.get(slug)
+        return None if arch_id is None else current.architectures[arch_id]
+
+    def equivalents(self, graph_spec: str) -> list:
+        """Catalog architectures whose graph is structurally equivalent to `graph_spec`."""
+        current = self.current
+        graph = parse_graph_spec(graph_spec)
+        # a shared fingerprint is only a candidate, hash collisions are ruled out by the exact check
+        return [current.architectures[arch_id] for arch_id in current.ids_by_fingerprint.get(graph.fingerprint(), [])
+                if current.graphs[arch_id].is_structurally_equivalent(graph)]
+
+    def by_name(self, name: str):
+        current = self.current
+        arch_id = current.ids_by_name.get(name)
+        return None if arch_id is None else current.architectures[arch_id]
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+
+class RequestCoalescer:
+    """Latest-wins tracking of per-editor request sequence numbers.
+
+    The editor numbers every refresh it sends.  A request whose number is lower
+    than the newest one seen for its editor has been superseded and can be
+    dropped, either before any work starts (`begin`) or between expensive
+    phases (`is_current`).  Requests without a sequence number always run.
+    """
+
+    def __init__(self, max_editors: int = 10_000):
+        self.max_editors = max_editors
+        self._latest = OrderedDict()  # editor key -> newest sequence number seen
+        self._lock = threading.Lock()
+        self.received = 0
+        self.coalesced = 0   # dropped before doing any work
+        self.cancelled = 0   # dropped part way through
+        self.completed = 0
+
+    def begin(self, key: str, seq: int = None) -> bool:
+        with self._lock:
+            self.received += 1
+            if seq is None:
+                return True
+            latest = self._latest.get(key)
+            if latest is not None and seq < latest:
+                self.coalesced += 1
+                return False
+            self._latest[key] = seq
+            self._latest.move_to_end(key)
+            if len(self._latest) > self.max_editors:
+                self._latest.popitem(last=False)
+            return True
+
+    def is_current(self, key: str, seq: int = None) -> bool:
+        if seq is None:
+            return True
+        with self._lock:
+            if self._latest.get(key, seq) > seq:
+                self.cancelled += 1
+                return False
+            return True
+
+    def finish(self):
+        with self._lock:
+            self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'received': self.received,
+                'coalesced': self.coalesced,
+                'cancelled': self.cancelled,
+                'completed': self.completed,
+                'editors': len(self._latest),
+            }
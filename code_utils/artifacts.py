@@ -0,0 +1,135 @@
+import contextlib
+import hashlib
+import io
+import json
+import time
+from importlib.metadata import version, PackageNotFoundError
+
+from . import pipeline
+from .codegen_cache import codegen_cache, gen_graph, gen_nodes, gen_conditions, gen_state
+from .code_snippet_analyzer import analysis_cache, snippet_key
+
+# Bump when the layout of a stored record or the analysis rules change
+ARTIFACT_FORMAT = 2
+
+SPEC_FIELDS = ['name', 'graph_spec'] + pipeline.CODE_FIELDS
+
+def generator_version() -> str:
+    try:
+        codegen_version = version('langgraph-codegen')
+    except PackageNotFoundError:
+        codegen_version = 'unknown'
+    return f"langgraph-codegen {codegen_version}; format {ARTIFACT_FORMAT}"
+
+def spec_hash(arch: dict) -> str:
+    # everything the generated code and the analysis depend on
+    h = hashlib.sha256()
+    for field in SPEC_FIELDS:
+        h.update((arch.get(field) or '').encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def compute_artifacts(arch: dict) -> dict:
+    """Generated code and analysis for one catalog architecture, as a JSON-ready record."""
+    graph_spec = arch['graph_spec']
+    graph_name = pipeline.mk_name(arch['name'])
+    generators = [
+        ('gen_graph', graph_name, lambda: gen_graph(graph_name, graph_spec)),
+        ('gen_state', '', lambda: gen_state(graph_spec)),
+        ('gen_conditions', '', lambda: gen_conditions(graph_spec)),
+        ('gen_nodes', '', lambda: gen_nodes(graph_spec)),
+    ]
+    codegen = {}
+    # langgraph_codegen prints while generating, keep batch output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for generator, name, generate in generators:
+            try:
+                code = generate()
+            except Exception:
+                continue  # served uncached, the request path reports the error
+            codegen[codegen_cache.make_key(generator, name, graph_spec)] = code
+
+    analyzer = pipeline.analyze_architecture_code(arch)
+    analysis, summaries = {}, {}
+    for name, data in analyzer.snippets.items():
+        analysis[snippet_key(data['code'])] = [sorted(data['defined']), sorted(data['used']),
+                                               sorted(data['undefined']), list(data['imports'])]
+        summaries[name] = [sorted(part) for part in analyzer.get_snippet_summary(name)]
+    return {'arch_id': arch['id'], 'spec_hash': spec_hash(arch),
+            'codegen': codegen, 'analysis': analysis, 'summaries': summaries}
+
+def seed_caches(record: dict):
+    # only the entries the caches do not hold, so seeding again after evictions is cheap
+    for key, code in record['codegen'].items():
+        if key not in codegen_cache:
+            codegen_cache.put(key, code)
+    for key, (defined, used, undefined, imports) in record['analysis'].items():
+        if key not in analysis_cache:
+            analysis_cache.put(key, (frozenset(defined), frozenset(used), frozenset(undefined), tuple(imports)))
+
+
+class ArtifactStore:
+    """Precomputed artifacts in the `artifacts` table, keyed by spec hash and generator version.
+
+    Filled offline by precompute.py.  `warm()` loads the record for an unedited
+    catalog architecture into the in-process code generation and analysis caches.
+    A loaded record is kept to put back whatever the caches evicted since; a
+    spec without one is looked up again after MISS_RETRY seconds, so records
+    precompute.py writes while the app runs are picked up.
+    """
+
+    MISS_RETRY = 60.0
+
+    def __init__(self, db):
+        self.db = db
+        self.generator_version = generator_version()
+        self._warmed = {}   # spec hash -> loaded record
+        self._missing = {}  # spec hash -> time.monotonic() of the last lookup that found no record
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                spec_hash TEXT NOT NULL,
+                generator_version TEXT NOT NULL,
+                arch_id INTEGER,
+                record TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (spec_hash, generator_version)
+            )""")
+
+    def get(self, arch: dict):
+        rows = self.db.q("SELECT record FROM artifacts WHERE spec_hash = ? AND generator_version = ?",
+                         [spec_hash(arch), self.generator_version])
+        return json.loads(rows[0]['record']) if rows else None
+
+    def has(self, arch: dict) -> bool:
+        return bool(self.db.q("SELECT 1 FROM artifacts WHERE spec_hash = ? AND generator_version = ?",
+                              [spec_hash(arch), self.generator_version]))
+
+    def put_many(self, records: list):
+        now = time.time()
+        rows = [(r['spec_hash'], self.generator_version, r['arch_id'], json.dumps(r), now) for r in records]
+        with self.db.conn:
+            self.db.conn.executemany("""
+                INSERT OR REPLACE INTO artifacts (spec_hash, generator_version, arch_id, record, created)
+                VALUES (?, ?, ?, ?, ?)""", rows)
+
+    def prune(self):
+        # drop records made by other generator versions or for specs no longer in the catalog
+        live = [spec_hash(arch) for arch in self.db.t.arch()]
+        placeholders = ', '.join('?' * len(live)) or "''"
+        self.db.execute(f"DELETE FROM artifacts WHERE generator_version != ? OR spec_hash NOT IN ({placeholders})",
+                        [self.generator_version, *live])
+
+    def warm(self, arch: dict):
+        # one table read per spec and process; later requests hit the in-process caches
+        key = spec_hash(arch)
+        record = self._warmed.get(key)
+        if record is None:
+            if time.monotonic() - self._missing.get(key, float('-inf')) < self.MISS_RETRY:
+                return
+            record = self.get(arch)
+            if record is None:
+                self._missing[key] = time.monotonic()
+                return
+            self._missing.pop(key, None)
+            self._warmed[key] = record
+        seed_caches(record)
@@ -1,5 +1,10 @@
 import ast
 import builtins
+import hashlib
+from collections import Counter
+from itertools import repeat
+
+from .codegen_cache import CodegenCache
 
 import_dict = {
     # key: what we are importing, value: complete import statement
@@ -11,100 +16,238 @@ import_dict = {
     'Annotated': 'from typing import Annotated'
 }
 
-builtin_names = { "ValueError" }
+BUILTINS = frozenset(dir(builtins))
 
 def import_statements(defined, used):
     return [import_dict[name] for name in used - defined if import_dict.get(name, None)]
 
+# analyze_code results shared by all analyzers, keyed by the snippet's content hash
+analysis_cache = CodegenCache(maxsize=1024)
+
+def snippet_key(code_snippet):
+    return hashlib.sha256(code_snippet.encode('utf-8')).hexdigest()
+
+
+MODULE, FUNCTION, CLASS, COMPREHENSION = 'module', 'function', 'class', 'comprehension'
+
+class Scope:
+    __slots__ = ('kind', 'parent', 'bound', 'loads', 'globals')
+
+    def __init__(self, kind, parent=None):
+        self.kind = kind
+        self.parent = parent
+        self.bound = set()
+        self.loads = set()
+        self.globals = set()
+
+    def resolves(self, name):
+        # True if a load of `name` in this scope finds a function-local or class-local binding
+        if name in self.globals:
+            return False
+        if name in self.bound:
+            return True
+        scope = self.parent
+        while scope.kind is not MODULE:
+            if scope.kind is not CLASS and name in scope.bound:
+                return True
+            scope = scope.parent
+        return False
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)
+# `except ... as name` and `case ... as name` bind their `name`
+_CAPTURES = (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)
+
+_child_fields = {}
+
+def _fields(kind):
+    # fields that can hold child nodes; expression contexts carry no names
+    names = _child_fields.get(kind)
+    if names is None:
+        names = _child_fields[kind] = tuple(f for f in getattr(kind, '_fields', ()) if f != 'ctx')
+    return names
+
+def _arguments(args):
+    return args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]
+
+def collect_symbols(tree):
+    """Names bound at module level and names that resolve to module or builtin scope.
+
+    One iterative walk records what every scope binds and loads; loads are then
+    resolved with Python's rules, so parameters, locals, comprehension targets and
+    closure variables are neither definitions nor uses of the snippet.
+    """
+    module = Scope(MODULE)
+    scopes = [module]
+    stack = [(tree, module)]
+    pop, push, extend = stack.pop, stack.append, stack.extend
+    Name, Load, AST = ast.Name, ast.Load, ast.AST
+    while stack:
+        node, scope = pop()
+        kind = type(node)
+        if kind is Name:
+            if type(node.ctx) is Load:
+                scope.loads.add(node.id)
+            else:
+                scope.bound.add(node.id)
+        elif kind in _FUNCTIONS or kind is ast.Lambda:
+            args = node.args
+            inner = Scope(FUNCTION, scope)
+            scopes.append(inner)
+            inner.bound.update(a.arg for a in _arguments(args))
+            extend((d, scope) for d in args.defaults + [d for d in args.kw_defaults if d])
+            if kind is ast.Lambda:
+                push((node.body, inner))
+                continue
+            scope.bound.add(node.name)
+            extend((d, scope) for d in node.decorator_list)
+            extend((a.annotation, scope) for a in _arguments(args) if a.annotation)
+            if node.returns:
+                push((node.returns, scope))
+            extend((stmt, inner) for stmt in node.body)
+        elif kind is ast.ClassDef:
+            scope.bound.add(node.name)
+            inner = Scope(CLASS, scope)
+            scopes.append(inner)
+            extend((n, scope) for n in node.bases + node.keywords + node.decorator_list)
+            extend((stmt, inner) for stmt in node.body)
+        elif kind in _COMPREHENSIONS:
+            # the first iterable is evaluated in the enclosing scope
+            inner = Scope(COMPREHENSION, scope)
+            scopes.append(inner)
+            first, *rest = node.generators
+            push((first.iter, scope))
+            push((first.target, inner))
+            extend((n, inner) for n in first.ifs)
+            for generator in rest:
+                extend((n, inner) for n in (generator.target, generator.iter, *generator.ifs))
+            if kind is ast.DictComp:
+                extend(((node.key, inner), (node.value, inner)))
+            else:
+                push((node.elt, inner))
+        elif kind is ast.NamedExpr:
+            # := binds in the nearest scope that is not a comprehension
+            target = scope
+            while target.kind is COMPREHENSION:
+                target = target.parent
+            target.bound.add(node.target.id)
+            push((node.value, scope))
+        elif kind is ast.Global:
+            scope.globals.update(node.names)
+        elif kind is ast.Nonlocal:
+            scope.bound.update(node.names)
+        elif kind is ast.Import:
+            for alias in node.names:
+                scope.bound.add(alias.asname or alias.name.split('.')[0])
+        elif kind is ast.ImportFrom:
+            for alias in node.names:
+                if alias.name != '*':
+                    scope.bound.add(alias.asname or alias.name)
+        else:
+            if kind in _CAPTURES and node.name:
+                scope.bound.add(node.name)
+            elif kind is ast.MatchMapping and node.rest:
+                scope.bound.add(node.rest)
+            for field in _fields(kind):
+                value = getattr(node, field, None)
+                if type(value) is list:
+                    extend(zip(value, repeat(scope)))
+                elif isinstance(value, AST):
+                    push((value, scope))
+
+    for scope in scopes[1:]:
+        # assignments to names declared global define them at module level
+        if scope.globals:
+            module.bound |= scope.bound & scope.globals
+            scope.bound -= scope.globals
+    used = set(module.loads)
+    for scope in scopes[1:]:
+        used.update(name for name in scope.loads if not scope.resolves(name))
+    return module.bound, used
+
+
 class CodeSnippetAnalyzer:
     def __init__(self):
         self.snippets = {}
-        self.builtin_names = set(dir(builtins))
+        self.builtin_names = set(BUILTINS)
+        # reference count of snippets defining each symbol, kept current by add/remove_snippet
+        self.defined_counts = Counter()
+        self.all_defined = set()
+        self._dirty = True
 
     def analyze_code(self, code_snippet):
-        defined_variables = set()
-        used_variables = set()
-        code_snippet = code_snippet.replace("async ", "")
-        class Visitor(ast.NodeVisitor):
-            def __init__(self, builtin_names):
-                self.builtin_names = builtin_names
-                super().__init__()
-
-            def visit_Name(self, node):
-                if isinstance(node.ctx, ast.Store):
-                    defined_variables.add(node.id)
-                elif isinstance(node.ctx, ast.Load):
-                    if node.id not in self.builtin_names:
-                        used_variables.add(node.id)
-
-            def visit_Import(self, node):
-                for alias in node.names:
-                    defined_variables.add(alias.name)
-
-            def visit_ImportFrom(self, node):
-                pass
-
-            def visit_FunctionDef(self, node):
-                defined_variables.add(node.name)
-                for arg in node.args.args:
-                    defined_variables.add(arg.arg)
-                self.generic_visit(node)  # Visit the function body
-
-            def visit_ClassDef(self, node):
-                defined_variables.add(node.name)
-                self.generic_visit(node)  # Visit the class body
-
-            def visit_Call(self, node):
-                if isinstance(node.func, ast.Name):
-                    used_variables.add(node.func.id)
-                self.generic_visit(node)
-
-            def visit_ExceptHandler(self, node):
-                if node.name:
-                    defined_variables.add(node.name)
-                self.generic_visit(node)
-
+        # used: names the snippet reads from module or builtin scope, including its own definitions
         try:
             tree = ast.parse(code_snippet)
-            visitor = Visitor(self.builtin_names)
-            visitor.visit(tree)
         except SyntaxError:
             return set(), set(), set(), []
+        defined_variables, used_variables = collect_symbols(tree)
 
         imports = import_statements(defined_variables, used_variables)
-        undefined_variables = {var for var in used_variables 
-                             if var not in defined_variables and 
-                             var not in builtin_names and
-                             var not in [x.split(' ')[-1] for x in imports]}
-        
+        undefined_variables = used_variables - defined_variables - BUILTINS - import_dict.keys()
         return defined_variables, used_variables, undefined_variables, imports
-    
+
+    def analyze_code_cached(self, code_snippet):
+        # results are frozen because they are shared between analyzers
+        return analysis_cache.get_or_compute(snippet_key(code_snippet), self._analyze_frozen, code_snippet)
+
+    def _analyze_frozen(self, code_snippet):
+        defined, used, undefined, imports = self.analyze_code(code_snippet)
+        return frozenset(defined), frozenset(used), frozenset(undefined), tuple(imports)
+
     def add_snippet(self, name, code):
-        defined, used, undefined, import_statements = self.analyze_code(code)
+        existing = self.snippets.get(name)
+        if existing is not None and existing['code'] == code:
+            return existing
+
+        # acquire the new definitions before releasing the old ones, so names the
+        # replacement still defines never drop out of all_defined
+        defined, used, undefined, import_statements = self.analyze_code_cached(code)
         self.snippets[name] = {
             'code': code,
             'defined': defined,
             'used': used,
             'undefined': undefined,
-            'imports': import_statements
+            'imports': list(import_statements)
         }
+        for var in defined:
+            self.defined_counts[var] += 1
+            if self.defined_counts[var] == 1:
+                self.all_defined.add(var)
+        if existing is not None:
+            self._release(existing['defined'])
+        self._dirty = True
         return self.snippets[name]
-    
+
+    def remove_snippet(self, name):
+        existing = self.snippets.pop(name, None)
+        if existing is not None:
+            self._release(existing['defined'])
+            self._dirty = True
+
+    def _release(self, defined):
+        for var in defined:
+            self.defined_counts[var] -= 1
+            if self.defined_counts[var] == 0:
+                del self.defined_counts[var]
+                self.all_defined.discard(var)
+
     def analyze_all_snippets(self):
-        all_defined = set().union(*(data['defined'] for data in self.snippets.values()))
-        all_defined.update(self.builtin_names)  # Add built-in names to all_defined
+        if not self._dirty:
+            return
 
         for snippet_name, data in self.snippets.items():
             defined = data['defined']
             used = data['used']
-            undefined = used - all_defined - defined  # Change here
-            defined_elsewhere = used.intersection(all_defined) - defined
+            undefined = used - self.all_defined - self.builtin_names - defined
+            defined_elsewhere = ((used & self.all_defined) | (used & self.builtin_names)) - defined
 
             self.snippets[snippet_name]['analysis'] = {
                 'defined': defined,
                 'undefined': undefined,
                 'defined_elsewhere': defined_elsewhere
             }
+        self._dirty = False
 
     def get_snippet_summary(self, snippet_name):
         if snippet_name not in self.snippets:
@@ -0,0 +1,141 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import langgraph_codegen
+from langgraph_codegen.gen_graph import parse_graph_spec
+
+
+class _Flight:
+    # one in-progress computation that concurrent callers wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CodegenCache:
+    """Bounded LRU of generated code keyed by a hash of (generator, name, graph_spec).
+
+    Concurrent requests for the same key are collapsed into a single computation.
+    A caller that waited `wait_timeout` seconds for someone else's computation
+    stops waiting and computes the value itself, uncached.
+    """
+
+    def __init__(self, maxsize: int = 512, wait_timeout: float = 30.0):
+        self.maxsize = maxsize
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.wait_timeouts = 0
+
+    @staticmethod
+    def make_key(generator: str, name: str, graph_spec: str) -> str:
+        h = hashlib.sha256()
+        for part in (generator, name, graph_spec):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def get_or_compute(self, key: str, fn, *args):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                # someone else is already computing this key
+                self.hits += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                return fn(*args)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            self.put(key, flight.result)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+        return flight.result
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key: str) -> bool:
+        # a peek: counts no hit and leaves the LRU order alone
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'wait_timeouts': self.wait_timeouts,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.wait_timeouts = 0
+
+
+codegen_cache = CodegenCache()
+
+
+def _cached(generator: str, fn, graph_name: str, graph_spec: str, *args):
+    key = codegen_cache.make_key(generator, graph_name, graph_spec)
+    return codegen_cache.get_or_compute(key, fn, *args)
+
+
+# Drop-in replacements for the langgraph_codegen generators
+def gen_graph(graph_name: str, graph_spec: str) -> str:
+    return _cached('gen_graph', langgraph_codegen.gen_graph, graph_name, graph_spec, graph_name, graph_spec)
+
+def gen_state(graph_spec: str) -> str:
+    return _cached('gen_state', langgraph_codegen.gen_state, '', graph_spec, graph_spec)
+
+def gen_nodes(graph_spec: str) -> str:
+    # langgraph_codegen.gen_nodes takes the parsed graph, not the spec
+    return _cached('gen_nodes', lambda: langgraph_codegen.gen_nodes(parse_graph_spec(graph_spec)[0]), '', graph_spec)
+
+def gen_node_functions(graph_spec: str) -> str:
+    # gen_nodes writes a fan-in source such as `b, c => d` as one function `def b, c(...)`, here it is one per node
+    def generate():
+        graph = {}
+        for name, data in parse_graph_spec(graph_spec)[0].items():
+            for node in name.split(','):
+                graph.setdefault(node.strip(), data)
+        return langgraph_codegen.gen_nodes(graph)
+    return _cached('gen_node_functions', generate, '', graph_spec)
+
+def gen_conditions(graph_spec: str) -> str:
+    return _cached('gen_conditions', langgraph_codegen.gen_conditions, '', graph_spec, graph_spec)
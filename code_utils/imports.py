@@ -0,0 +1,43 @@
+from .codegen_cache import CodegenCache
+from .code_snippet_analyzer import import_dict
+
+
+def _parse_statement(statement: str) -> tuple:
+    # 'from a.b import c' -> ('c', 'a.b'), 'import c' -> ('c', '')
+    words = statement.split()
+    if words[0] == 'from':
+        return words[3], words[1]
+    return words[1], ''
+
+
+class ImportResolver:
+    """Import statements for undefined symbols, from one symbol -> module index.
+
+    The index merges the analyzer's built-in `import_dict` with rows of the
+    `imports` table (`what` -> `frm`, where an empty `frm` means a plain
+    `import what`); table rows win.  Import blocks are memoized per frozen set
+    of symbols, so a refresh of unchanged code never rebuilds one.
+    """
+
+    def __init__(self, imports: dict = None, maxsize: int = 1024):
+        self.modules = dict(_parse_statement(statement) for statement in import_dict.values())
+        self.modules.update(imports or {})
+        self.blocks = CodegenCache(maxsize=maxsize)
+
+    def resolve(self, symbols) -> tuple:
+        """(import block, symbols the index knows) for a set of symbols; unknown symbols get a plain import."""
+        symbols = frozenset(symbols)
+        return self.blocks.get_or_compute(symbols, self._build, symbols)
+
+    def _build(self, symbols: frozenset) -> tuple:
+        direct = sorted(f"import {symbol}" for symbol in symbols if not self.modules.get(symbol))
+        by_module = {}
+        for symbol in symbols:
+            if self.modules.get(symbol):
+                by_module.setdefault(self.modules[symbol], []).append(symbol)
+        grouped = [f"from {module} import {', '.join(sorted(names))}" for module, names in sorted(by_module.items())]
+        known = frozenset(symbol for symbol in symbols if symbol in self.modules)
+        return "\n".join(direct) + "\n\n" + "\n".join(grouped), known
+
+    def stats(self) -> dict:
+        return dict(self.blocks.stats(), symbols=len(self.modules))
@@ -0,0 +1,130 @@
+import contextlib
+import io
+import re
+
+from .codegen_cache import gen_graph, gen_nodes, gen_node_functions, gen_conditions, gen_state
+from .code_snippet_analyzer import CodeSnippetAnalyzer
+from .imports import ImportResolver
+
+# The code generation and analysis steps behind /get_code, usable without the web app.
+# `arch` is a row of the `arch` table; `graph_spec` overrides the stored DSL.
+
+CODE_FIELDS = ['state', 'nodes', 'conditions', 'tools', 'data', 'llms']
+
+# what generate_spec produces for a bare DSL spec
+GENERATED_FIELDS = ['graph', 'state', 'nodes', 'conditions']
+
+def mk_name(name:str):
+    return name.replace('-', '_').replace(',', '').replace(' ', '_').replace('(', '').replace(')', '').lower()
+
+def generate_code(arch: dict, button_type: str, simulation: bool, graph_spec: str = None) -> str:
+    if graph_spec is None:
+        graph_spec = arch['graph_spec']
+    if button_type == 'README':
+        return arch['readme'].strip()
+    if button_type == 'GRAPH':
+        return gen_graph(mk_name(arch['name']), graph_spec).strip()
+    elif button_type == 'REASONING':
+        # Return a message about selecting a specific reasoning component
+        return "# Select a specific reasoning component (Tools, Data, or LLMs) to view its implementation"
+    elif simulation:
+        simulation_functions = {
+            'STATE': gen_state,
+            'NODES': gen_nodes,
+            'CONDITIONS': gen_conditions,
+            'TOOLS': lambda _: arch['tools'].strip(),
+            'DATA': lambda _: arch['data'].strip(),
+            'LLMS': lambda _: "# LLMs simulation not implemented"
+        }
+        return simulation_functions[button_type](graph_spec).strip()
+    else:
+        value = arch.get(button_type.lower(), '')
+        if value is not None:
+            return value.strip()
+        else:
+            return ""
+
+def analyze_architecture_code(arch: dict, graph_spec: str = None,
+                              analyzer: CodeSnippetAnalyzer = None) -> CodeSnippetAnalyzer:
+    # A given analyzer is brought up to date in place: only snippets whose code changed are analyzed again
+    if arch is None:
+        raise ValueError("Architecture not found")
+    if graph_spec is None:
+        graph_spec = arch['graph_spec']
+
+    if analyzer is None:
+        analyzer = CodeSnippetAnalyzer()
+
+    # Analyze each code snippet
+    for field in CODE_FIELDS:
+        fv = arch.get(field, '')
+        code = fv.strip() if fv is not None else ''
+        if code:
+            analyzer.add_snippet(field, code)
+        else:
+            analyzer.remove_snippet(field)
+
+    # Generate and analyze graph code
+    graph_code = gen_graph(mk_name(arch['name']), graph_spec).strip()
+    analyzer.add_snippet('graph', graph_code)
+
+    # Perform analysis on all snippets
+    analyzer.analyze_all_snippets()
+
+    return analyzer
+
+def generate_spec(spec: dict, resolver: ImportResolver) -> dict:
+    """Generated code, imports and analysis summary for one DSL spec, as a JSON-ready record.
+
+    `spec` has a `graph_spec` and optionally a `name` for the compiled graph.
+    Imports are listed separately; the graph code brings its own.
+    """
+    graph_spec = spec['graph_spec']
+    graph_name = mk_name(spec.get('name') or 'graph')
+    generators = {
+        'graph': lambda: gen_graph(graph_name, graph_spec),
+        'state': lambda: gen_state(graph_spec),
+        'nodes': lambda: gen_node_functions(graph_spec),
+        'conditions': lambda: gen_conditions(graph_spec),
+    }
+    # langgraph_codegen prints while generating
+    with contextlib.redirect_stdout(io.StringIO()):
+        code = {field: generators[field]().strip() for field in GENERATED_FIELDS}
+
+    analyzer = CodeSnippetAnalyzer()
+    for field in GENERATED_FIELDS:
+        if code[field]:
+            analyzer.add_snippet(field, code[field])
+    analyzer.analyze_all_snippets()
+
+    imports, analysis = {}, {}
+    for field in GENERATED_FIELDS:
+        summary = analyzer.get_snippet_summary(field)
+        if summary is None:
+            continue
+        defined, undefined, defined_elsewhere = summary
+        if field != 'graph':
+            # only symbols the index knows, rather than a guessed `import name` for the rest
+            imported = resolver.resolve(undefined)[1]
+            imports[field] = [line for line in resolver.resolve(imported)[0].split('\n') if line]
+            undefined = undefined - imported
+        analysis[field] = {'defined': sorted(defined), 'undefined': sorted(undefined),
+                           'defined_elsewhere': sorted(defined_elsewhere)}
+    return {'name': graph_name, 'code': code, 'imports': imports, 'analysis': analysis}
+
+def remove_extra_blank_lines_oneline(lines):
+    lines = lines.split("\n")
+    return "\n".join(re.sub(r'\n\s*\n', '\n\n', '\n'.join(lines)).split('\n'))
+
+def add_imports(code: str, summary: tuple, resolver: ImportResolver, skip_imports: bool = False):
+    # Prepend imports for undefined symbols, returns the code and the summary without the imported symbols
+    defined, undefined, defined_elsewhere = summary
+    import_block, imported_vars = resolver.resolve(undefined)
+
+    # Remove imported variables from the undefined set
+    undefined = undefined - imported_vars
+
+    if not skip_imports:
+        code = import_block + "\n\n" + code
+    code = remove_extra_blank_lines_oneline(code.strip())
+    return code, (defined, undefined, defined_elsewhere)
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DraftStore:
+    """Per-session graph_spec drafts layered over the shared architecture catalog.
+
+    Reads fall through memory -> `drafts` table -> catalog (the caller's default),
+    so a session only gets its own copy of an architecture once it edits it.
+    Writes are buffered and flushed to SQLite in batches, either when
+    `batch_size` writes are pending or every `flush_interval` seconds.
+    Drafts older than `ttl` seconds are ignored and purged.
+
+    Several worker processes can share the table.  A draft this process has not
+    flushed yet is served from memory; any other cached draft is checked
+    against the row's `updated` time on read, so a change or discard flushed
+    by another worker is seen on the next request.
+    """
+
+    def __init__(self, db, max_entries: int = 10_000, ttl: float = 7 * 24 * 3600,
+                 batch_size: int = 100, flush_interval: float = 1.0):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._cache = OrderedDict()  # (sid, arch_id) -> (graph_spec, updated)
+        self.hits = 0  # cached drafts confirmed current without reading their text
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._stop = threading.Event()
+        self._flusher = None
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS drafts (
+                sid TEXT NOT NULL,
+                arch_id INTEGER NOT NULL,
+                graph_spec TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (sid, arch_id)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS drafts_updated ON drafts (updated)")
+
+    def start(self):
+        # background write-behind; without it, writes are flushed by put() and flush()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name='draft-flusher', daemon=True)
+            self._flusher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.purge_expired()
+
+    def get(self, sid: str, arch_id: int, default: str = None) -> str:
+        key = (sid, arch_id)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._cache[key]
+                self._pending.pop(key, None)
+                return default
+            if key in self._pending:
+                # not flushed yet, nobody has anything newer than this process
+                self._cache.move_to_end(key)
+                return entry[0]
+
+        # another worker may have replaced or discarded the draft since it was cached,
+        # so a clean entry is only used while its `updated` still matches the row
+        if entry is not None:
+            rows = self.db.q("SELECT updated FROM drafts WHERE sid = ? AND arch_id = ? AND updated > ?",
+                             [sid, arch_id, now - self.ttl])
+            if rows and rows[0]['updated'] == entry[1]:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                return entry[0]
+            if not rows:
+                self._forget(key)
+                return default
+        rows = self.db.q("SELECT graph_spec, updated FROM drafts WHERE sid = ? AND arch_id = ? AND updated > ?",
+                         [sid, arch_id, now - self.ttl])
+        if not rows:
+            self._forget(key)
+            return default
+        with self._lock:
+            # a put() may have raced with the read; the newer value wins
+            if key not in self._pending:
+                self._remember(key, (rows[0]['graph_spec'], rows[0]['updated']))
+            return self._cache[key][0]
+
+    def _forget(self, key):
+        with self._lock:
+            if key not in self._pending:
+                self._cache.pop(key, None)
+
+    def put(self, sid: str, arch_id: int, graph_spec: str):
+        key = (sid, arch_id)
+        entry = (graph_spec, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self._pending[key] = entry
+            due = (len(self._pending) >= self.batch_size or
+                   entry[1] - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def discard(self, sid: str, arch_id: int):
+        key = (sid, arch_id)
+        # a flush already writing this draft would put the row back after the delete
+        with self._flush_lock:
+            with self._lock:
+                self._cache.pop(key, None)
+                self._pending.pop(key, None)
+            self.db.execute("DELETE FROM drafts WHERE sid = ? AND arch_id = ?", [sid, arch_id])
+
+    def _remember(self, key, entry):
+        # only clean entries are evicted from memory, dirty ones stay until flushed
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        overflow = len(self._cache) - self.max_entries
+        if overflow > 0:
+            evict = []
+            for old in self._cache:
+                if old not in self._pending:
+                    evict.append(old)
+                    if len(evict) == overflow:
+                        break
+            for old in evict:
+                del self._cache[old]
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._pending)
+                self._last_flush = time.time()
+            if not batch:
+                return 0
+            rows = [(sid, arch_id, spec, updated) for (sid, arch_id), (spec, updated) in batch.items()]
+            with self.db.conn:
+                self.db.conn.executemany("""
+                    INSERT INTO drafts (sid, arch_id, graph_spec, updated) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (sid, arch_id) DO UPDATE SET graph_spec = excluded.graph_spec, updated = excluded.updated
+                    WHERE excluded.updated >= drafts.updated""", rows)
+            # the batch stays pending, and so served from memory, until it is committed;
+            # a draft put again in the meantime stays pending for the next flush
+            with self._lock:
+                for key, entry in batch.items():
+                    if self._pending.get(key) is entry:
+                        del self._pending[key]
+            return len(rows)
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (_, updated) in self._cache.items() if updated < cutoff]:
+                del self._cache[key]
+                self._pending.pop(key, None)
+        self.db.execute("DELETE FROM drafts WHERE updated < ?", [cutoff])
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,418 @@
+import hashlib
+from array import array
+
+from code_utils.codegen_cache import gen_graph
+
+START, END = 'START', 'END'
+TRUE = 'true'
+# refinement rounds before the exact search takes over, each round costs O(edges)
+REFINE_ROUNDS = 3
+# condition labels the DSL and the generators use for an unconditional edge
+UNCONDITIONAL = {None, '', TRUE, 'true_fn'}
+# edge kinds: a plain edge, a condition branch, and the `=> dest` default branch of a conditional block
+EDGE, CONDITIONAL, DEFAULT = 0, 1, 2
+
+
+class Graph:
+    """Directed graph over interned node ids.
+
+    Node names map to dense integer ids (`names[id]`, `ids[name]`).  Edges are
+    appended to three parallel int arrays (source, destination, condition id),
+    and condition labels live in a side table where id 0 means unconditional.
+    `csr()` packs the edges into compressed sparse row form on first use, so
+    parsing stays a single append per edge and traversals read flat arrays.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.conditions = [TRUE]
+        self.condition_ids = {TRUE: 0}
+        self.state = None
+        self.start = None
+        self.end = None
+        self._src = array('i')
+        self._dst = array('i')
+        self._cond = array('i')
+        self._csr = {}
+        self._edges = None
+        self._kinds = None
+        self._fingerprint = None
+
+    def _changed(self):
+        self._csr.clear()
+        self._edges = self._kinds = self._fingerprint = None
+
+    def node_id(self, name: str) -> int:
+        node = self.ids.get(name)
+        if node is None:
+            node = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self._changed()
+        return node
+
+    add_node = node_id
+
+    def condition_id(self, condition: str) -> int:
+        if condition in UNCONDITIONAL:
+            return 0
+        cond = self.condition_ids.get(condition)
+        if cond is None:
+            cond = self.condition_ids[condition] = len(self.conditions)
+            self.conditions.append(condition)
+        return cond
+
+    def set_start_node(self, name: str):
+        self.start = self.node_id(name)
+        self._fingerprint = None
+
+    def set_end_node(self, name: str):
+        self.end = self.node_id(name)
+        self._fingerprint = None
+
+    def add_edge(self, src: str, dst: str, condition: str = TRUE):
+        self._src.append(self.node_id(src))
+        self._dst.append(self.node_id(dst))
+        self._cond.append(self.condition_id(condition))
+        self._changed()
+
+    start_node = property(lambda self: None if self.start is None else self.names[self.start])
+    end_node = property(lambda self: None if self.end is None else self.names[self.end])
+    nodes = property(lambda self: self.names)
+
+    def num_nodes(self) -> int:
+        return len(self.names)
+
+    def num_edges(self) -> int:
+        return len(self._src)
+
+    def csr(self, reverse: bool = False) -> tuple:
+        """(offsets, neighbours, conditions); the edges of node i are offsets[i]:offsets[i + 1].
+
+        With `reverse`, neighbours are predecessors instead of successors.
+        Edges keep their insertion order within each node.
+        """
+        packed = self._csr.get(reverse)
+        if packed is None:
+            src, dst = (self._dst, self._src) if reverse else (self._src, self._dst)
+            n = len(self.names)
+            offsets = array('i', bytes(4 * (n + 1)))
+            for s in src:
+                offsets[s + 1] += 1
+            for i in range(n):
+                offsets[i + 1] += offsets[i]
+            position = offsets[:-1]
+            neighbours = array('i', bytes(4 * len(src)))
+            conditions = array('i', bytes(4 * len(src)))
+            for s, d, c in zip(src, dst, self._cond):
+                p = position[s]
+                neighbours[p] = d
+                conditions[p] = c
+                position[s] = p + 1
+            packed = self._csr[reverse] = (offsets, neighbours, conditions)
+        return packed
+
+    def successors(self, node: int):
+        offsets, neighbours, conditions = self.csr()
+        for i in range(offsets[node], offsets[node + 1]):
+            yield neighbours[i], conditions[i]
+
+    @property
+    def edges(self) -> dict:
+        """{node name: [(destination name, condition label), ...]}, "true" for unconditional edges."""
+        if self._edges is None:
+            offsets, neighbours, conditions = self.csr()
+            names, labels = self.names, self.conditions
+            self._edges = {
+                name: [(names[neighbours[i]], labels[conditions[i]]) for i in range(offsets[node], offsets[node + 1])]
+                for node, name in enumerate(names)
+            }
+        return self._edges
+
+    def edge_kinds(self) -> array:
+        """EDGE, CONDITIONAL or DEFAULT for every edge, in insertion order."""
+        if self._kinds is None:
+            branching = set(s for s, c in zip(self._src, self._cond) if c)
+            self._kinds = array('b', (CONDITIONAL if c else DEFAULT if s in branching else EDGE
+                                      for s, c in zip(self._src, self._cond)))
+        return self._kinds
+
+    def fingerprint(self) -> str:
+        """A canonical hash of the structure: equal for equivalent graphs, names and labels ignored.
+
+        Colours are refined until the partition of the nodes stops splitting,
+        each round hashing a node's colour with the sorted (kind, colour) pairs
+        of its outgoing and incoming edges.  Different graphs can share a
+        fingerprint, so matches are confirmed with is_structurally_equivalent.
+        """
+        if self._fingerprint is None:
+            colors = _initial_colors(self)
+            edges = list(zip(self._src, self._dst, self.edge_kinds()))
+            count = len(set(colors))
+            for _ in range(len(colors)):
+                out = [[] for _ in colors]
+                into = [[] for _ in colors]
+                for s, d, kind in edges:
+                    out[s].append((kind, colors[d]))
+                    into[d].append((kind, colors[s]))
+                colors = [hash((color, tuple(sorted(o)), tuple(sorted(i)))) for color, o, i in zip(colors, out, into)]
+                distinct = len(set(colors))
+                if distinct == count:
+                    break
+                count = distinct
+            summary = (len(colors), len(edges), self.start is None, self.end is None, sorted(colors))
+            self._fingerprint = hashlib.blake2b(repr(summary).encode('utf-8'), digest_size=16).hexdigest()
+        return self._fingerprint
+
+    def is_structurally_equivalent(self, other: 'Graph') -> bool:
+        """True if the graphs are isomorphic with start mapped to start and end to end.
+
+        Node names and condition labels are ignored; what has to match is the
+        kind of every edge (plain, conditional or default branch).  Colour
+        refinement over both graphs narrows the candidates for every node, then
+        a backtracking search confirms a mapping.
+        """
+        if (self.num_nodes() != other.num_nodes() or self.num_edges() != other.num_edges()
+                or (self.start is None) != (other.start is None) or (self.end is None) != (other.end is None)):
+            return False
+        colors = _refine_colors([self, other])
+        n = self.num_nodes()
+        mine, theirs = colors[:n], colors[n:]
+        if sorted(mine) != sorted(theirs):
+            return False
+        return _find_mapping(self, other, mine, theirs)
+
+
+def _edge_kinds(graph: Graph, reverse: bool = False) -> list:
+    # per node, a {(neighbour, kind): count} map of its outgoing (or incoming) edges
+    src, dst = (graph._dst, graph._src) if reverse else (graph._src, graph._dst)
+    adjacency = [dict() for _ in graph.names]
+    for s, d, kind in zip(src, dst, graph.edge_kinds()):
+        key = (d, kind)
+        adjacency[s][key] = adjacency[s].get(key, 0) + 1
+    return adjacency
+
+
+def _initial_colors(graph: Graph) -> list:
+    colors = [0] * graph.num_nodes()
+    if graph.start is not None:
+        colors[graph.start] = 1
+    if graph.end is not None:
+        colors[graph.end] += 2
+    return colors
+
+
+def _refine_colors(graphs: list, rounds: int = REFINE_ROUNDS) -> list:
+    """Node colours after up to `rounds` of 1-dimensional Weisfeiler-Leman refinement.
+
+    Colours are computed over all graphs at once so they are comparable, and
+    returned concatenated in graph order.  Start and end get their own initial
+    colours; an edge contributes its direction, kind and the neighbour's colour.
+    """
+    colors, edges = [], []
+    for graph in graphs:
+        base = len(colors)
+        colors += _initial_colors(graph)
+        edges += [(base + s, base + d, kind) for s, d, kind in zip(graph._src, graph._dst, graph.edge_kinds())]
+
+    count = len(set(colors))
+    for _ in range(rounds):
+        signatures = [[color, [], []] for color in colors]
+        for s, d, kind in edges:
+            signatures[s][1].append((kind, colors[d]))
+            signatures[d][2].append((kind, colors[s]))
+        palette = {}
+        refined = []
+        for color, out, into in signatures:
+            out.sort()
+            into.sort()
+            refined.append(palette.setdefault((color, tuple(out), tuple(into)), len(palette)))
+        colors = refined
+        if len(palette) == count:
+            break
+        count = len(palette)
+    return colors
+
+
+def _search_order(graph: Graph, rarity) -> list:
+    """Nodes in breadth-first order from the start (then rarest colour first for
+    other components), each with the already ordered neighbour it was reached from."""
+    out, into = _edge_kinds(graph), _edge_kinds(graph, reverse=True)
+    seen = [False] * graph.num_nodes()
+    roots = sorted(range(graph.num_nodes()), key=rarity)
+    if graph.start is not None:
+        roots.insert(0, graph.start)
+    order = []
+    for root in roots:
+        if seen[root]:
+            continue
+        seen[root] = True
+        order.append((root, None))
+        i = len(order) - 1
+        while i < len(order):
+            node = order[i][0]
+            for reverse, adjacency in ((False, out), (True, into)):
+                for neighbour, kind in adjacency[node]:
+                    if not seen[neighbour]:
+                        seen[neighbour] = True
+                        order.append((neighbour, (node, reverse, kind)))
+            i += 1
+    return order
+
+
+def _find_mapping(g1: Graph, g2: Graph, colors1: list, colors2: list) -> bool:
+    """Backtracking search for an isomorphism that keeps colours and edge kinds.
+
+    Nodes are matched in breadth-first order, so apart from the first node of
+    each component the candidates for a node are the matching neighbours of an
+    already mapped node rather than every node of its colour.
+    """
+    out1, out2 = _edge_kinds(g1), _edge_kinds(g2)
+    in1, in2 = _edge_kinds(g1, reverse=True), _edge_kinds(g2, reverse=True)
+    by_color = {}
+    for node, color in enumerate(colors2):
+        by_color.setdefault(color, []).append(node)
+    order = _search_order(g1, lambda node: len(by_color[colors1[node]]))
+    mapping, used = {}, set()
+
+    def candidates(u, via):
+        color = colors1[u]
+        if via is None:
+            return by_color[color]
+        parent, reverse, kind = via
+        adjacency = in2 if reverse else out2
+        return [v for v, k in adjacency[mapping[parent]] if k == kind and colors2[v] == color]
+
+    def consistent(u, v):
+        for adjacency1, adjacency2 in ((out1, out2), (in1, in2)):
+            for (w, kind), count in adjacency1[u].items():
+                if w in mapping or w == u:
+                    target = v if w == u else mapping[w]
+                    if adjacency2[v].get((target, kind), 0) != count:
+                        return False
+        return True
+
+    # one [candidates, next index] frame per matched position in `order`
+    stack = []
+    depth = 0
+    while depth < len(order):
+        u, via = order[depth]
+        if depth == len(stack):
+            stack.append([candidates(u, via), 0])
+        elif u in mapping:
+            used.discard(mapping.pop(u))
+        options, index = stack[depth]
+        while index < len(options) and (options[index] in used or not consistent(u, options[index])):
+            index += 1
+        if index == len(options):
+            stack.pop()
+            depth -= 1
+            if depth < 0:
+                return False
+            continue
+        mapping[u] = options[index]
+        used.add(options[index])
+        stack[depth][1] = index + 1
+        depth += 1
+    return True
+
+
+# parse_lines output: (OP_NODE, lineno, name, state) starts a node block, (OP_EDGE, lineno, condition, destination)
+# adds an edge to the current block.  Names and destinations are kept as written, "a, b" included.
+OP_NODE, OP_EDGE = 'node', 'edge'
+TRUE_FN = 'true_fn'
+
+
+def _node(lineno: int, head: str) -> tuple:
+    if '(' in head:
+        parts = head.split('(')
+        return OP_NODE, lineno, parts[0].strip(), parts[1].strip(')')
+    return OP_NODE, lineno, head, None
+
+
+def parse_lines(lines, first_lineno: int = 1) -> list:
+    """Tokenize DSL lines into node and edge operations, following langgraph_codegen's reading.
+
+    `#` starts a comment and lines starting with `-` or `/` are ignored.  An
+    unindented `a => b` line is the node `a` followed by an unconditional edge
+    to `b`; other lines containing `=>` are `condition => dest` or `=> dest`
+    branches of the current node, and any other line starts a node.
+    """
+    ops = []
+    for lineno, line in enumerate(lines, first_lineno):
+        line = line.split('#', 1)[0].rstrip()
+        if not line or line[0] in '-/':
+            continue
+        if '=>' in line and not line[0].isspace():
+            parts = line.split('=>')
+            head = parts[0].strip()
+            if head:
+                ops.append(_node(lineno, head))
+                ops.append((OP_EDGE, lineno, TRUE_FN, parts[1].strip()))
+                continue
+        line = line.strip()
+        if '=>' in line:
+            parts = line.split('=>')
+            ops.append((OP_EDGE, lineno, parts[0].strip() or TRUE_FN, parts[1].strip()))
+        else:
+            ops.append(_node(lineno, line))
+    return ops
+
+
+def build_graph(ops) -> Graph:
+    """A Graph from parse_lines operations.
+
+    Fan-out destinations and fan-in sources become one edge each.  The node
+    START points to becomes the start node; a node defined twice keeps the
+    edges of both definitions.
+    """
+    graph = Graph()
+    sources = None
+    start_targets = []
+    for op in ops:
+        if op[0] == OP_NODE:
+            _, lineno, head, state = op
+            if state is not None:
+                graph.state = state.strip()
+            sources = [name.strip() for name in head.split(',') if name.strip()]
+            for name in sources:
+                if name != START:
+                    graph.node_id(name)
+            continue
+        _, lineno, condition, destinations = op
+        if sources is None:
+            raise ValueError(f"line {lineno}: edge without a source node")
+        for dst in destinations.split(','):
+            dst = dst.strip()
+            if not dst:
+                continue
+            for src in sources:
+                if src == START:
+                    start_targets.append((dst, condition))
+                else:
+                    graph.add_edge(src, dst, condition)
+
+    if len(start_targets) == 1 and start_targets[0][1] in UNCONDITIONAL:
+        graph.set_start_node(start_targets[0][0])
+    elif start_targets:
+        for dst, condition in start_targets:
+            graph.add_edge(START, dst, condition)
+        graph.set_start_node(START)
+    if END in graph.ids:
+        graph.end = graph.ids[END]
+    return graph
+
+
+def parse_graph_spec(graph_spec: str) -> Graph:
+    """Build a Graph from the graph DSL in one pass over its lines.
+
+    Accepts the forms langgraph_codegen does: `START(State) => node`,
+    `a => b` edges, `a => b, c` fan-out, `a, b => c` fan-in, and a node line
+    followed by indented `condition => dest` or `=> dest` branches.
+    """
+    return build_graph(parse_lines(graph_spec.splitlines()))
+
+
+def gen_graph_x(graph_name: str, graph_spec: str) -> tuple:
+    """The generated graph code and the parsed Graph for a DSL spec."""
+    return gen_graph(graph_name, graph_spec), parse_graph_spec(graph_spec)
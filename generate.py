@@ -0,0 +1,180 @@
+"""Generate a Python module next to every .dsl file under the given paths.
+
+    python generate.py [paths ...] [--workers N] [--cache .gen_graph_cache] [--db data/gen_graph.db] [--force]
+
+`specs/agent.dsl` becomes `specs/agent.py`: imports, state, nodes, conditions
+and the compiled graph as `agent_graph`.  Output is cached on disk by a hash
+of the spec content, its name, the imports table and the generator version,
+so a rerun only regenerates changed files.  Imports come from the `imports` table of
+--db when it exists.  Nothing here imports the web app.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from code_utils import pipeline
+from code_utils.artifacts import generator_version
+from code_utils.imports import ImportResolver
+
+SECTIONS = ['state', 'nodes', 'conditions', 'graph']
+
+# part of every cache key, bump it when the module layout changes
+MODULE_FORMAT = 3
+
+# the mock state gen_state writes, for a graph whose state class no section defines
+STATE_CLASS = """from typing import Annotated, TypedDict
+from langgraph.graph.message import add_messages
+
+class {name}(TypedDict):
+    states: Annotated[list[str], add_messages]
+    last_state: str"""
+
+# the resolver of a worker process, set up once by init_worker
+_resolver = None
+
+def init_worker(imports: dict):
+    global _resolver
+    _resolver = ImportResolver(imports)
+
+def load_imports(db_path: str) -> dict:
+    if not db_path or not os.path.exists(db_path):
+        return {}
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        return dict(conn.execute("SELECT what, frm FROM imports"))
+
+def find_specs(paths: list) -> list:
+    specs = set()
+    for path in map(Path, paths):
+        specs.update(path.rglob('*.dsl') if path.is_dir() else [path])
+    return sorted(specs)
+
+def cache_key(prefix: str, name: str, graph_spec: str) -> str:
+    h = hashlib.sha256()
+    for part in (prefix, name, graph_spec):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def graph_name(stem: str, graph_spec: str) -> str:
+    """`<stem>_graph`, with more underscores while a name in the spec is already that.
+
+    The compiled graph shares the module with a function per node and condition.
+    """
+    taken = set(re.findall(r'\w+', graph_spec))
+    name = re.sub(r'\W|^(?=\d)', '_', pipeline.mk_name(stem)) + '_graph'
+    while name in taken:
+        name += '_'
+    return name
+
+def render_module(record: dict, source: str) -> str:
+    """The module text for one generate_spec record."""
+    code = dict(record['code'])
+    analysis = [record['analysis'][field] for field in SECTIONS if field in record['analysis']]
+    defined = {name for summary in analysis for name in summary['defined']}
+    undefined = {name for summary in analysis for name in summary['undefined']}
+
+    # the graph runs on its state class, which gen_state may not have written
+    graph_state = re.search(r' = StateGraph\((\w+)\)', code['graph'])
+    if graph_state:
+        state = graph_state[1]
+        if state not in defined:
+            code['state'] = '\n\n\n'.join(filter(None, [code['state'], STATE_CLASS.format(name=state)]))
+            undefined.discard(state)
+        # gen_nodes annotates nodes whose state the spec leaves out with a `default` that is never defined
+        if 'default' in undefined:
+            code['nodes'] = code['nodes'].replace("(state: default,", f"(state: {state},")
+            undefined.discard('default')
+    if ' = MessageGraph()' in code['graph']:
+        # otherwise the mock state class gen_state names after it would stand in for langgraph's MessageGraph
+        code['graph'] = code['graph'].replace("import START, END, StateGraph",
+                                              "import START, END, MessageGraph, StateGraph", 1)
+
+    imports = sorted({line for lines in record['imports'].values() for line in lines})
+    header = [f"# GENERATED from {source} by generate.py, edit the .dsl file instead"]
+    if undefined:
+        header.append(f"# still undefined: {', '.join(sorted(undefined))}")
+    # states of other nodes are only annotations, they need not exist for the module to run
+    header.append("from __future__ import annotations")
+    parts = ['\n'.join(header + imports)] + [code[field] for field in SECTIONS if code[field]]
+    return '\n\n\n'.join(parts) + '\n'
+
+def generate_module(stem: str, graph_spec: str, source: str) -> tuple:
+    """(module text, None) or (None, error) for one spec, run in a worker process."""
+    try:
+        record = pipeline.generate_spec({'name': graph_name(stem, graph_spec), 'graph_spec': graph_spec}, _resolver)
+        module = render_module(record, source)
+        # a module that does not compile counts as failed, rather than being written
+        compile(module, source, 'exec')
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    return module, None
+
+def write_if_changed(path: Path, text: str) -> bool:
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return False
+    path.write_text(text, encoding='utf-8')
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['.'], help=".dsl files or directories to search")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--cache', default='.gen_graph_cache', help="directory of cached modules")
+    parser.add_argument('--db', default='data/gen_graph.db', help="database with the imports table")
+    parser.add_argument('--force', action='store_true', help="regenerate files whose output is cached")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    imports = load_imports(args.db)
+    prefix = f"{generator_version()}; module {MODULE_FORMAT}; imports {json.dumps(imports, sort_keys=True)}"
+    cache = Path(args.cache)
+    cache.mkdir(parents=True, exist_ok=True)
+
+    jobs = []  # (spec path, output path, cache key, spec text)
+    written = cached = 0
+    for spec in find_specs(args.paths):
+        graph_spec = spec.read_text(encoding='utf-8')
+        key = cache_key(prefix, spec.stem, graph_spec)
+        cached_module = cache / f"{key}.py"
+        if cached_module.exists() and not args.force:
+            cached += 1
+            written += write_if_changed(spec.with_suffix('.py'), cached_module.read_text(encoding='utf-8'))
+        else:
+            jobs.append((spec, spec.with_suffix('.py'), key, graph_spec))
+
+    failed = 0
+    if jobs:
+        work = ([spec.stem for spec, *_ in jobs], [text for *_, text in jobs], [spec.name for spec, *_ in jobs])
+        if len(jobs) == 1 or args.workers == 1:
+            init_worker(imports)
+            results = map(generate_module, *work)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(imports,))
+            results = pool.map(generate_module, *work, chunksize=4)
+        for (spec, output, key, _), (module, error) in zip(jobs, results):
+            if error:
+                failed += 1
+                print(f"{spec}: {error}", file=sys.stderr)
+                continue
+            (cache / f"{key}.py").write_text(module, encoding='utf-8')
+            written += write_if_changed(output, module)
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"generated {len(jobs) - failed}, cached {cached}, failed {failed}, wrote {written} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import threading
+
+from code_utils.codegen_cache import CodegenCache, codegen_cache
+from langgraph_codegen.gen_graph import mk_conditions, mk_conditional_edges
+from gen_graph_x import OP_NODE, build_graph, parse_lines
+from validation import GraphCheck
+
+
+def split_blocks(graph_spec: str) -> list:
+    """[(first line number, text)] for every run of non-blank lines."""
+    blocks = []
+    lines = []
+    first = 1
+    for lineno, line in enumerate(graph_spec.split('\n'), 1):
+        if line.strip():
+            if not lines:
+                first = lineno
+            lines.append(line)
+        elif lines:
+            blocks.append((first, '\n'.join(lines)))
+            lines = []
+    if lines:
+        blocks.append((first, '\n'.join(lines)))
+    return blocks
+
+
+class ParsedSpec:
+    """A DSL spec as a list of (first line number, operations) blocks.
+
+    Block operations come from parse_lines with line numbers relative to the
+    block, so an unchanged block can be reused wherever it moves in the spec.
+    """
+
+    def __init__(self, blocks: list):
+        self.blocks = blocks
+
+    def ops(self):
+        for first, ops in self.blocks:
+            for op in ops:
+                yield (op[0], op[1] + first - 1) + op[2:]
+
+    def graph_dict(self) -> tuple:
+        """({node: (state, [(condition, destination)])}, start node), read the way langgraph_codegen reads the spec."""
+        graph = {}
+        current = state = start_node = None
+        for _, ops in self.blocks:
+            for kind, _, a, b in ops:
+                if kind is OP_NODE:
+                    if b is not None:
+                        state = b
+                        start_node = a
+                    current = a
+                    graph[current] = (state, [])
+                elif current is not None:  # an edge before any node has no source, validation reports it
+                    graph[current][1].append((a, b))
+        return graph, start_node
+
+    def to_graph(self):
+        return build_graph(self.ops())
+
+
+class IncrementalSpec:
+    """The last parse of one editor's DSL.
+
+    `update()` splits the new text into blank-line separated blocks and only
+    tokenizes blocks whose text was not in the previous version, so the work
+    per keystroke follows the size of the edit rather than of the spec.
+    """
+
+    def __init__(self):
+        self._blocks = {}  # block text -> operations
+        self._last = (None, None)  # (text, ParsedSpec) of the last update
+        self._lock = threading.Lock()
+        self._graph_check = GraphCheck()
+        self.reparsed = 0
+        self.reused = 0
+
+    def update(self, graph_spec: str) -> ParsedSpec:
+        with self._lock:
+            if graph_spec == self._last[0]:
+                # validation and code generation of one refresh parse the same text
+                return self._last[1]
+            previous, current = self._blocks, {}
+            blocks = []
+            for first, text in split_blocks(graph_spec):
+                ops = current.get(text) or previous.get(text)
+                if ops is None:
+                    ops = parse_lines(text.split('\n'))
+                    self.reparsed += 1
+                else:
+                    self.reused += 1
+                current[text] = ops
+                blocks.append((first, ops))
+            self._blocks = current
+            self._last = (graph_spec, ParsedSpec(blocks))
+            return self._last[1]
+
+    def check(self, graph_spec: str) -> list:
+        """validation.check_ops findings for the new text, patched from those of the last check."""
+        return self._graph_check.update(self.update(graph_spec).blocks)
+
+
+# generated code per (graph name, node, state, edges), shared by all editors
+fragment_cache = CodegenCache(maxsize=20_000)
+
+def _node_code(graph_name: str, node_name: str, state: str, edges: tuple) -> str:
+    node_dict = {"state": state, "edges": [{"condition": c, "destination": d} for c, d in edges]}
+    parts = [mk_conditions(node_name, node_dict), mk_conditional_edges(graph_name, node_name, node_dict)]
+    return '\n'.join(part for part in parts if part)
+
+def gen_graph_code(graph_name: str, parsed: ParsedSpec) -> str:
+    """langgraph_codegen.gen_graph output for a parsed spec, assembled from per-node fragments."""
+    graph, start_node = parsed.graph_dict()
+    if start_node is None:
+        # without a START line there is no state type or entry point to build a graph from
+        return ""
+    state_type = graph[start_node][0]
+    graph_setup = f"{graph_name} = StateGraph({state_type})\n"
+    if state_type == "MessageGraph":
+        graph_setup = f"{graph_name} = MessageGraph()\n"
+
+    # gen_graph skips a node whose name is a single character it has already seen
+    seen_chars = set()
+    for node_name in graph:
+        if node_name != "START":
+            for nn in [n.strip() for n in node_name.split(",")] if "," in node_name else [node_name]:
+                if not (len(nn) == 1 and nn in seen_chars):
+                    seen_chars.update(nn)
+                    graph_setup += f"{graph_name}.add_node('{nn}', {nn})\n"
+    if start_node != "START":
+        graph_setup += f"\n{graph_name}.set_entry_point('{start_node}')\n\n"
+
+    node_code = []
+    for node_name, (state, edges) in graph.items():
+        key = (graph_name, node_name, state, tuple(edges))
+        code = fragment_cache.get_or_compute(key, _node_code, *key)
+        if code:
+            node_code.append(code)
+
+    return (
+        f"# GENERATED code, creates compiled graph: {graph_name}\n"
+        + "from langgraph.graph import START, END, StateGraph\n\n"
+        + graph_setup
+        + "\n".join(node_code)
+        + "\n\n"
+        + f"{graph_name} = {graph_name}.compile()"
+    )
+
+def gen_graph(graph_name: str, graph_spec: str, editor: IncrementalSpec) -> str:
+    """codegen_cache's gen_graph, computed from the editor's incremental parse on a miss."""
+    if not graph_spec:
+        return ""
+    key = codegen_cache.make_key('gen_graph', graph_name, graph_spec)
+    return codegen_cache.get_or_compute(key, lambda: gen_graph_code(graph_name, editor.update(graph_spec)))
@@ -0,0 +1,64 @@
+import json
+import threading
+
+from fasthtml.common import to_xml
+
+
+class LivePanes:
+    """What one live-preview connection is currently showing.
+
+    Every pane is described by a key built from the inputs it renders from.
+    `update()` renders only the panes whose key changed since the version the
+    client acknowledged and bumps the version when anything did, so an edit
+    that leaves the generated code and analysis alone costs no rendering and
+    sends no markup.  The client may drop a frame a newer edit overtook; it
+    keeps acknowledging the last version it applied, so the next update sends
+    those panes again.  An acknowledgement of 0, or of a version no longer
+    remembered, gets every pane.
+    """
+
+    # sent versions remembered for acknowledgements, older ones get a full resync
+    MAX_VERSIONS = 16
+
+    def __init__(self):
+        self._shown = {0: {}}  # version -> {pane: key} the client shows once it applied that version
+        self._lock = threading.Lock()
+        self.version = 0
+        self.updates = 0
+        self.pushed = 0   # panes sent
+        self.skipped = 0  # panes unchanged
+        self.resyncs = 0  # updates against an unknown version
+
+    def update(self, panes: dict, ack: int = None) -> dict:
+        """{pane: markup} for the panes changed since version `ack` (default: the latest sent).
+
+        `panes` maps a pane to (key, render).
+        """
+        with self._lock:
+            if ack is None:
+                ack = self.version
+            shown = self._shown.get(ack)
+            if shown is None:
+                self.resyncs += 1
+                shown = {}
+            changed = {}
+            for name, (key, render) in panes.items():
+                if name in shown and shown[name] == key:
+                    self.skipped += 1
+                    continue
+                changed[name] = to_xml(render())
+            self.updates += 1
+            self.pushed += len(changed)
+            if changed:
+                self.version += 1
+                self._shown[self.version] = {**shown, **{name: key for name, (key, _) in panes.items()}}
+                # the client only moves forward, versions before its acknowledgement are done with
+                for version in [v for v in self._shown if v < ack or v <= self.version - self.MAX_VERSIONS]:
+                    if version:
+                        del self._shown[version]
+            return changed
+
+    def message(self, panes: dict, seq: int = None, ack: int = None) -> str:
+        """The JSON frame pushed to the client for one update."""
+        changed = self.update(panes, ack)
+        return json.dumps({'version': self.version, 'seq': seq, 'panes': changed})
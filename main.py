@@ -1,15 +1,35 @@
 from fasthtml.common import *
 from fastlite import database
-from langgraph_codegen import gen_graph, gen_nodes, gen_conditions, gen_state
 from code_utils.code_snippet_analyzer import CodeSnippetAnalyzer
+from code_utils import pipeline
+from code_utils.artifacts import ArtifactStore
+from drafts import DraftStore
+from coalesce import RequestCoalescer
+from catalog import Catalog, category_order
+from render_cache import FragmentCache, etag_matches
+from code_utils.codegen_cache import CodegenCache, codegen_cache
+from code_utils.code_snippet_analyzer import analysis_cache
+import assets
+import search
+import validation
+import bulk
+import metrics
+import incremental
+import live
+import workpool
+import json
+import os
+import threading
 import uuid
-import re
+from urllib.parse import urlencode
 
 # Read the README.md file, and set up the database
 with open('README.md') as f: 
     about_md = f.read()
 
-db = database('data/gen_graph.db')
+# GEN_GRAPH_DB points the app at another copy, e.g. for load tests
+DB_PATH = os.environ.get('GEN_GRAPH_DB', 'data/gen_graph.db')
+db = database(DB_PATH)
 
 def before(session):
     if 'sid' not in session:
@@ -18,15 +38,13 @@ def before(session):
 
 
 app, rt = fast_app(
-    db_file='data/gen_graph.db',
+    db_file=DB_PATH,
     hdrs=[
         picolink, 
         MarkdownJS(), 
         HighlightJS(),
-        Link(rel="stylesheet", href="/static/styles.css"),
-        Link(rel="stylesheet", href="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/codemirror.min.css"),
-        Script(src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/codemirror.min.js"),
-        Script(src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/mode/python/python.min.js"),
+        # bundled by build_assets.py, or CodeMirror from the CDN when no build exists
+        *assets.asset_headers(assets.load_manifest()),
         Script("""
         var BASE_URL = window.location.origin;
         """),
@@ -45,93 +63,109 @@ app, rt = fast_app(
             }
         });
         """),
-        Script(src="/static/script.js", defer=True),
     ],
-    before=before  
+    before=before,
+    middleware=[Middleware(metrics.MetricsMiddleware), Middleware(assets.AssetMiddleware)]
 )
-# Function to load all architectures from the database
-def load_architectures() -> dict:
-    architectures = {row['id']: row for row in db.t.arch()}
-    return dict(sorted(architectures.items(), key=lambda item: item[1]['name'].lower()))
-
-def load_imports():
-    imports_dict = {}
-    for import_item in db.t.imports():
-        imports_dict[import_item['what']] = import_item['frm']
-    return imports_dict
-
-# Example usage of load_imports
-imports_dict = load_imports()
-architectures = load_architectures()
+# Architectures, imports and their lookup indexes, reloaded when the arch or imports tables change
+catalog = Catalog(db)
+catalog.start()
+app.add_event_handler('shutdown', catalog.stop)
+
+# Full-text index over the arch table, kept in sync by triggers
+catalog_search = search.CatalogSearch(db)
+
+# Output for unedited catalog architectures, precomputed by precompute.py
+artifacts = ArtifactStore(db)
+
+def catalog_arch(architecture_id: int, graph_spec: str = None) -> dict:
+    arch = catalog.architectures[architecture_id]
+    if graph_spec is None or graph_spec == arch['graph_spec']:
+        artifacts.warm(arch)
+    return arch
+
+# Edited DSL lives per session, the catalog itself is never modified
+drafts = DraftStore(db)
+drafts.start()
+app.add_event_handler('shutdown', drafts.stop)
+
+# Keystroke refreshes are numbered per page by the editor, older ones are dropped once a newer one arrives
+coalescer = RequestCoalescer()
+
+# Codegen and analysis run here, so one huge DSL cannot stall the request threads; a full queue answers 503
+# and a task past 5s of CPU time or 10s of waiting stops at its next phase
+work_pool = workpool.WorkPool(max_workers=4, max_queue=16, timeout=10.0, cpu_budget=5.0)
+app.add_event_handler('shutdown', work_pool.shutdown)
+
+# Bulk generation for /generate, in worker processes started on first use
+bulk_generator = bulk.BulkGenerator()
+app.add_event_handler('shutdown', bulk_generator.shutdown)
+
+# The last parse of each editor's DSL, so a keystroke only re-parses the blocks it changed
+editor_specs = CodegenCache(maxsize=1000)
+
+# One analyzer per editor and architecture, so a request only re-analyzes the snippets it changed
+editor_analyzers = CodegenCache(maxsize=1000)
+
+# Structural findings per DSL, so switching tabs does not check an unchanged spec again
+graph_checks = CodegenCache(maxsize=256)
+
+# Full pages rendered per (route, architecture, DSL, catalog version), revalidated by ETag
+page_cache = FragmentCache(shell=to_xml(tuple(app.hdrs)))
+
+metrics.registry.stats('codegen_cache', "Generated code cache", codegen_cache.stats)
+metrics.registry.stats('analysis_cache', "Snippet analysis cache", analysis_cache.stats)
+metrics.registry.stats('page_cache', "Rendered page cache", page_cache.stats)
+metrics.registry.stats('coalescer', "Editor refresh requests", coalescer.stats)
+metrics.registry.stats('import_blocks', "Import blocks per set of undefined symbols", lambda: catalog.import_resolver.stats())
+metrics.registry.stats('work_pool', "Codegen and analysis work pool", work_pool.stats)
+metrics.registry.stats('fragment_cache', "Generated graph code per node", incremental.fragment_cache.stats)
+metrics.registry.stats('graph_checks', "Structural findings per DSL", graph_checks.stats)
+metrics.registry.stats('editor_analyzers', "Snippet analyzers per editor and architecture", editor_analyzers.stats)
+metrics.registry.stats('catalog_texts', "Architecture READMEs and code read on demand", lambda: catalog.texts.stats())
+
+def cached_page(request: Request, key: tuple, render, *extra):
+    html, etag = page_cache.get((catalog.version,) + key, render)
+    cache_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=cache_headers)
+    return (NotStr(html), *[HttpHeader(k, v) for k, v in cache_headers.items()], *extra)
+
+def session_graph_spec(session, architecture_id: int) -> str:
+    return drafts.get(session['sid'], architecture_id, catalog.architectures[architecture_id]['graph_spec'])
 
 BUTTON_TYPES = ['README', 'STATE', 'NODES', 'CONDITIONS', 'GRAPH', 'REASONING']
 
-def filename_to_url(name: str) -> str:
-    name = name.lower().replace(' ', '-').replace(',', '').replace('(', '').replace(')', '')
-    return re.sub(r'[^a-z0-9-]', '', name)
-
-def get_grouped_architectures(architectures: dict) -> dict:
-    # First pass: collect all categories and their order
-    category_info = {}
-    for arch in architectures.values():
-        raw_category = arch.get('category', 'Uncategorized')
-        parts = raw_category.split('_', 1)
-        
-        if len(parts) == 2 and parts[0].isdigit():
-            order = int(parts[0])
-            category = parts[1]
-        else:
-            order = float('inf')  # Unordered categories go last
-            category = raw_category
-            
-        if category not in category_info:
-            category_info[category] = {
-                'order': order,
-                'architectures': []
-            }
-        category_info[category]['architectures'].append(arch)
-    
-    # Sort categories by order and create final ordered dictionary
-    sorted_categories = sorted(
-        category_info.items(),
-        key=lambda x: (x[1]['order'], x[0].lower())  # Sort by order first, then alphabetically
-    )
-    
-    # Create the final ordered dictionary
-    grouped_architectures = {}
-    for category, info in sorted_categories:
-        grouped_architectures[category] = info['architectures']
-    
-    return grouped_architectures
-
 def GraphArchitecture(selected_example: str = None):
     if selected_example is None:
-        selected_example = next(iter(architectures.keys()))
-
-    grouped_architectures = get_grouped_architectures(architectures)
+        selected_example = catalog.first_id
 
     return Div(
         # Hidden field "architecture_id" identies the currently displayed architecture
         Hidden(selected_example, id="architecture_id", name="architecture_id", hx_swap="outerHTML"),
+        Input(type="search", name="q", placeholder="Search architectures", cls="catalog-search",
+              hx_get="/search", hx_trigger="input changed delay:200ms, search",
+              hx_target="#search-results", hx_swap="outerHTML"),
+        SearchResults(),
         Div(
             *[Details(
                 Summary(category, role="contentinfo", cls="category-summary outline secondary"),
                 Div(
                     *[Div(
                         A(arch['name'],
-                          id=f"example-link-{filename_to_url(arch['name'])}",
+                          id=f"example-link-{catalog.slugs[arch['id']]}",
                           cls=f"example-link{' selected' if arch['id'] == selected_example else ''}",
                           hx_get=f"/architecture/{arch['id']}",
                           hx_target="#dsl",
                           hx_trigger="click, keyup[key=='Enter']",
-                          hx_on="htmx:afterOnLoad: function() { if (typeof update_editor !== 'undefined') { setTimeout(update_editor, 100); } }",
+                          hx_include="#simulation_code_checkbox",
                         ),
                     ) for arch in architectures],
                     cls="category-content",
                 ),
                 cls="architecture-category",
                 open="open"  # Makes the section expanded by default
-            ) for category, architectures in grouped_architectures.items()],
+            ) for category, architectures in catalog.grouped.items()],
             style="padding-top: 10px;"
         ),
         Script("""
@@ -192,34 +226,8 @@ def TitleHeader():
         cls="header-container"
     )
 
-def mk_name(name:str):
-    return name.replace('-', '_').replace(',', '').replace(' ', '_').replace('(', '').replace(')', '').lower()
-
-def generate_code(architecture_id: int, button_type: str, simulation: bool) -> str:
-    arch = architectures[architecture_id]
-    if button_type == 'README':
-        return arch['readme'].strip()
-    if button_type == 'GRAPH':
-        return gen_graph(mk_name(arch['name']), arch['graph_spec']).strip()
-    elif button_type == 'REASONING':
-        # Return a message about selecting a specific reasoning component
-        return "# Select a specific reasoning component (Tools, Data, or LLMs) to view its implementation"
-    elif simulation:
-        simulation_functions = {
-            'STATE': gen_state,
-            'NODES': gen_nodes,
-            'CONDITIONS': gen_conditions,
-            'TOOLS': lambda _: arch['tools'].strip(),
-            'DATA': lambda _: arch['data'].strip(),
-            'LLMS': lambda _: "# LLMs simulation not implemented"
-        }
-        return simulation_functions[button_type](arch['graph_spec']).strip()
-    else:
-        value = arch.get(button_type.lower(), '')
-        if value is not None:
-            return value.strip()
-        else:
-            return ""
+def generate_code(architecture_id: int, button_type: str, simulation: bool, graph_spec: str = None) -> str:
+    return pipeline.generate_code(catalog_arch(architecture_id, graph_spec), button_type, simulation, graph_spec)
 
 
 def CodeGenerationButtons(active_button: str, architecture_id: str, simulation: bool):
@@ -305,6 +313,10 @@ def AnalysisMessages(analysis_messages: list):
             return "Undefined: " + message.split(": ", 1)[1], "error"
         elif message.startswith("Variables defined elsewhere:"):
             return "Defined elsewhere: " + message.split(": ", 1)[1], "info"
+        elif message.startswith(("Timed out:", "Code generation failed:")):
+            return message, "error"
+        elif message.startswith("Line "):
+            return message, "warning"
         else:
             return message, "info"
 
@@ -326,35 +338,36 @@ def GeneratedCode(active_button: str, dsl: str, architecture_id: str, simulation
     )
 
 
-def TheWholeEnchilada(architecture_id: str):
+def TheWholeEnchilada(architecture_id: str, dsl: str = None):
     return Div(
         Div(id="readme_content"),
-        make_form(architecture_id), 
+        make_form(architecture_id, dsl), 
         cls='full-width',
         id='the-whole-enchilada',
         hx_swap_oob='true'
     )
 
-@rt("/")
-def get(session):
-    first_architecture_id = next(iter(architectures.keys()))
-    first_architecture_name = architectures[first_architecture_id]['name']
+def ArchitecturePage(title: str, arch: dict, dsl: str):
     return Main(
-        Title(session.get('title', 'GraphDSL')),  # Use the title from the session
+        Title(title),
         TitleHeader(),
         Div(
-            TheWholeEnchilada(first_architecture_id),
+            TheWholeEnchilada(arch['id'], dsl),
             id="main_content"
         ),
-        Script(f"document.getElementById('current-architecture').textContent = '{first_architecture_name}';"),
+        Script(f"document.getElementById('current-architecture').textContent = '{arch['name']}';"),
         cls='full-width',
     )
 
+@rt("/")
+def get(session, request: Request):
+    arch = catalog.architectures[catalog.first_id]
+    title = session.get('title', 'GraphDSL')  # Use the title from the session
+    dsl = session_graph_spec(session, arch['id'])
+    return cached_page(request, ('index', arch['id'], title, dsl),
+                       lambda: ArchitecturePage(title, arch, dsl))
 
 
-def remove_extra_blank_lines_oneline(lines):
-    lines = lines.split("\n")
-    return "\n".join(re.sub(r'\n\s*\n', '\n\n', '\n'.join(lines)).split('\n'))
 
 @rt("/debug_dsl")
 def get():
@@ -366,13 +379,14 @@ def get():
     </script>
     """
 
-def make_form(example_id: str):
-    initial_dsl = architectures[int(example_id)]['graph_spec']
+def make_form(example_id: str, initial_dsl: str = None):
+    if initial_dsl is None:
+        initial_dsl = catalog.architectures[int(example_id)]['graph_spec']
     
     # Analyze the initial architecture
-    analyzer = analyze_architecture_code(int(example_id))
+    analyzer = analyze_architecture_code(int(example_id), initial_dsl)
     readme_summary = analyzer.get_snippet_summary('readme') or (set(), set(), set())
-    analysis_messages = format_analysis_summary(readme_summary)
+    analysis_messages = graph_messages(initial_dsl) + format_analysis_summary(readme_summary)
     
     return Form()(
         Div(
@@ -383,11 +397,8 @@ def make_form(example_id: str):
                     cls='middle-column'
                 ),
                 GeneratedCode('README', initial_dsl, example_id, False, 
-                             architectures[int(example_id)]['readme'], 
+                             catalog.architectures[int(example_id)]['readme'], 
                              analysis_messages),
-                Script(src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/codemirror.min.js"),
-                Script(src="https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.2/addon/mode/simple.min.js"),
-                Script(src="/static/script.js", defer=True),
                 Script("""
                     document.body.addEventListener('htmx:configRequest', (event) => {
                         ensureEditorInitialized();
@@ -399,6 +410,11 @@ def make_form(example_id: str):
                         }
                         // Include the architecture_id in the request
                         event.detail.parameters['architecture_id'] = document.getElementById('architecture_id').value;
+                        // Number each request so the server can drop superseded refreshes
+                        window.pageToken = window.pageToken || Math.random().toString(36).slice(2);
+                        window.requestSeq = (window.requestSeq || 0) + 1;
+                        event.detail.parameters['page'] = window.pageToken;
+                        event.detail.parameters['seq'] = window.requestSeq;
                     });
 
                     // Wait for the editor to be ready before allowing HTMX requests
@@ -436,178 +452,282 @@ def CodeGenerationContent(active_button: str, architecture_id: str, simulation:
         return Div(Pre(Code(content, cls='language-python'), id=f"{active_button.lower()}-code"),
                    cls=f'tab-content active')
 
-@rt("/get_code/{button_type}")
-def post(button_type: str, dsl: str, architecture_id: str, simulation_code: str = "false"):
-    simulation = simulation_code == "on" and button_type != 'GRAPH'
-    skip_imports = button_type == 'GRAPH'
-    
-    # Update the architecture's graph_spec with the new DSL
-    architectures[int(architecture_id)]['graph_spec'] = dsl
-    
-    code = generate_code(int(architecture_id), button_type.upper(), simulation)
+def catalog_spec(arch_id: int, dsl: str) -> tuple:
+    # (spec to generate from, edited?); the browser may trim the text, so whitespace around it is not an edit
+    spec = catalog.architectures[arch_id]['graph_spec'] or ''
+    if dsl.strip() == spec.strip():
+        return spec, False
+    return dsl, True
+
+def edited_code(editor_key: str, route: str, button_type: str, dsl: str, arch_id: int, simulation: bool,
+                edited: bool) -> str:
+    if edited:
+        # Generate the edited graph code from re-parsed blocks only, later steps find it in the codegen cache
+        with metrics.phase(route, 'parse'):
+            editor = editor_specs.get_or_compute(editor_key, incremental.IncrementalSpec)
+            incremental.gen_graph(pipeline.mk_name(catalog.architectures[arch_id]['name']), dsl, editor)
     
-    # Get the analysis for this architecture
-    analyzer = analyze_architecture_code(int(architecture_id))
-    
-    # Get the summary for this specific snippet
+    with metrics.phase(route, 'codegen'):
+        return generate_code(arch_id, button_type.upper(), simulation, dsl)
+
+def remember_draft(session, arch_id: int, dsl: str, edited: bool):
+    # Keep the DSL as this session's draft only while it differs from the catalog
+    if edited:
+        drafts.put(session['sid'], arch_id, dsl)
+    elif drafts.get(session['sid'], arch_id) is not None:
+        drafts.discard(session['sid'], arch_id)
+
+
+def analyzed_code(route: str, button_type: str, dsl: str, arch_id: int, simulation: bool, code: str,
+                  editor_key: str) -> tuple:
     snippet_name = button_type.lower()
     if simulation and snippet_name in ['state', 'nodes', 'conditions']:
         snippet_name = f"{snippet_name}_simulation"
-    summary = analyzer.get_snippet_summary(snippet_name)
+
+    # Update this editor's analysis of the architecture and get the summary for this specific snippet
+    with metrics.phase(route, 'analysis'):
+        lock, analyzer = editor_analyzers.get_or_compute(f"{editor_key}:{arch_id}",
+                                                         lambda: (threading.Lock(), CodeSnippetAnalyzer()))
+        with lock:
+            analyze_architecture_code(arch_id, dsl, analyzer)
+            summary = analyzer.get_snippet_summary(snippet_name)
     
     if summary:
-        defined, undefined, defined_elsewhere = summary
-        imported_vars = set(var for var in undefined if var in imports_dict)
-        direct_imports = sorted([f"import {var}" for var in undefined if not imports_dict.get(var, False)])
-        imports = sorted([f"from {imports_dict[var]} import {var} " for var in undefined if imports_dict.get(var, False)])
-        
-        # Remove imported variables from the undefined set
-        undefined = undefined - imported_vars
-        
-        # Create updated summary tuple
-        updated_summary = (defined, undefined, defined_elsewhere)
-        
-        if not skip_imports:
-            code = "\n".join(direct_imports) + "\n\n" + "\n".join(imports) + "\n\n" + code
-        code = remove_extra_blank_lines_oneline(code.strip())
-        analysis_messages = format_analysis_summary(updated_summary)
-    else:
-        analysis_messages = []
-    
-    return GeneratedCode(button_type.upper(), dsl, architecture_id, simulation, code, analysis_messages)
+        with metrics.phase(route, 'imports'):
+            code, updated_summary = pipeline.add_imports(code, summary, catalog.import_resolver, button_type == 'GRAPH')
+        return code, format_analysis_summary(updated_summary)
+    return code, []
+
+
+def graph_messages(dsl: str, editor_key: str = None) -> list:
+    # Structural problems of the graph as messages, checked on the editor's incremental parse when there is one
+    def check():
+        if editor_key is None:
+            return validation.check_spec(dsl)
+        return editor_specs.get_or_compute(editor_key, incremental.IncrementalSpec).check(dsl)
+    findings = graph_checks.get_or_compute(codegen_cache.make_key('check_ops', '', dsl), check)
+    return [f"Line {lineno}: {message}" for lineno, message in findings]
+
+
+def code_and_analysis(session, editor_key: str, route: str, button_type: str, dsl: str, arch_id: int,
+                      simulation: bool, seq: int = None):
+    # Runs in the work pool; None when a newer refresh from the same editor superseded this one
+    if not coalescer.is_current(editor_key, seq):
+        # overtaken while it waited in the queue
+        return None
+    spec, edited = catalog_spec(arch_id, dsl)
+    with metrics.phase(route, 'validation'):
+        messages = graph_messages(dsl, editor_key)
+    # a task over its budget stops between phases, never part way through one
+    workpool.checkpoint()
+    try:
+        code, failure = edited_code(editor_key, route, button_type, spec, arch_id, simulation, edited), None
+    except Exception as e:
+        # langgraph_codegen gives up on some broken specs, the findings above say what is wrong
+        code, failure = "", f"Code generation failed: {type(e).__name__}: {e}"
+    if not coalescer.is_current(editor_key, seq):
+        return None
+    # only the newest refresh may write the draft, a superseded one would overwrite newer text
+    remember_draft(session, arch_id, spec, edited)
+    if failure is not None:
+        return code, messages + [failure]
+    workpool.checkpoint()
+    code, analysis_messages = analyzed_code(route, button_type, spec, arch_id, simulation, code, editor_key)
+    return code, messages + analysis_messages
+
+
+def overloaded_response():
+    return Response("Server busy, please retry", status_code=503, headers={'Retry-After': '1'})
+
+
+@rt("/get_code/{button_type}")
+async def post(session, button_type: str, dsl: str, architecture_id: str, simulation_code: str = "false",
+               seq: int = None, page: str = ""):
+    # A newer refresh from this page is already queued or running
+    editor_key = f"{session['sid']}:{page}"
+    if not coalescer.begin(editor_key, seq):
+        return Response(status_code=204)
+
+    route = '/get_code/{button_type}'
+    simulation = simulation_code == "on" and button_type != 'GRAPH'
+    arch_id = int(architecture_id)
+    try:
+        try:
+            result = await work_pool.run(code_and_analysis, session, editor_key, route, button_type, dsl, arch_id,
+                                         simulation, seq)
+        except workpool.Overloaded:
+            return overloaded_response()
+        except workpool.TimedOut as e:
+            result = "", [f"Timed out: code generation {e}"]
+        if result is None:
+            return Response(status_code=204)
+        code, analysis_messages = result
+        with metrics.phase(route, 'render'):
+            return GeneratedCode(button_type.upper(), dsl, architecture_id, simulation, code, analysis_messages)
+    finally:
+        # every request begin() let through is finished, however it ends
+        coalescer.finish()
+
+
+@app.ws('/live')
+async def live_preview(ws, button_type: str, dsl: str, architecture_id: str, simulation_code: str = "false",
+                       seq: int = None, page: str = "", ack: int = None):
+    # One connection per editor page: push only the panes of #code-generation-ui that changed
+    # since the version the client acknowledged as applied
+    session = ws.scope['session']
+    before(session)
+    panes = ws.scope.setdefault('live_panes', live.LivePanes())
+    route = '/live'
+    button_type = button_type.upper()
+    simulation = simulation_code == "on" and button_type != 'GRAPH'
+    arch_id = int(architecture_id)
+    try:
+        code, analysis_messages = await work_pool.run(code_and_analysis, session, f"{session['sid']}:{page}", route,
+                                                      button_type, dsl, arch_id, simulation)
+    except workpool.Overloaded:
+        return json.dumps({'seq': seq, 'busy': True})
+    except workpool.TimedOut as e:
+        code, analysis_messages = "", [f"Timed out: code generation {e}"]
+    with metrics.phase(route, 'render'):
+        return panes.message({
+            'buttons': ((button_type, architecture_id, simulation),
+                        lambda: CodeGenerationButtons(button_type, architecture_id, simulation)),
+            'content': ((button_type, code),
+                        lambda: CodeGenerationContent(button_type, architecture_id, simulation, code)),
+            'messages': (tuple(analysis_messages), lambda: AnalysisMessages(analysis_messages)),
+        }, seq, ack)
+
+
+@rt("/generate")
+async def post(request: Request):
+    # NDJSON batch of {"name", "graph_spec"} specs in, one NDJSON record per spec out as each finishes
+    lines = bulk.ndjson_lines(await bulk.spool(request.stream()))
+    return StreamingResponse(bulk_generator.stream(lines, catalog.imports), media_type='application/x-ndjson')
+
+
+SEARCH_PAGE_SIZE = 10
+
+def highlighted(snippet: str) -> list:
+    # snippet text with the matches wrapped in <mark>, whitespace collapsed to one line
+    parts = []
+    for i, part in enumerate(' '.join(snippet.split()).split(search.MATCH_START)):
+        match, _, rest = part.partition(search.MATCH_END) if i else ('', '', part)
+        parts += [Mark(match)] if match else []
+        parts += [rest] if rest else []
+    return parts
+
+def SearchResults(q: str = '', page: int = 1):
+    if not q.strip():
+        return Div(id="search-results")
+    results, total = catalog_search.search(q, page, SEARCH_PAGE_SIZE)
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    page_link = lambda label, n: A(label, hx_get=f"/search?{urlencode({'q': q, 'page': n})}",
+                                   hx_target="#search-results", hx_swap="outerHTML", cls="search-page")
+    return Div(
+        Small(f"{total} result{'' if total == 1 else 's'}" + (f", page {page} of {pages}" if pages > 1 else '')),
+        *[Div(
+            A(result['name'],
+              cls="example-link search-result",
+              hx_get=f"/architecture/{result['id']}",
+              hx_target="#dsl",
+              hx_include="#simulation_code_checkbox",
+            ),
+            Small(category_order(result['category'] or 'Uncategorized')[1], ' · ', *highlighted(result['snippet']),
+                  cls="search-snippet"),
+        ) for result in results],
+        Div(page_link("Previous", page - 1) if page > 1 else '',
+            page_link("Next", page + 1) if page < pages else '', cls="search-pages"),
+        id="search-results",
+    )
+
+@rt("/search")
+def get(q: str = '', page: int = 1):
+    # Ranked prefix search over names, categories, READMEs, graph specs and code
+    return SearchResults(q, max(page, 1))
 
 
+@rt("/equivalents")
+def post(dsl: str):
+    # Catalog architectures with the same graph structure as the DSL, looked up by fingerprint
+    try:
+        matches = catalog.equivalents(dsl)
+    except ValueError:
+        matches = []
+    return Div(
+        *[A(arch['name'], href=f"/graph/{catalog.slugs[arch['id']]}", cls="example-link") for arch in matches]
+        or [P("No equivalent architectures")],
+        id="equivalents"
+    )
+
+
+@rt("/metrics")
+def get():
+    return Response(metrics.registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def ArchitectureSwitch(session, route: str, arch: dict, dsl: str, simulation: bool):
+    # One response per switch: the DSL for #dsl, the README pane out of band, and an event
+    # the client handles by moving the `selected` class and loading the DSL into the editor
+    arch_id = arch['id']
+    try:
+        code, analysis_messages = work_pool.call(code_and_analysis, session, f"{session['sid']}:", route, 'README',
+                                                 dsl, arch_id, simulation)
+    except workpool.TimedOut as e:
+        code, analysis_messages = "", [f"Timed out: code generation {e}"]
+    switched = {'id': arch_id, 'slug': catalog.slugs[arch_id], 'name': arch['name']}
+    return (
+        dsl,
+        Hidden(arch_id, id="architecture_id", hx_swap_oob="true"),
+        GeneratedCode('README', dsl, arch_id, simulation, code, analysis_messages)(hx_swap_oob="true"),
+        HtmxResponseHeaders(trigger_after_settle=json.dumps({'architectureSwitched': switched})),
+    )
+
 @rt("/architecture/{arch_id}")
-def get(arch_id: int, request: Request):
-    arch = architectures.get(arch_id)
+def get(session, arch_id: int, request: Request, simulation_code: str = "false"):
+    arch = catalog.get(arch_id)
     if arch is None:
         raise HTTPException(status_code=404, detail="Architecture not found")
+    dsl = session_graph_spec(session, arch_id)
     
     # Check if it's an HTMX request
     if "HX-Request" in request.headers:
         # This is a partial update request
-        return (
-            arch['graph_spec'].strip(), 
-            GraphArchitecture(arch_id),
-            Script(f"""
-                var currentArch = document.getElementById('current-architecture');
-                currentArch.textContent = '{arch['name']}';
-                currentArch.style.opacity = '0';
-                setTimeout(() => {{
-                    currentArch.style.opacity = '1';
-                }}, 50);
-                document.getElementById('architecture_id').value = '{arch_id}';
-                var dslElement = document.getElementById('dsl');
-                if (dslElement) {{
-                    dslElement.value = `{arch['graph_spec'].strip()}`;
-                    if (window.editor) {{
-                        window.editor.setValue(dslElement.value);
-                        window.editor.refresh();
-                    }}
-                }}
-                htmx.ajax('POST', '/get_code/README', {{
-                    target: '#code-generation-ui',
-                    swap: 'outerHTML',
-                    values: {{
-                        'dsl': dslElement.value,
-                        'architecture_id': '{arch_id}',
-                        'simulation_code': document.getElementById('simulation_code_checkbox').checked ? 'on' : 'off'
-                    }}
-                }});
-            """)
-        ), HtmxResponseHeaders(push_url=f"/graph/{filename_to_url(arch['name'])}")
+        try:
+            switch = ArchitectureSwitch(session, '/architecture/{arch_id}', arch, dsl, simulation_code == "on")
+        except workpool.Overloaded:
+            return overloaded_response()
+        return switch, HtmxResponseHeaders(push_url=f"/graph/{catalog.slugs[arch_id]}")
     else:
         # This is a full page request
-        return Main(
-            Title(f"LangGraph Architectures - {arch['name']}"),
-            TitleHeader(),
-            Div(
-                TheWholeEnchilada(arch_id),
-                id="main_content"
-            ),
-            Script(f"document.getElementById('current-architecture').textContent = '{arch['name']}';"),
-            cls='full-width',
-        )
-
-
-def analyze_architecture_code(architecture_id: int) -> CodeSnippetAnalyzer:
-    arch = architectures[architecture_id]
-    
-    if arch is None:
-        raise ValueError(f"Architecture with id {architecture_id} not found")
-
-    analyzer = CodeSnippetAnalyzer()
-
-    # Analyze each code snippet
-    for field in ['state', 'nodes', 'conditions', 'tools', 'data', 'llms']:
-        fv = arch.get(field, '')
-        if fv is not None:
-            code = fv.strip()
-            if code:
-                analyzer.add_snippet(field, code)
-
-    # Generate and analyze graph code
-    graph_code = gen_graph(mk_name(arch['name']), arch['graph_spec']).strip()
-    analyzer.add_snippet('graph', graph_code)
+        return cached_page(request, ('architecture', arch_id, dsl),
+                           lambda: ArchitecturePage(f"LangGraph Architectures - {arch['name']}", arch, dsl))
 
-    # Perform analysis on all snippets
-    analyzer.analyze_all_snippets()
 
-    return analyzer
+def analyze_architecture_code(architecture_id: int, graph_spec: str = None,
+                              analyzer: CodeSnippetAnalyzer = None) -> CodeSnippetAnalyzer:
+    return pipeline.analyze_architecture_code(catalog_arch(architecture_id, graph_spec), graph_spec, analyzer)
 
 @rt("/graph/{architecture_name}")
-def get(architecture_name: str, request: Request):
-    # Find the architecture by name
-    arch = next((a for a in architectures.values() if filename_to_url(a['name']) == architecture_name), None)
+def get(session, architecture_name: str, request: Request, simulation_code: str = "false"):
+    # Find the architecture by its URL slug
+    arch = catalog.by_slug(architecture_name)
     if arch is None:
         raise HTTPException(status_code=404, detail="Architecture not found")
     
     arch_id = arch['id']
+    dsl = session_graph_spec(session, arch_id)
     
     # Check if it's an HTMX request
     if "HX-Request" in request.headers:
         # This is a partial update request
-        return (
-            arch['graph_spec'].strip(), 
-            GraphArchitecture(arch_id),
-            Script(f"""
-                var currentArch = document.getElementById('current-architecture');
-                currentArch.textContent = '{arch['name']}';
-                currentArch.style.opacity = '0';
-                setTimeout(() => {{
-                    currentArch.style.opacity = '1';
-                }}, 50);
-                document.getElementById('architecture_id').value = '{arch_id}';
-                var dslElement = document.getElementById('dsl');
-                if (dslElement) {{
-                    dslElement.value = `{arch['graph_spec'].strip()}`;
-                    if (window.editor) {{
-                        window.editor.setValue(dslElement.value);
-                        window.editor.refresh();
-                    }}
-                }}
-                htmx.ajax('POST', '/get_code/README', {{
-                    target: '#code-generation-ui',
-                    swap: 'outerHTML',
-                    values: {{
-                        'dsl': dslElement.value,
-                        'architecture_id': '{arch_id}',
-                        'simulation_code': document.getElementById('simulation_code_checkbox').checked ? 'on' : 'off'
-                    }}
-                }});
-            """)
-        )
+        try:
+            return ArchitectureSwitch(session, '/graph/{architecture_name}', arch, dsl, simulation_code == "on")
+        except workpool.Overloaded:
+            return overloaded_response()
     else:
         # This is a full page request
-        return Main(
-            Title(f"LangGraph Architectures - {arch['name']}"),
-            TitleHeader(),
-            Div(
-                TheWholeEnchilada(arch_id),
-                id="main_content"
-            ),
-            Script(f"document.getElementById('current-architecture').textContent = '{arch['name']}';"),
-            cls='full-width',
-        ), HtmxResponseHeaders(push_url=f"/graph/{architecture_name}")
+        return cached_page(request, ('architecture', arch_id, dsl),
+                           lambda: ArchitecturePage(f"LangGraph Architectures - {arch['name']}", arch, dsl),
+                           HtmxResponseHeaders(push_url=f"/graph/{architecture_name}"))
 
 serve()
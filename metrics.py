@@ -0,0 +1,139 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-second generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values) -> str:
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _format_labels(self.labelnames + ('le',), labels + (repr(bound),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames + ('le',), labels + ('+Inf',))
+            lines.append(f"{self.name}_bucket{le} {values[-1]}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {values[-2]}")
+            lines.append(f"{self.name}_count{plain} {values[-1]}")
+        return lines
+
+
+class StatsGauge:
+    # exposes a component's stats() dict, one gauge per key
+    def __init__(self, name: str, help: str, stats):
+        self.name = name
+        self.help = help
+        self.stats = stats
+
+    def render(self) -> list:
+        lines = []
+        for key, value in self.stats().items():
+            if isinstance(value, (int, float)):
+                lines += [f"# HELP {self.name}_{key} {self.help}: {key}",
+                          f"# TYPE {self.name}_{key} gauge",
+                          f"{self.name}_{key} {value}"]
+        return lines
+
+
+class Registry:
+    def __init__(self, prefix: str = 'gen_graph'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(f"{self.prefix}_{name}", help, labelnames, buckets))
+
+    def stats(self, name: str, help: str, stats) -> StatsGauge:
+        return self._add(StatsGauge(f"{self.prefix}_{name}", help, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+request_seconds = registry.histogram('request_seconds', "HTTP request latency by route", ['method', 'route', 'status'])
+phase_seconds = registry.histogram('phase_seconds', "Time spent in each phase of a request", ['route', 'phase'])
+
+def phase(route: str, name: str):
+    return phase_seconds.time(route, name)
+
+
+def route_template(scope) -> str:
+    # after routing, scope['endpoint'] is the matched route's endpoint
+    route = getattr(scope.get('endpoint'), '__self__', None)
+    return getattr(route, 'path', None) or 'unmatched'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency and status of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_seconds.observe(time.perf_counter() - start, scope['method'], route_template(scope), status[0])
@@ -0,0 +1,41 @@
+"""Precompute generated code and analysis for every catalog architecture.
+
+    python precompute.py [--db data/gen_graph.db] [--workers N] [--force] [--prune]
+
+Records are stored in the `artifacts` table keyed by spec hash and generator
+version, and the web app serves unedited architectures from them.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastlite import database
+
+from code_utils.artifacts import ArtifactStore, compute_artifacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='data/gen_graph.db')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--force', action='store_true', help="recompute records that already exist")
+    parser.add_argument('--prune', action='store_true', help="delete stale records")
+    args = parser.parse_args()
+
+    db = database(args.db)
+    store = ArtifactStore(db)
+    archs = [arch for arch in db.t.arch() if args.force or not store.has(arch)]
+
+    start = time.perf_counter()
+    if archs:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            records = list(pool.map(compute_artifacts, archs, chunksize=8))
+        store.put_many(records)
+    if args.prune:
+        store.prune()
+    print(f"precomputed {len(archs)} architectures for {store.generator_version} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
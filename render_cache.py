@@ -0,0 +1,41 @@
+import hashlib
+
+from fastcore.xml import to_xml
+
+from code_utils.codegen_cache import CodegenCache
+
+
+class FragmentCache:
+    """Rendered HTML fragments with strong ETags.
+
+    `key` must capture everything the fragment depends on (architecture id,
+    selected state, DSL, catalog version).  `shell` identifies the page around
+    the fragment (headers, scripts), so a deploy that changes it also changes
+    every ETag.
+    """
+
+    def __init__(self, shell: str = '', maxsize: int = 256):
+        self.shell = hashlib.sha256(shell.encode('utf-8')).hexdigest()
+        self._cache = CodegenCache(maxsize=maxsize)
+
+    def get(self, key: tuple, render) -> tuple:
+        cache_key = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return self._cache.get_or_compute(cache_key, self._render, render)
+
+    def _render(self, render):
+        html = to_xml(render())
+        etag = hashlib.sha256(f"{self.shell}\0{html}".encode('utf-8')).hexdigest()[:32]
+        return html, f'"{etag}"'
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return etag in candidates
@@ -0,0 +1,82 @@
+import re
+
+# Full-text search over the `arch` table: an external-content FTS5 index kept
+# in sync by triggers, so the text lives only once in the database.  The graph
+# spec is indexed with `_` as a token character, which makes node and
+# condition names like `call_tool` single searchable terms.
+
+SEARCH_FIELDS = ['name', 'category', 'graph_spec', 'readme', 'state', 'nodes', 'conditions', 'tools', 'data', 'llms']
+
+# bm25 column weights, a hit in the name counts most
+WEIGHTS = {'name': 10.0, 'category': 4.0, 'graph_spec': 3.0, 'readme': 1.0}
+CODE_WEIGHT = 0.5
+
+# snippet() highlight markers, turned into markup by the caller
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+TRIGGERS = ['arch_fts_insert', 'arch_fts_delete', 'arch_fts_update']
+
+
+def match_query(text: str) -> str:
+    """An FTS5 query matching rows that contain every word of `text` as a prefix, '' for no words."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+class CatalogSearch:
+    """Ranked, paginated prefix search over the architecture catalog.
+
+    The `arch_fts` index covers whichever of SEARCH_FIELDS the `arch` table
+    has.  It is rebuilt when it is created or its columns no longer match,
+    and triggers on `arch` keep it current after that.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        columns = set(self.db.t.arch.columns_dict)
+        self.fields = [field for field in SEARCH_FIELDS if field in columns]
+        indexed = [row['name'] for row in self.db.q("PRAGMA table_info(arch_fts)")]
+        if indexed != self.fields:
+            self._create()
+
+    def _create(self):
+        cols = ', '.join(self.fields)
+        new = ', '.join(f'new.{field}' for field in self.fields)
+        old = ', '.join(f'old.{field}' for field in self.fields)
+        for trigger in TRIGGERS:
+            self.db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        self.db.execute("DROP TABLE IF EXISTS arch_fts")
+        self.db.execute(f"""CREATE VIRTUAL TABLE arch_fts USING fts5(
+            {cols}, content='arch', content_rowid='id', tokenize="unicode61 tokenchars '_'")""")
+        self.db.execute(f"""CREATE TRIGGER arch_fts_insert AFTER INSERT ON arch BEGIN
+            INSERT INTO arch_fts (rowid, {cols}) VALUES (new.id, {new});
+        END""")
+        self.db.execute(f"""CREATE TRIGGER arch_fts_delete AFTER DELETE ON arch BEGIN
+            INSERT INTO arch_fts (arch_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+        END""")
+        self.db.execute(f"""CREATE TRIGGER arch_fts_update AFTER UPDATE ON arch BEGIN
+            INSERT INTO arch_fts (arch_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+            INSERT INTO arch_fts (rowid, {cols}) VALUES (new.id, {new});
+        END""")
+        self.rebuild()
+
+    def rebuild(self):
+        self.db.execute("INSERT INTO arch_fts (arch_fts) VALUES ('rebuild')")
+
+    def search(self, text: str, page: int = 1, per_page: int = 10) -> tuple:
+        """(results, total matches) for one page of `text`, best matches first.
+
+        Each result has the architecture's id, name and category and a snippet
+        of its best matching column with matches between MATCH_START and MATCH_END.
+        """
+        query = match_query(text)
+        if not query:
+            return [], 0
+        total = self.db.q("SELECT count(*) AS n FROM arch_fts WHERE arch_fts MATCH ?", [query])[0]['n']
+        weights = ', '.join(str(WEIGHTS.get(field, CODE_WEIGHT)) for field in self.fields)
+        results = self.db.q(f"""
+            SELECT rowid AS id, name, category,
+                   snippet(arch_fts, -1, ?, ?, '…', 12) AS snippet
+            FROM arch_fts WHERE arch_fts MATCH ?
+            ORDER BY bm25(arch_fts, {weights}), rowid
+            LIMIT ? OFFSET ?""", [MATCH_START, MATCH_END, query, per_page, (max(page, 1) - 1) * per_page])
+        return results, total
@@ -124,8 +124,15 @@ function update_editor() {
 // Initialize CodeMirror when the page loads
 document.addEventListener('DOMContentLoaded', ensureEditorInitialized);
 
-// Update editor after HTMX content swaps
-document.body.addEventListener('htmx:afterSwap', update_editor);
+// Update editor after HTMX content swaps.  An architecture switch swaps #dsl and loads the
+// editor in its architectureSwitched handler below; refreshing here as well would send another
+// /get_code with the previous architecture's text still in the editor.
+document.body.addEventListener('htmx:afterSwap', function(event) {
+    // A swap inside the panes leaves them matching no live preview version, ask for all of them
+    if (event.detail.target && event.detail.target.closest('#code-generation-ui')) liveVersion = 0;
+    if (event.detail.target && event.detail.target.id === 'dsl') return;
+    update_editor();
+});
 
 // Refresh editor after HTMX settles
 document.body.addEventListener('htmx:afterSettle', function(event) {
@@ -175,4 +182,113 @@ document.addEventListener('htmx:afterSettle', function(event) {
         console.log('Tab changed, refreshing CodeMirror');
         refreshCodeMirror();
     }
-});
\ No newline at end of file
+});
+// Optional live preview: while a socket to /live is open, DSL edits are sent over it
+// and the server pushes back only the panes of #code-generation-ui that changed.
+// Without it (or after it closes) the HTMX requests above keep working as before.
+let liveSocket = null;
+let liveTimer = null;
+let liveVersion = 0;
+const livePanes = {
+    buttons: '#code-generation-buttons',
+    content: '.tab-content',
+    messages: '.message-area'
+};
+
+function activeButtonType() {
+    const active = document.querySelector('#code-generation-buttons .sub-button.active') ||
+                   document.querySelector('#code-generation-buttons .main-buttons .active');
+    return active ? active.id.replace('_button', '').toUpperCase() : 'README';
+}
+
+function sendLiveUpdate() {
+    if (!liveSocket || liveSocket.readyState !== WebSocket.OPEN || !window.editor) return;
+    const simulation = document.getElementById('simulation_code_checkbox');
+    window.pageToken = window.pageToken || Math.random().toString(36).slice(2);
+    window.requestSeq = (window.requestSeq || 0) + 1;
+    liveSocket.send(JSON.stringify({
+        button_type: activeButtonType(),
+        dsl: window.editor.getValue(),
+        architecture_id: document.getElementById('architecture_id').value,
+        simulation_code: simulation && simulation.checked ? 'on' : 'false',
+        page: window.pageToken,
+        seq: window.requestSeq,
+        ack: liveVersion
+    }));
+}
+
+function applyLivePanes(update) {
+    // A busy server sends no panes, the next edit tries again
+    if (!update.panes) return;
+    // Frames arrive in order, skip the ones a newer edit has already superseded.  liveVersion
+    // stays at the last frame applied and goes with the next edit, so the server sends again
+    // whatever a skipped frame carried.
+    if (update.seq !== window.requestSeq || update.version <= liveVersion) return;
+    liveVersion = update.version;
+    const container = document.getElementById('code-generation-ui');
+    Object.entries(update.panes).forEach(([name, html]) => {
+        const current = container && container.querySelector(livePanes[name]);
+        if (!current) return;
+        const template = document.createElement('template');
+        template.innerHTML = html;
+        const replacement = template.content.firstElementChild;
+        current.replaceWith(replacement);
+        htmx.process(replacement);
+        htmx.trigger(replacement, 'htmx:load');
+        if (name === 'content') {
+            const textarea = replacement.querySelector('textarea.code-editor');
+            if (textarea) initializeCodeMirror(textarea.id.replace('-code-editor', ''));
+        }
+    });
+}
+
+function connectLivePreview() {
+    const scheme = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${scheme}//${window.location.host}/live`);
+    socket.onmessage = (event) => applyLivePanes(JSON.parse(event.data));
+    socket.onclose = () => { if (liveSocket === socket) liveSocket = null; };
+    liveSocket = socket;
+    liveVersion = 0;
+}
+
+function startLivePreview() {
+    if (!window.WebSocket || liveSocket || !window.editor) return;
+    connectLivePreview();
+    window.editor.on('change', function() {
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(sendLiveUpdate, 150);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', startLivePreview);
+
+// Switching architectures is one request: its response puts the DSL into #dsl and the
+// README pane out of band, then triggers this event to move the selection and load the editor
+document.body.addEventListener('architectureSwitched', function(event) {
+    const detail = event.detail;
+    document.querySelectorAll('.example-link.selected').forEach(link => link.classList.remove('selected'));
+    const link = document.getElementById(`example-link-${detail.slug}`);
+    if (link) link.classList.add('selected');
+
+    const currentArch = document.getElementById('current-architecture');
+    if (currentArch) {
+        currentArch.textContent = detail.name;
+        currentArch.style.opacity = '0';
+        setTimeout(() => { currentArch.style.opacity = '1'; }, 50);
+    }
+
+    // The swap only changed the textarea's default value
+    const dslElement = document.getElementById('dsl');
+    dslElement.value = dslElement.defaultValue;
+    ensureEditorInitialized();
+    if (window.editor) {
+        window.editor.setValue(dslElement.value);
+        window.editor.refresh();
+    }
+    // The README pane is already current, and a live preview connection starts over
+    clearTimeout(liveTimer);
+    if (liveSocket) {
+        liveSocket.close();
+        connectLivePreview();
+    }
+});
@@ -7,19 +7,19 @@ def analyzer():
 
 def test_simple_assignment(analyzer):
     code = "x = 5"
-    assert analyzer.analyze_code(code) == ({'x'}, set())
+    assert analyzer.analyze_code(code) == ({'x'}, set(), set(), [])
 
 def test_multiple_assignments(analyzer):
     code = "x = y = z = 10"
-    assert analyzer.analyze_code(code) == ({'x', 'y', 'z'}, set())
+    assert analyzer.analyze_code(code) == ({'x', 'y', 'z'}, set(), set(), [])
 
 def test_variable_usage(analyzer):
     code = "x = 5\ny = x + 10"
-    assert analyzer.analyze_code(code) == ({'x', 'y'}, {'x'})
+    assert analyzer.analyze_code(code) == ({'x', 'y'}, {'x'}, set(), [])
 
 def test_undefined_variable(analyzer):
     code = "y = x + 10"
-    assert analyzer.analyze_code(code) == ({'y'}, {'x'})
+    assert analyzer.analyze_code(code) == ({'y'}, {'x'}, {'x'}, [])
 
 def test_function_definition(analyzer):
     code = """
@@ -27,7 +27,7 @@ def foo(a, b):
     return a + b
 x = foo(1, 2)
 """
-    assert analyzer.analyze_code(code) == ({'a', 'b', 'foo', 'x'}, {'foo', 'a', 'b'})
+    assert analyzer.analyze_code(code) == ({'foo', 'x'}, {'foo'}, set(), [])
 
 def test_function_with_undefined_variable(analyzer):
     code = """
@@ -35,7 +35,7 @@ def foo(a):
     return a + b
 x = foo(1)
 """
-    assert analyzer.analyze_code(code) == ({'a', 'foo', 'x'}, {'a', 'b', 'foo'})
+    assert analyzer.analyze_code(code) == ({'foo', 'x'}, {'b', 'foo'}, {'b'}, [])
 
 def test_complex_scenario(analyzer):
     code = """
@@ -45,12 +45,11 @@ def foo(a):
     return y + z
 result = foo(5)
 """
-    result = analyzer.analyze_code(code)
-    assert analyzer.analyze_code(code) == ({'result', 'foo', 'x', 'y', 'a'}, {'foo', 'x', 'y', 'z', 'a'})
+    assert analyzer.analyze_code(code) == ({'result', 'foo', 'x'}, {'foo', 'x', 'z'}, {'z'}, [])
 
 def test_import_statement(analyzer):
     code = "import math\nx = math.pi"
-    assert analyzer.analyze_code(code) == ({'math', 'x'}, {'math'})
+    assert analyzer.analyze_code(code) == ({'math', 'x'}, {'math'}, set(), [])
 
 def test_class_definition(analyzer):
     code = """
@@ -63,16 +62,15 @@ class MyClass:
 
 obj = MyClass(10)
 """
-    assert analyzer.analyze_code(code) == ({'MyClass', '__init__', 'method', 'obj', 'self', 'x'}, 
-                                           {'self', 'MyClass', 'x', 'y'})
+    assert analyzer.analyze_code(code) == ({'MyClass', 'obj'}, {'MyClass', 'y'}, {'y'}, [])
 
 def test_list_comprehension(analyzer):
     code = "[x for x in range(10) if x > y]"
-    assert analyzer.analyze_code(code) == ({'x'}, {'y', 'x', 'range'})
+    assert analyzer.analyze_code(code) == (set(), {'y', 'range'}, {'y'}, [])
 
 def test_invalid_syntax(analyzer):
     code = "x = "
-    assert analyzer.analyze_code(code) == (set(), set())
+    assert analyzer.analyze_code(code) == (set(), set(), set(), [])
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,98 @@
+import pytest
+from fastlite import database
+from code_utils.artifacts import ArtifactStore, compute_artifacts, spec_hash
+from code_utils.codegen_cache import codegen_cache
+from code_utils.code_snippet_analyzer import analysis_cache
+from code_utils import pipeline
+
+ARCH = dict(id=1, name='Tiny Agent', category='Examples', readme='# Tiny',
+            graph_spec="START(State) => agent\n\nagent\n  should_stop => END\n  => agent\n",
+            state="class State(TypedDict):\n    count: int",
+            nodes="def agent(state: State):\n    return {'count': state['count'] + 1}",
+            conditions="def should_stop(state: State):\n    return state['count'] > 3",
+            tools=None, data=None, llms=None)
+
+@pytest.fixture
+def db(tmp_path):
+    db = database(tmp_path / 'artifacts.db')
+    db.t.arch.insert(ARCH, pk='id')
+    return db
+
+def test_spec_hash_covers_code_fields():
+    assert spec_hash(ARCH) == spec_hash(dict(ARCH))
+    assert spec_hash(ARCH) != spec_hash({**ARCH, 'graph_spec': ARCH['graph_spec'] + '\n'})
+    assert spec_hash(ARCH) != spec_hash({**ARCH, 'nodes': 'x = 1'})
+
+def test_compute_artifacts_matches_pipeline():
+    record = compute_artifacts(ARCH)
+    graph_code = pipeline.generate_code(ARCH, 'GRAPH', False)
+    assert any(code.strip() == graph_code for code in record['codegen'].values())
+    analyzer = pipeline.analyze_architecture_code(ARCH)
+    for name, summary in record['summaries'].items():
+        assert tuple(set(part) for part in summary) == analyzer.get_snippet_summary(name)
+
+def test_store_roundtrip_and_warm(db):
+    store = ArtifactStore(db)
+    assert store.get(ARCH) is None
+    store.put_many([compute_artifacts(ARCH)])
+    assert store.has(ARCH)
+
+    codegen_cache.clear()
+    analysis_cache.clear()
+    store.warm(ARCH)
+    pipeline.generate_code(ARCH, 'GRAPH', False)
+    pipeline.analyze_architecture_code(ARCH)
+    assert codegen_cache.stats()['misses'] == 0
+    assert analysis_cache.stats()['misses'] == 0
+
+def test_records_are_per_generator_version(db):
+    store = ArtifactStore(db)
+    store.put_many([compute_artifacts(ARCH)])
+    store.generator_version = 'some other version'
+    assert store.get(ARCH) is None
+    store.prune()
+    assert db.q("SELECT count(*) AS n FROM artifacts")[0]['n'] == 0
+
+def test_edited_specs_miss(db):
+    store = ArtifactStore(db)
+    store.put_many([compute_artifacts(ARCH)])
+    assert store.get({**ARCH, 'graph_spec': 'START(State) => agent\n\nagent => END\n'}) is None
+
+def test_record_written_after_a_miss_is_warmed(db):
+    store = ArtifactStore(db)
+    store.warm(ARCH)
+    store.put_many([compute_artifacts(ARCH)])
+    codegen_cache.clear()
+    store.warm(ARCH)
+    assert codegen_cache.stats()['size'] == 0  # the miss is remembered for a while
+    store.MISS_RETRY = 0.0
+    store.warm(ARCH)
+    store.warm(ARCH)
+    pipeline.generate_code(ARCH, 'GRAPH', False)
+    assert codegen_cache.stats()['misses'] == 0
+
+def test_evicted_entries_are_seeded_again(db):
+    store = ArtifactStore(db)
+    store.put_many([compute_artifacts(ARCH)])
+    store.warm(ARCH)
+    db.execute("DELETE FROM artifacts")  # seeding again needs no table read
+    codegen_cache.clear()
+    analysis_cache.clear()
+    store.warm(ARCH)
+    pipeline.generate_code(ARCH, 'GRAPH', False)
+    pipeline.analyze_architecture_code(ARCH)
+    assert codegen_cache.stats()['misses'] == 0
+    assert analysis_cache.stats()['misses'] == 0
+
+def test_reused_analyzer_only_updates_changed_snippets():
+    analyzer = pipeline.analyze_architecture_code(ARCH)
+    state = analyzer.snippets['state']
+    edited = ARCH['graph_spec'] + "\nextra => END\n"
+    assert pipeline.analyze_architecture_code(ARCH, edited, analyzer) is analyzer
+    assert analyzer.snippets['state'] is state
+    assert analyzer.get_all_summaries() == pipeline.analyze_architecture_code(ARCH, edited).get_all_summaries()
+
+    without_nodes = {**ARCH, 'nodes': None}
+    pipeline.analyze_architecture_code(without_nodes, edited, analyzer)
+    assert 'nodes' not in analyzer.snippets and 'agent' not in analyzer.all_defined
+    assert analyzer.get_all_summaries() == pipeline.analyze_architecture_code(without_nodes, edited).get_all_summaries()
@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+import assets
+from fasthtml.common import to_xml
+from assets import AssetMiddleware, asset_headers, build, load_manifest, minify_css, minify_js
+
+@pytest.fixture
+def dist(tmp_path):
+    (tmp_path / 'cm.min.js').write_text('var CodeMirror={}')
+    (tmp_path / 'script.js').write_text('// setup\nfunction f() {\n    return 1;\n}\n')
+    (tmp_path / 'styles.css').write_text('/* main */\nbody {\n  color: red;\n}\n')
+    bundles = {'app.js': [str(tmp_path / 'cm.min.js'), str(tmp_path / 'script.js')],
+               'app.css': [str(tmp_path / 'styles.css')]}
+    build(str(tmp_path / 'dist'), bundles)
+    return tmp_path / 'dist'
+
+def test_minify():
+    assert minify_css('a > b {\n  color: red;\n}\n/* x */') == 'a>b{color: red}'
+    assert minify_js('// c\n  let x = 1;\n\n  x++;') == 'let x = 1;\nx++;'
+
+def test_minify_css_keeps_strings():
+    css = 'a::before {\n  content: "x  ;  }  /* y */";\n  font-family: \'A  B\' , serif;\n}'
+    assert minify_css(css) == 'a::before{content: "x  ;  }  /* y */";font-family: \'A  B\',serif}'
+
+def test_minify_js_keeps_template_literals():
+    js = ("const re = /[`'\"]/g;  // don't\n"
+          "const html = `\n    <div>\n    // not a comment\n\n    ${items.map(i => `<b>${i}</b>`).join('')}\n  </div>`;\n"
+          "    /* it's\n       here */\n    done();\n")
+    assert minify_js(js) == ("const re = /[`'\"]/g;  // don't\n"
+                             "const html = `\n    <div>\n    // not a comment\n\n"
+                             "    ${items.map(i => `<b>${i}</b>`).join('')}\n  </div>`;\n"
+                             "/* it's\nhere */\ndone();")
+
+def test_build_writes_hashed_and_compressed_files(dist):
+    manifest = load_manifest(str(dist))
+    assert manifest == json.loads((dist / 'manifest.json').read_text())
+    js = dist / manifest['app.js']
+    assert js.name.startswith('app.') and js.suffix == '.js'
+    assert js.read_text() == 'var CodeMirror={};\nfunction f() {\nreturn 1;\n}'
+    assert gzip.decompress((dist / (manifest['app.js'] + '.gz')).read_bytes()) == js.read_bytes()
+
+def test_headers_fall_back_to_cdn_without_build(tmp_path):
+    html = to_xml(tuple(asset_headers(load_manifest(str(tmp_path)))))
+    assert assets.CODEMIRROR_CDN in html and '/static/script.js' in html
+    html = to_xml(tuple(asset_headers({'app.js': 'app.1.js', 'app.css': 'app.2.css'})))
+    assert '/assets/app.1.js' in html and assets.CODEMIRROR_CDN not in html
+
+def get(dist, path, accept_encoding=''):
+    messages = []
+    async def send(message):
+        messages.append(message)
+    async def app(scope, receive, send):
+        raise AssertionError("asset requests never reach the app")
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    asyncio.run(AssetMiddleware(app, str(dist))(scope, None, send))
+    headers = {k.decode(): v.decode() for k, v in messages[0].get('headers', [])}
+    return messages[0]['status'], headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+def test_middleware_serves_precompressed_immutable(dist):
+    name = load_manifest(str(dist))['app.js']
+    status, headers, body = get(dist, f'/assets/{name}', 'gzip, deflate')
+    assert status == 200
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['cache-control'] == assets.CACHE_CONTROL
+    assert 'javascript' in headers['content-type']
+    assert gzip.decompress(body) == (dist / name).read_bytes()
+    status, headers, body = get(dist, f'/assets/{name}')
+    assert 'content-encoding' not in headers and body == (dist / name).read_bytes()
+
+def test_middleware_rejects_unknown_paths(dist):
+    assert get(dist, '/assets/missing.js')[0] == 404
+    assert get(dist, '/assets/../manifest.json')[0] == 404
+
+def test_vendor_checks_pinned_hashes(tmp_path):
+    cdn = tmp_path / 'cdn'
+    for name in assets.CODEMIRROR_FILES:
+        (cdn / name).parent.mkdir(parents=True, exist_ok=True)
+        (cdn / name).write_text(f'/* {name} */')
+    base_url, dest, hashes = cdn.as_uri(), str(tmp_path / 'vendor'), str(tmp_path / 'hashes.json')
+    with pytest.raises(ValueError, match='has no hash'):
+        assets.vendor(dest, base_url, hashes)
+    assert len(assets.vendor(dest, base_url, hashes, pin=True)) == len(assets.CODEMIRROR_FILES)
+    assert json.loads((tmp_path / 'hashes.json').read_text())['codemirror.min.js'].startswith('sha512-')
+    assert assets.vendor(dest, base_url, hashes) == []
+
+    (cdn / 'codemirror.min.js').write_text('alert(1)')
+    (tmp_path / 'vendor' / 'codemirror.min.js').unlink()
+    with pytest.raises(ValueError, match='does not match'):
+        assets.vendor(dest, base_url, hashes)
+    assert not (tmp_path / 'vendor' / 'codemirror.min.js').exists()
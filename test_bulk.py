@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+from bulk import BulkGenerator, generate_record, ndjson_lines, spool
+
+SPEC = "START(AgentState) => agent\n\nagent\n  should_continue => tools\n  => END\n\ntools => agent\n"
+
+@pytest.fixture
+def generator():
+    generator = BulkGenerator(max_workers=2, max_in_flight=2)
+    yield generator
+    generator.shutdown()
+
+def test_generate_record():
+    record = generate_record(3, json.dumps({'id': 'a', 'name': 'My Agent', 'graph_spec': SPEC}), {'Optional': 'typing'})
+    assert (record['index'], record['id'], record['name']) == (3, 'a', 'my_agent')
+    assert set(record['code']) == {'graph', 'state', 'nodes', 'conditions'}
+    assert 'from typing import Optional' in record['imports']['nodes']
+    assert 'should_continue' in record['analysis']['conditions']['defined']
+
+def test_bad_lines_become_error_records():
+    assert generate_record(0, 'not json', {})['error'].startswith('JSONDecodeError')
+    assert generate_record(1, '{"name": "x"}', {})['error'] == "KeyError: 'graph_spec'"
+    assert generate_record(2, b'{"name": "caf\xe9"}\n', {})['error'].startswith('UnicodeDecodeError')
+
+def test_spooled_lines_skip_blanks():
+    async def chunks():
+        for chunk in (b'{"a": 1}\n\n{"b"', b': 2}\n', b'  \n{"c": 3}'):
+            yield chunk
+    body = asyncio.run(spool(chunks(), max_size=4))
+    assert list(ndjson_lines(body)) == [b'{"a": 1}\n', b'{"b": 2}\n', b'{"c": 3}']
+    assert body.closed
+
+def test_stream_yields_one_record_per_spec(generator):
+    lines = [json.dumps({'id': i, 'name': f'graph {i}', 'graph_spec': SPEC}) for i in range(7)] + ['oops', b'\xff\n']
+
+    async def collect():
+        return [json.loads(line) async for line in generator.stream(iter(lines), {})]
+
+    records = asyncio.run(collect())
+    assert sorted(record['index'] for record in records) == list(range(9))
+    assert sum('error' in record for record in records) == 2
+    assert {record['id'] for record in records if 'id' in record} == set(range(7))
+
+def test_workers_are_spawned(generator):
+    assert generator.executor._mp_context.get_start_method() == 'spawn'
@@ -0,0 +1,157 @@
+import pytest
+from fastlite import database
+from catalog import Catalog, filename_to_url, get_grouped_architectures
+
+@pytest.fixture
+def db(tmp_path):
+    db = database(tmp_path / 'catalog.db')
+    db.t.arch.create(id=int, name=str, graph_spec=str, category=str, pk='id')
+    db.t.imports.create(id=int, what=str, frm=str, pk='id')
+    db.t.arch.insert(dict(id=1, name='React Agent', graph_spec='START(State) => a', category='Examples'))
+    db.t.arch.insert(dict(id=2, name='Branching', graph_spec='START(State) => b', category='1_How To'))
+    db.t.arch.insert(dict(id=3, name='Agent (Supervisor)', graph_spec='START(State) => c', category='Examples'))
+    db.t.imports.insert(dict(id=1, what='END', frm='langgraph.graph'))
+    return db
+
+def test_filename_to_url():
+    assert filename_to_url('React Agent, Structured Output') == 'react-agent-structured-output'
+    assert filename_to_url('Agent (Supervisor)') == 'agent-supervisor'
+
+def test_architectures_sorted_by_name(db):
+    catalog = Catalog(db)
+    assert list(catalog.architectures) == [3, 2, 1]
+    assert catalog.first_id == 3
+
+def test_slug_and_name_lookup(db):
+    catalog = Catalog(db)
+    assert catalog.by_slug('react-agent')['id'] == 1
+    assert catalog.by_slug('agent-supervisor')['id'] == 3
+    assert catalog.by_slug('missing') is None
+    assert catalog.by_name('Branching')['id'] == 2
+    assert catalog.slugs[2] == 'branching'
+
+def test_numbered_categories_sort_first(db):
+    catalog = Catalog(db)
+    assert list(catalog.grouped) == ['How To', 'Examples']
+    assert [a['id'] for a in catalog.grouped['Examples']] == [3, 1]
+
+def test_reload_rebuilds_indexes(db):
+    catalog = Catalog(db)
+    version = catalog.version
+    db.t.arch.update(dict(id=1, name='Tool Agent'))
+    catalog.load()
+    assert catalog.version > version
+    assert catalog.by_slug('react-agent') is None
+    assert catalog.by_slug('tool-agent')['id'] == 1
+    assert catalog.by_name('Tool Agent')['id'] == 1
+
+def test_uncategorized():
+    grouped = get_grouped_architectures({1: {'id': 1, 'name': 'x'}, 2: {'id': 2, 'name': 'y', 'category': 'A'}})
+    assert list(grouped) == ['A', 'Uncategorized']
+
+def test_refresh_applies_only_changed_rows(db):
+    catalog = Catalog(db)
+    untouched = catalog.architectures[2]
+    assert not catalog.refresh()
+
+    db.t.arch.update(dict(id=1, graph_spec='START(State) => z'))
+    db.t.arch.insert(dict(id=4, name='New One', graph_spec='START(State) => n', category='Examples'))
+    db.t.arch.delete(3)
+    version = catalog.version
+    assert catalog.refresh()
+    assert catalog.version == version + 1
+    assert catalog.architectures[1]['graph_spec'] == 'START(State) => z'
+    assert catalog.by_slug('new-one')['id'] == 4
+    assert catalog.get(3) is None
+    assert catalog.architectures[2] is untouched
+    assert [a['id'] for a in catalog.grouped['Examples']] == [4, 1]
+    assert not catalog.refresh()
+
+def test_refresh_reloads_imports(db):
+    catalog = Catalog(db)
+    db.t.imports.insert(dict(id=2, what='StateGraph', frm='langgraph.graph'))
+    assert catalog.refresh()
+    assert catalog.imports['StateGraph'] == 'langgraph.graph'
+    assert catalog.import_resolver.modules['StateGraph'] == 'langgraph.graph'
+
+def test_import_resolver_kept_while_imports_unchanged(db):
+    catalog = Catalog(db)
+    resolver = catalog.import_resolver
+    db.t.arch.update(dict(id=1, name='Renamed'))
+    assert catalog.refresh()
+    assert catalog.import_resolver is resolver
+
+def test_refresh_falls_back_to_full_reload_after_pruning(db):
+    catalog = Catalog(db, keep_changes=0)
+    other = Catalog(db, keep_changes=0)
+    db.t.arch.update(dict(id=1, name='First'))
+    db.t.arch.update(dict(id=2, name='Second'))
+    other.refresh()  # prunes the change log
+    db.t.arch.update(dict(id=3, name='Third'))
+    assert catalog.refresh()
+    assert [a['name'] for a in catalog.architectures.values()] == ['First', 'Second', 'Third']
+
+def test_snapshot_swap_is_atomic(db):
+    catalog = Catalog(db)
+    snapshot = catalog.current
+    db.t.arch.update(dict(id=1, name='Renamed'))
+    catalog.refresh()
+    assert snapshot.ids_by_name['React Agent'] == 1
+    assert catalog.current.ids_by_name['Renamed'] == 1
+
+def test_equivalents_lookup(db):
+    db.t.arch.update(dict(id=2, graph_spec='START(State) => b\nb\n  done => END\n  => b'))
+    catalog = Catalog(db)
+    assert [a['id'] for a in catalog.equivalents('START(S) => x')] == [3, 1]
+    assert [a['id'] for a in catalog.equivalents('START(S) => y\ny\n  finished => END\n  => y')] == [2]
+    assert catalog.equivalents('START(S) => y\ny\n  finished => y\n  => END') == []
+
+def test_refresh_parses_only_changed_graphs(db):
+    catalog = Catalog(db)
+    snapshot = catalog.current
+    db.t.arch.update(dict(id=1, graph_spec='START(State) => a\na => END'))
+    db.t.arch.insert(dict(id=4, name='Another', graph_spec='START(State) => d', category='Examples'))
+    assert catalog.refresh()
+    assert catalog.current.graphs[2] is snapshot.graphs[2]
+    assert catalog.current.graphs[3] is snapshot.graphs[3]
+    assert [a['id'] for a in catalog.equivalents('START(S) => x')] == [3, 4, 2]
+    assert [a['id'] for a in catalog.equivalents('START(S) => x\nx => END')] == [1]
+    # the previous snapshot's index is left as it was
+    assert snapshot.ids_by_fingerprint[snapshot.fingerprints[1]] == [3, 2, 1]
+    db.t.arch.delete(3)
+    assert catalog.refresh()
+    assert [a['id'] for a in catalog.equivalents('START(S) => x')] == [4, 2]
+
+@pytest.fixture
+def text_db(db):
+    db.t.arch.add_column('readme', str)
+    db.t.arch.add_column('tools', str)
+    for arch_id in (1, 2, 3):
+        db.t.arch.update(dict(id=arch_id, readme=f'readme {arch_id} ' + 'x' * 90, tools=f'tools {arch_id}'))
+    return db
+
+def test_text_columns_read_on_demand(text_db):
+    catalog = Catalog(text_db)
+    arch = catalog.get(1)
+    assert set(arch.row) == {'id', 'name', 'category', 'graph_spec'}
+    assert catalog.texts.stats()['size'] == 0
+    assert arch['readme'].startswith('readme 1') and arch.get('tools') == 'tools 1'
+    assert arch.get('missing', '') == ''
+    assert catalog.texts.stats()['misses'] == 1 and catalog.texts.stats()['hits'] == 1
+    assert set(arch) == {'id', 'name', 'category', 'graph_spec', 'readme', 'tools'}
+
+def test_text_cache_bounded_by_size(text_db):
+    catalog = Catalog(text_db, max_text_chars=250)
+    for arch_id in (1, 2, 3):
+        catalog.get(arch_id)['readme']
+    stats = catalog.texts.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 1 and stats['chars'] <= 250
+    catalog.get(1)['readme']
+    assert catalog.texts.stats()['misses'] == 4
+
+def test_refresh_drops_changed_texts(text_db):
+    catalog = Catalog(text_db)
+    assert catalog.get(1)['tools'] == 'tools 1'
+    text_db.t.arch.update(dict(id=1, tools='new tools'))
+    assert catalog.refresh()
+    assert catalog.get(1)['tools'] == 'new tools'
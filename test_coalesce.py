@@ -0,0 +1,35 @@
+import pytest
+from coalesce import RequestCoalescer
+
+@pytest.fixture
+def coalescer():
+    return RequestCoalescer(max_editors=2)
+
+def test_latest_wins(coalescer):
+    assert coalescer.begin('s1', 1)
+    assert coalescer.begin('s1', 3)
+    assert not coalescer.begin('s1', 2)
+    assert coalescer.stats()['coalesced'] == 1
+
+def test_in_flight_request_is_cancelled_by_newer_one(coalescer):
+    assert coalescer.begin('s1', 1)
+    assert coalescer.begin('s1', 2)
+    assert not coalescer.is_current('s1', 1)
+    assert coalescer.is_current('s1', 2)
+    assert coalescer.stats()['cancelled'] == 1
+
+def test_editors_are_independent(coalescer):
+    assert coalescer.begin('s1', 10)
+    assert coalescer.begin('s2', 1)
+    assert coalescer.is_current('s2', 1)
+
+def test_unnumbered_requests_always_run(coalescer):
+    assert coalescer.begin('s1', 5)
+    assert coalescer.begin('s1')
+    assert coalescer.is_current('s1')
+
+def test_editor_table_is_bounded(coalescer):
+    for sid in ['a', 'b', 'c']:
+        coalescer.begin(sid, 1)
+    assert coalescer.stats()['editors'] == 2
+    assert coalescer.begin('a', 0)  # forgotten, so it is treated as new
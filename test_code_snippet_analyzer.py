@@ -5,22 +5,26 @@ from code_utils.code_snippet_analyzer import CodeSnippetAnalyzer
 def analyzer():
     return CodeSnippetAnalyzer()
 
+def symbols(analyzer, code):
+    defined, used, _, _ = analyzer.analyze_code(code)
+    return defined, used
+
 class TestAnalyzeCode:
     def test_simple_assignment(self, analyzer):
         code = "x = 5"
-        assert analyzer.analyze_code(code) == ({'x'}, set())
+        assert symbols(analyzer, code) == ({'x'}, set())
 
     def test_multiple_assignments(self, analyzer):
         code = "x = y = z = 10"
-        assert analyzer.analyze_code(code) == ({'x', 'y', 'z'}, set())
+        assert symbols(analyzer, code) == ({'x', 'y', 'z'}, set())
 
     def test_variable_usage(self, analyzer):
         code = "x = 5\ny = x + 10"
-        assert analyzer.analyze_code(code) == ({'x', 'y'},{'x'})
+        assert symbols(analyzer, code) == ({'x', 'y'},{'x'})
 
     def test_undefined_variable(self, analyzer):
         code = "y = x + 10"
-        assert analyzer.analyze_code(code) == ({'y'}, {'x'})
+        assert analyzer.analyze_code(code) == ({'y'}, {'x'}, {'x'}, [])
 
     def test_function_definition(self, analyzer):
         code = """
@@ -28,7 +32,7 @@ def foo(a, b):
     return a + b
 x = foo(1, 2)
 """
-        assert analyzer.analyze_code(code) == ({'a', 'b', 'foo', 'x'}, {'foo', 'a', 'b'})
+        assert symbols(analyzer, code) == ({'foo', 'x'}, {'foo'})
 
     def test_function_with_undefined_variable(self, analyzer):
         code = """
@@ -36,7 +40,7 @@ def foo(a):
     return a + b
 x = foo(1)
 """
-        assert analyzer.analyze_code(code) == ({'a', 'foo', 'x'}, {'foo', 'a', 'b'})
+        assert symbols(analyzer, code) == ({'foo', 'x'}, {'foo', 'b'})
 
     def test_complex_scenario(self, analyzer):
         code = """
@@ -46,11 +50,15 @@ def foo(a):
     return y + z
 result = foo(5)
 """
-        assert analyzer.analyze_code(code) == ({'a', 'foo', 'result', 'x', 'y'}, {'y', 'z', 'x', 'a', 'foo'})
+        assert symbols(analyzer, code) == ({'foo', 'result', 'x'}, {'z', 'x', 'foo'})
 
     def test_import_statement(self, analyzer):
         code = "import math\nx = math.pi"
-        assert analyzer.analyze_code(code) == ({'math', 'x'}, {'math'})
+        assert symbols(analyzer, code) == ({'math', 'x'}, {'math'})
+
+    def test_import_forms(self, analyzer):
+        code = "import os.path\nimport numpy as np\nfrom typing import TypedDict as TD"
+        assert symbols(analyzer, code) == ({'os', 'np', 'TD'}, set())
 
     def test_class_definition(self, analyzer):
         code = """
@@ -63,15 +71,59 @@ class MyClass:
 
 obj = MyClass(10)
 """
-        assert analyzer.analyze_code(code) == ({'MyClass', '__init__', 'method', 'obj', 'self', 'x'}, {'x', 'self', 'MyClass', 'y'})
+        assert symbols(analyzer, code) == ({'MyClass', 'obj'}, {'MyClass', 'y'})
+
+    def test_class_body_is_not_visible_from_methods(self, analyzer):
+        code = """
+class C(Base):
+    size = 1
+    def method(self):
+        return size
+"""
+        assert symbols(analyzer, code) == ({'C'}, {'Base', 'size'})
 
     def test_list_comprehension(self, analyzer):
         code = "[x for x in range(10) if x > y]"
-        assert analyzer.analyze_code(code) == ({'x'}, {'x', 'range', 'y'})
+        assert symbols(analyzer, code) == (set(), {'range', 'y'})
+
+    def test_walrus_binds_outside_comprehension(self, analyzer):
+        code = "[last := v for v in data]"
+        assert symbols(analyzer, code) == ({'last'}, {'data'})
+
+    def test_lambda_and_closure(self, analyzer):
+        code = """
+def outer():
+    k = 1
+    def inner():
+        nonlocal k
+        return k + m
+    return inner, lambda v, d=default: v.get(d)
+"""
+        assert symbols(analyzer, code) == ({'outer'}, {'m', 'default'})
+
+    def test_global_declaration_defines_module_name(self, analyzer):
+        code = "def f():\n    global G\n    G = 1"
+        assert symbols(analyzer, code) == ({'f', 'G'}, set())
+
+    def test_async_code_and_string_literals(self, analyzer):
+        code = """
+label = "async mode"
+async def node(state):
+    async with lock:
+        return await call(state, label)
+"""
+        assert analyzer.analyze_code(code) == ({'label', 'node'}, {'lock', 'call', 'label'}, {'lock', 'call'}, [])
+
+    def test_known_imports_are_not_undefined(self, analyzer):
+        code = "class State(TypedDict):\n    messages: Annotated[list, add_messages]"
+        defined, used, undefined, imports = analyzer.analyze_code(code)
+        assert undefined == set()
+        assert sorted(imports) == ['from langgraph.graph.message import add_messages', 'from typing import Annotated',
+                                   'from typing import TypedDict']
 
     def test_invalid_syntax(self, analyzer):
         code = "x = "
-        assert analyzer.analyze_code(code) == (set(), set())
+        assert analyzer.analyze_code(code) == (set(), set(), set(), [])
 
 big_snippet = '''
 def thing():
@@ -85,8 +137,7 @@ thing()
 
 class TestSnippetManagement:
     def test_exception_handling(self, analyzer):
-        result = analyzer.analyze_code(big_snippet)
-        assert result == ({'thing', 'e'}, {'print', 'thing', 'e', 'fnit'})
+        assert symbols(analyzer, big_snippet) == ({'thing'}, {'print', 'thing', 'Exception', 'fnit'})
 
     def test_add_snippet(self, analyzer):
         analyzer.add_snippet('snippet1', 'x = 5')
@@ -117,6 +168,51 @@ class TestSnippetManagement:
     def test_nonexistent_snippet(self, analyzer):
         assert analyzer.get_snippet_summary('nonexistent') is None
 
+    def test_replace_snippet_updates_all_defined(self, analyzer):
+        analyzer.add_snippet('snippet1', 'x = 5\ny = x + z')
+        analyzer.add_snippet('snippet2', 'z = 10\nprint(x)')
+        analyzer.analyze_all_snippets()
+        analyzer.add_snippet('snippet2', 'w = 10\nprint(x)')
+        analyzer.analyze_all_snippets()
+
+        assert 'z' not in analyzer.all_defined
+        assert analyzer.get_snippet_summary('snippet1') == ({'x', 'y'}, {'z'}, set())
+        assert analyzer.get_snippet_summary('snippet2') == ({'w'}, set(), {'x', 'print'})
+
+    def test_replace_snippet_keeping_a_definition(self, analyzer, monkeypatch):
+        analyzer.add_snippet('snippet1', 'x = 1')
+        analyzer.add_snippet('snippet2', 'print(x)')
+        analyzer.add_snippet('snippet1', 'x = 2\ny = x')
+        analyzer.analyze_all_snippets()
+        assert analyzer.defined_counts['x'] == 1
+        assert analyzer.get_snippet_summary('snippet2') == (set(), set(), {'x', 'print'})
+
+        def fail(code):
+            raise RuntimeError("analysis failed")
+        monkeypatch.setattr(analyzer, 'analyze_code_cached', fail)
+        with pytest.raises(RuntimeError):
+            analyzer.add_snippet('snippet1', 'x = 3')
+        assert {'x', 'y'} <= analyzer.all_defined
+
+    def test_shared_definitions_are_reference_counted(self, analyzer):
+        analyzer.add_snippet('snippet1', 'x = 1')
+        analyzer.add_snippet('snippet2', 'x = 2')
+        analyzer.add_snippet('snippet3', 'print(x)')
+        analyzer.remove_snippet('snippet1')
+        analyzer.analyze_all_snippets()
+        assert analyzer.get_snippet_summary('snippet3') == (set(), set(), {'x', 'print'})
+
+        analyzer.remove_snippet('snippet2')
+        analyzer.analyze_all_snippets()
+        assert analyzer.get_snippet_summary('snippet3') == (set(), {'x'}, {'print'})
+
+    def test_identical_snippets_are_parsed_once(self, analyzer, monkeypatch):
+        code = 'unique_cached_name = 1'
+        analyzer.add_snippet('snippet1', code)
+        monkeypatch.setattr(analyzer, 'analyze_code', lambda code: pytest.fail("re-parsed"))
+        analyzer.add_snippet('snippet2', code)
+        assert analyzer.snippets['snippet2']['defined'] == {'unique_cached_name'}
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+from code_utils.codegen_cache import CodegenCache
+
+@pytest.fixture
+def cache():
+    return CodegenCache(maxsize=2)
+
+def test_hit_and_miss(cache):
+    calls = []
+    def fn(x):
+        calls.append(x)
+        return x * 2
+    key = cache.make_key('gen', 'name', 'spec')
+    assert cache.get_or_compute(key, fn, 21) == 42
+    assert cache.get_or_compute(key, fn, 21) == 42
+    assert calls == [21]
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_key_depends_on_all_parts(cache):
+    keys = {cache.make_key('gen_graph', 'a', 'spec'),
+            cache.make_key('gen_state', 'a', 'spec'),
+            cache.make_key('gen_graph', 'b', 'spec'),
+            cache.make_key('gen_graph', 'a', 'spec2'),
+            cache.make_key('gen_graph', 'as', 'pec')}
+    assert len(keys) == 5
+
+def test_lru_eviction(cache):
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 1)  # 'a' is now most recently used
+    cache.get_or_compute('c', lambda: 3)
+    assert cache.stats()['evictions'] == 1
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+
+def test_errors_are_not_cached(cache):
+    def boom():
+        raise ValueError("bad spec")
+    with pytest.raises(ValueError):
+        cache.get_or_compute('k', boom)
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+
+def test_single_flight(cache):
+    calls = []
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'code'
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ['code'] * 8
+    assert len(calls) == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hits'] == 7
+
+def test_cached_gen_graph_matches_generator():
+    from langgraph_codegen import gen_graph as raw_gen_graph
+    from code_utils.codegen_cache import gen_graph
+    spec = "START(State) => a\n\na => END\n"
+    assert gen_graph('g', spec) == raw_gen_graph('g', spec)
+    assert gen_graph('g', spec) is gen_graph('g', spec)
+
+def test_waiter_gives_up_on_a_stuck_computation():
+    cache = CodegenCache(maxsize=2, wait_timeout=0.05)
+    computing, release = threading.Event(), threading.Event()
+    def stuck():
+        computing.set()
+        release.wait()
+        return 'late'
+    leader = threading.Thread(target=lambda: cache.get_or_compute('k', stuck))
+    leader.start()
+    try:
+        computing.wait()
+        assert cache.get_or_compute('k', lambda: 'own') == 'own'
+        assert cache.stats()['wait_timeouts'] == 1
+    finally:
+        release.set()
+        leader.join()
+    assert cache.get_or_compute('k', lambda: 'other') == 'late'
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+from fastlite import database
+from drafts import DraftStore
+
+@pytest.fixture
+def db(tmp_path):
+    return database(tmp_path / 'drafts.db')
+
+@pytest.fixture
+def store(db):
+    return DraftStore(db, max_entries=2, batch_size=3, flush_interval=60)
+
+def stored_rows(db):
+    return {(r['sid'], r['arch_id']): r['graph_spec'] for r in db.q("SELECT * FROM drafts")}
+
+def test_get_falls_back_to_default(store):
+    assert store.get('s1', 1) is None
+    assert store.get('s1', 1, 'catalog spec') == 'catalog spec'
+
+def test_sessions_are_isolated(store):
+    store.put('s1', 1, 'draft one')
+    store.put('s2', 1, 'draft two')
+    assert store.get('s1', 1) == 'draft one'
+    assert store.get('s2', 1) == 'draft two'
+    assert store.get('s3', 1, 'catalog') == 'catalog'
+
+def test_writes_are_batched(store, db):
+    store.put('s1', 1, 'a')
+    store.put('s1', 1, 'ab')
+    assert stored_rows(db) == {}
+    store.put('s1', 2, 'x')
+    store.put('s1', 3, 'y')  # third pending key triggers the flush
+    assert stored_rows(db) == {('s1', 1): 'ab', ('s1', 2): 'x', ('s1', 3): 'y'}
+
+def test_memory_is_bounded_but_drafts_survive(store, db):
+    for arch_id in range(5):
+        store.put('s1', arch_id, f'spec {arch_id}')
+    store.flush()
+    store.put('s1', 99, 'newest')
+    assert len(store) <= 2
+    assert store.get('s1', 0) == 'spec 0'
+
+def test_drafts_shared_between_stores_after_flush(db):
+    worker_a = DraftStore(db, flush_interval=60)
+    worker_b = DraftStore(db, flush_interval=60)
+    worker_a.put('s1', 1, 'edited')
+    assert worker_b.get('s1', 1) is None
+    worker_a.flush()
+    assert worker_b.get('s1', 1) == 'edited'
+
+def test_ttl_eviction(db):
+    store = DraftStore(db, ttl=0.05, flush_interval=60)
+    store.put('s1', 1, 'old')
+    store.flush()
+    time.sleep(0.1)
+    assert store.get('s1', 1, 'catalog') == 'catalog'
+    store.purge_expired()
+    assert stored_rows(db) == {}
+
+def test_discard(store, db):
+    store.put('s1', 1, 'draft')
+    store.flush()
+    store.discard('s1', 1)
+    assert store.get('s1', 1) is None
+    assert stored_rows(db) == {}
+
+def test_background_flusher(db):
+    store = DraftStore(db, flush_interval=0.01)
+    store.start()
+    store.put('s1', 1, 'draft')
+    time.sleep(0.1)
+    assert stored_rows(db) == {('s1', 1): 'draft'}
+    store.stop()
+
+def test_flushed_change_from_another_worker_is_seen(db):
+    worker_a = DraftStore(db, flush_interval=60)
+    worker_b = DraftStore(db, flush_interval=60)
+    worker_a.put('s1', 1, 'v1')
+    worker_a.flush()
+    assert worker_b.get('s1', 1) == 'v1'
+    assert worker_b.get('s1', 1) == 'v1' and worker_b.hits == 1
+    time.sleep(0.01)
+    worker_a.put('s1', 1, 'v2')
+    worker_a.flush()
+    assert worker_b.get('s1', 1) == 'v2'
+    worker_a.discard('s1', 1)
+    assert worker_b.get('s1', 1, 'catalog') == 'catalog'
+
+def test_unflushed_draft_served_from_memory(db):
+    store = DraftStore(db, flush_interval=60)
+    store.put('s1', 1, 'local')
+    assert store.get('s1', 1) == 'local'
+    assert stored_rows(db) == {}
+
+class SlowWrites:
+    """The store's database, with flush() held before its write until `release` is set."""
+    def __init__(self, db):
+        self.db, self.writing, self.release = db, threading.Event(), threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    @property
+    def conn(self):
+        return self
+
+    def __enter__(self):
+        return self.db.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.db.conn.__exit__(*exc)
+
+    def executemany(self, *args):
+        self.writing.set()
+        self.release.wait()
+        return self.db.conn.executemany(*args)
+
+def test_draft_is_served_while_it_is_flushed(db):
+    store = DraftStore(db, flush_interval=60)
+    store.put('s1', 1, 'v1')
+    store.db = slow = SlowWrites(db)
+    flusher = threading.Thread(target=store.flush, daemon=True)
+    flusher.start()
+    slow.writing.wait()
+    assert store.get('s1', 1, 'catalog') == 'v1'
+    store.put('s1', 1, 'v2')
+    slow.release.set()
+    flusher.join()
+    assert store.get('s1', 1) == 'v2' and store.flush() == 1
+    assert stored_rows(db) == {('s1', 1): 'v2'}
+
+def test_discard_waits_for_a_flush_in_progress(db):
+    store = DraftStore(db, flush_interval=60)
+    store.put('s1', 1, 'draft')
+    store.db = slow = SlowWrites(db)
+    flusher = threading.Thread(target=store.flush, daemon=True)
+    flusher.start()
+    slow.writing.wait()
+    discarder = threading.Thread(target=store.discard, args=('s1', 1), daemon=True)
+    discarder.start()
+    time.sleep(0.05)
+    slow.release.set()
+    flusher.join()
+    discarder.join()
+    assert store.get('s1', 1, 'catalog') == 'catalog'
+    assert stored_rows(db) == {}
@@ -0,0 +1,70 @@
+import sys
+
+import pytest
+import generate
+
+SPEC = "START(AgentState) => agent\n\nagent\n  should_continue => tools\n  => END\n\ntools => agent\n"
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['generate.py', *map(str, args)])
+    return generate.main()
+
+@pytest.fixture
+def specs(tmp_path):
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'agent.dsl').write_text(SPEC)
+    (tmp_path / 'nested' / 'loop.dsl').write_text("START(State) => a\n\na => b\n\nb => END\n")
+    return tmp_path
+
+def test_modules_written_next_to_specs(specs, monkeypatch, capsys):
+    assert run(monkeypatch, specs, '--cache', specs / 'cache', '--db', '', '--workers', '1') == 0
+    module = (specs / 'agent.py').read_text()
+    assert module.startswith("# GENERATED from agent.dsl")
+    assert "agent_graph = agent_graph.compile()" in module and "agent_graph.add_node('agent', agent)" in module
+    assert "class AgentState(TypedDict)" in module and "def agent(state: AgentState," in module
+    compile(module, 'agent.py', 'exec')
+    assert (specs / 'nested' / 'loop.py').exists()
+    assert 'generated 2, cached 0, failed 0, wrote 2' in capsys.readouterr().out
+
+def test_graph_name_avoids_names_in_the_spec():
+    assert generate.graph_name('agent', SPEC) == 'agent_graph'
+    assert generate.graph_name('my-loop', "START(State) => my_loop_graph\n") == 'my_loop_graph_'
+    assert generate.graph_name('2nd', "START(State) => a\n") == '_2nd_graph'
+
+def test_state_class_is_defined_for_the_graph():
+    generate.init_worker({})
+    record = generate.pipeline.generate_spec({'name': 'loop_graph', 'graph_spec': "START(S) => a\n\na => END\n"},
+                                             generate._resolver)
+    # as if gen_state had written nothing
+    record['code']['state'] = ''
+    del record['analysis']['state']
+    module = generate.render_module(record, 'loop.dsl')
+    assert "class S(TypedDict)" in module and "loop_graph = StateGraph(S)" in module
+    assert "def a(state: S," in module and "# still undefined: Optional, RunnableConfig\n" in module
+
+def test_only_changed_specs_are_regenerated(specs, monkeypatch, capsys):
+    run(monkeypatch, specs, '--cache', specs / 'cache', '--db', '', '--workers', '1')
+    (specs / 'nested' / 'loop.dsl').write_text("START(State) => a\n\na => END\n")
+    (specs / 'agent.py').unlink()
+    capsys.readouterr()
+    run(monkeypatch, specs, '--cache', specs / 'cache', '--db', '', '--workers', '1')
+    assert 'generated 1, cached 1, failed 0, wrote 2' in capsys.readouterr().out
+    assert "add_node('b'" not in (specs / 'nested' / 'loop.py').read_text()
+
+def test_failed_spec_sets_exit_code(tmp_path, monkeypatch):
+    (tmp_path / 'bad.dsl').write_text("garbage => \n")
+    assert run(monkeypatch, tmp_path / 'bad.dsl', '--cache', tmp_path / 'cache', '--db', '') == 1
+    assert not (tmp_path / 'bad.py').exists()
+
+def test_fan_in_nodes_get_a_function_each(tmp_path, monkeypatch):
+    (tmp_path / 'branching.dsl').write_text("START(State) => a\n\na => b, c\n\nb, c => d\n\nd => END\n")
+    assert run(monkeypatch, tmp_path, '--cache', tmp_path / 'cache', '--db', '', '--workers', '1') == 0
+    module = (tmp_path / 'branching.py').read_text()
+    assert "def b(state: State," in module and "def c(state: State," in module
+    compile(module, 'branching.py', 'exec')
+
+def test_module_that_does_not_compile_fails(specs, monkeypatch, capsys):
+    monkeypatch.setattr(generate, 'render_module', lambda record, source: "def b, c(state):\n    pass\n")
+    assert run(monkeypatch, specs, '--cache', specs / 'cache', '--db', '', '--workers', '1') == 1
+    assert not (specs / 'agent.py').exists()
+    assert 'generated 0, cached 0, failed 2, wrote 0' in capsys.readouterr().out
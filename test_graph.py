@@ -1,5 +1,5 @@
 import pytest
-from gen_graph_x import gen_graph_x, Graph
+from gen_graph_x import gen_graph_x, Graph, parse_graph_spec
 
 def test_graph_equivalence():
     # Test case 1: Simple equivalent graphs
@@ -138,3 +138,54 @@ Node2
     assert graph1_object.is_structurally_equivalent(graph2_object)
     assert not graph1_object.is_structurally_equivalent(graph3_object)
 
+
+
+def test_parse_fan_out_fan_in_and_comments():
+    graph_spec = """
+# branching graph
+START(State) => a
+
+a => b, c   # fan-out
+b, c => d
+- ignored line
+d
+  is_done => END
+  => a
+    """
+    _, graph = gen_graph_x("branching", graph_spec)
+    assert graph.state == "State"
+    assert graph.start_node == "a"
+    assert graph.end_node == "END"
+    assert graph.edges["a"] == [("b", "true"), ("c", "true")]
+    assert graph.edges["b"] == [("d", "true")]
+    assert graph.edges["c"] == [("d", "true")]
+    assert graph.edges["d"] == [("END", "is_done"), ("a", "true")]
+    assert "START" not in graph.nodes
+
+
+def test_csr_matches_edges():
+    graph = Graph()
+    graph.add_edge("A", "B")
+    graph.add_edge("B", "C", "cond")
+    graph.add_edge("A", "C")
+    offsets, neighbours, conditions = graph.csr()
+    a, b, c = (graph.ids[name] for name in "ABC")
+    assert list(neighbours[offsets[a]:offsets[a + 1]]) == [b, c]
+    assert [graph.conditions[cond] for cond in conditions[offsets[b]:offsets[b + 1]]] == ["cond"]
+    offsets, neighbours, _ = graph.csr(reverse=True)
+    assert sorted(neighbours[offsets[c]:offsets[c + 1]]) == [a, b]
+
+
+def test_edge_without_source_is_an_error():
+    with pytest.raises(ValueError, match="line 2"):
+        parse_graph_spec("\n  cond => A\n")
+
+
+def test_fingerprint_ignores_names_but_not_edge_kinds():
+    base = "START(State) => a\n\na\n  go => b\n  => END\n\nb => a\n"
+    renamed = "START(Other) => x\n\nx\n  proceed => y\n  => END\n\ny => x\n"
+    swapped = "START(State) => a\n\na\n  go => END\n  => b\n\nb => a\n"
+    graphs = [parse_graph_spec(spec) for spec in (base, renamed, swapped)]
+    assert graphs[0].fingerprint() == graphs[1].fingerprint()
+    assert graphs[0].fingerprint() != graphs[2].fingerprint()
+    assert not graphs[0].is_structurally_equivalent(graphs[2])
@@ -0,0 +1,33 @@
+from code_utils.imports import ImportResolver
+from code_utils.pipeline import add_imports
+
+TABLE = {'Annotated': 'typing', 'Sequence': 'typing', 'BaseMessage': 'langchain_core.messages', 'operator': ''}
+
+def test_from_imports_grouped_per_module():
+    block, known = ImportResolver(TABLE).resolve({'Sequence', 'Annotated', 'BaseMessage', 'operator'})
+    assert block == ("import operator\n\n"
+                     "from langchain_core.messages import BaseMessage\n"
+                     "from typing import Annotated, Sequence")
+    assert known == {'Sequence', 'Annotated', 'BaseMessage', 'operator'}
+
+def test_builtin_imports_merged_with_table():
+    resolver = ImportResolver({'TypedDict': 'typing_extensions'})
+    assert resolver.modules['END'] == 'langgraph.graph'
+    assert resolver.modules['TypedDict'] == 'typing_extensions'
+
+def test_unknown_symbols_stay_undefined():
+    block, known = ImportResolver(TABLE).resolve({'mystery', 'Sequence'})
+    assert block.splitlines()[0] == "import mystery"
+    assert known == {'Sequence'}
+
+def test_import_block_memoized_per_symbol_set():
+    resolver = ImportResolver(TABLE)
+    first = resolver.resolve(['Annotated', 'Sequence'])
+    assert resolver.resolve({'Sequence', 'Annotated'}) is first
+    assert (resolver.stats()['hits'], resolver.stats()['misses']) == (1, 1)
+
+def test_add_imports_updates_summary():
+    code, (defined, undefined, elsewhere) = add_imports("x: Annotated[int, 1]", ({'x'}, {'Annotated', 'y'}, set()),
+                                                        ImportResolver(TABLE))
+    assert code == "import y\n\nfrom typing import Annotated\n\nx: Annotated[int, 1]"
+    assert undefined == {'y'}
@@ -0,0 +1,60 @@
+import pytest
+import langgraph_codegen
+from incremental import IncrementalSpec, gen_graph_code, split_blocks
+
+SPEC = """# Multiple agents
+START(AgentState) => research_node
+
+research_node
+  should_make_chart => chart_node
+  => END
+
+chart_node, tool_node => research_node
+"""
+
+ODD_SPEC = """START(MessageGraph) => a
+a(Other) => x, y
+  c1 => d, e
+  c2 => END
+- ignored
+q
+  only => z
+
+x,y => END
+"""
+
+def test_split_blocks_keeps_line_numbers():
+    assert [first for first, _ in split_blocks(SPEC)] == [1, 4, 8]
+    assert split_blocks(SPEC)[1][1].startswith("research_node\n")
+
+def test_only_changed_blocks_are_reparsed():
+    editor = IncrementalSpec()
+    editor.update(SPEC)
+    assert editor.reparsed == 3
+    editor.update(SPEC.replace("should_make_chart", "wants_chart"))
+    assert (editor.reparsed, editor.reused) == (4, 2)
+    editor.update("\n\n" + SPEC)  # moved blocks are still reused
+    assert editor.reparsed == 5
+
+def test_line_numbers_are_absolute():
+    parsed = IncrementalSpec().update(SPEC)
+    assert [op[1] for op in parsed.ops()] == [2, 2, 4, 5, 6, 8, 8]
+
+@pytest.mark.parametrize("spec", [SPEC, ODD_SPEC])
+def test_generated_code_matches_gen_graph(spec):
+    editor = IncrementalSpec()
+    assert gen_graph_code("test_graph", editor.update(spec)) == langgraph_codegen.gen_graph("test_graph", spec)
+    edited = spec + "\nextra => END\n"
+    assert gen_graph_code("test_graph", editor.update(edited)) == langgraph_codegen.gen_graph("test_graph", edited)
+
+def test_graph_from_blocks():
+    graph = IncrementalSpec().update(SPEC).to_graph()
+    assert graph.start_node == "research_node"
+    assert graph.edges["tool_node"] == [("research_node", "true")]
+
+def test_spec_without_start_generates_nothing():
+    assert gen_graph_code("test_graph", IncrementalSpec().update("a => b")) == ""
+
+def test_edge_without_source_is_left_out():
+    spec = "  cond => A\n\n" + SPEC
+    assert gen_graph_code("test_graph", IncrementalSpec().update(spec)) == langgraph_codegen.gen_graph("test_graph", SPEC)
@@ -0,0 +1,50 @@
+import json
+
+from fasthtml.common import Div
+from live import LivePanes
+
+def panes(code, messages=()):
+    return {
+        'content': (('NODES', code), lambda: Div(code, cls='tab-content')),
+        'messages': (tuple(messages), lambda: Div(*messages, cls='message-area')),
+    }
+
+def test_first_update_sends_every_pane():
+    live = LivePanes()
+    assert set(live.update(panes('a = 1'))) == {'content', 'messages'}
+    assert live.version == 1
+
+def test_only_changed_panes_are_rendered():
+    live = LivePanes()
+    live.update(panes('a = 1'))
+    rendered = []
+    changed = live.update({
+        'content': (('NODES', 'a = 1'), lambda: rendered.append('content')),
+        'messages': (('Undefined: b',), lambda: Div('Undefined: b', cls='message-area')),
+    })
+    assert rendered == []
+    assert list(changed) == ['messages'] and 'Undefined: b' in changed['messages']
+    assert (live.version, live.pushed, live.skipped) == (2, 3, 1)
+
+def test_unchanged_update_keeps_version():
+    live = LivePanes()
+    live.update(panes('a = 1'))
+    frame = json.loads(live.message(panes('a = 1'), seq=7))
+    assert frame == {'version': 1, 'seq': 7, 'panes': {}}
+
+def test_panes_of_a_skipped_frame_are_sent_again():
+    live = LivePanes()
+    live.update(panes('a = 1'), ack=0)
+    # version 2 goes out but the client drops it, it still shows version 1
+    assert set(live.update(panes('a = 2', ['Undefined: b']), ack=1)) == {'content', 'messages'}
+    changed = live.update(panes('a = 2', ['Undefined: b']), ack=1)
+    assert set(changed) == {'content', 'messages'} and live.version == 3
+    assert live.update(panes('a = 2', ['Undefined: b']), ack=3) == {}
+
+def test_unknown_acknowledgement_resyncs_every_pane():
+    live = LivePanes()
+    for n in range(LivePanes.MAX_VERSIONS + 2):
+        live.update(panes(f'a = {n}'))
+    assert set(live.update(panes('a = 0'), ack=1)) == {'content', 'messages'}
+    assert set(live.update(panes('a = 0'), ack=0)) == {'content', 'messages'}
+    assert live.resyncs == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from metrics import Registry, MetricsMiddleware, request_seconds
+
+@pytest.fixture
+def registry():
+    return Registry(prefix='test')
+
+def test_histogram_buckets_are_cumulative(registry):
+    h = registry.histogram('latency', "Latency", ['route'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        h.observe(value, '/a')
+    text = registry.render()
+    assert 'test_latency_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_bucket{route="/a",le="1.0"} 3' in text
+    assert 'test_latency_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'test_latency_count{route="/a"} 4' in text
+    assert 'test_latency_sum{route="/a"} 6.05' in text
+
+def test_histogram_time(registry):
+    h = registry.histogram('phase', "Phase", ['phase'])
+    with h.time('codegen'):
+        pass
+    assert 'test_phase_count{phase="codegen"} 1' in registry.render()
+
+def test_label_escaping(registry):
+    h = registry.histogram('latency', "Latency", ['route'])
+    h.observe(0.1, 'say "hi"\n')
+    assert 'test_latency_count{route="say \\"hi\\"\\n"} 1' in registry.render()
+
+def test_stats_gauges(registry):
+    registry.stats('cache', "Cache", lambda: {'hits': 3, 'misses': 1, 'name': 'ignored'})
+    text = registry.render()
+    assert 'test_cache_hits 3' in text
+    assert 'test_cache_misses 1' in text
+    assert 'name' not in text
+
+def test_middleware_records_route_template():
+    class Route:
+        path = '/items/{item_id}'
+        def endpoint(self):
+            pass
+
+    async def app(scope, receive, send):
+        scope['endpoint'] = Route().endpoint
+        await send({'type': 'http.response.start', 'status': 201})
+
+    async def send(message):
+        pass
+
+    scope = {'type': 'http', 'method': 'PUT', 'path': '/items/7'}
+    asyncio.run(MetricsMiddleware(app)(scope, None, send))
+    assert 'route="/items/{item_id}",status="201"} 1' in '\n'.join(request_seconds.render())
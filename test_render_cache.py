@@ -0,0 +1,37 @@
+import pytest
+from fasthtml.common import Div
+from render_cache import FragmentCache, etag_matches
+
+@pytest.fixture
+def cache():
+    return FragmentCache(shell='<head></head>')
+
+def test_fragment_rendered_once(cache):
+    calls = []
+    def render():
+        calls.append(1)
+        return Div('hello', id='x')
+    html, etag = cache.get((1, 'arch', 1), render)
+    assert 'hello' in html
+    assert cache.get((1, 'arch', 1), render) == (html, etag)
+    assert len(calls) == 1
+
+def test_etag_is_strong_and_content_based(cache):
+    _, etag1 = cache.get((1,), lambda: Div('a'))
+    _, etag2 = cache.get((2,), lambda: Div('a'))
+    _, etag3 = cache.get((3,), lambda: Div('b'))
+    assert etag1.startswith('"') and etag1.endswith('"')
+    assert etag1 == etag2
+    assert etag1 != etag3
+
+def test_shell_changes_etag():
+    _, etag1 = FragmentCache(shell='v1').get((1,), lambda: Div('a'))
+    _, etag2 = FragmentCache(shell='v2').get((1,), lambda: Div('a'))
+    assert etag1 != etag2
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+from benchmarks.db_copy import temporary_copy
+
+HX = {'HX-Request': 'true'}
+
+@pytest.fixture(scope='module')
+def app():
+    # the app on a copy of the catalog, so requests never write to data/gen_graph.db
+    with temporary_copy(prefix='routes') as db_copy:
+        os.environ['GEN_GRAPH_DB'] = db_copy
+        import main
+        yield main
+
+@pytest.fixture(scope='module')
+def client(app):
+    # one client for the module, leaving it runs the app's shutdown handlers
+    with TestClient(app.app) as client:
+        yield client
+
+def draft_rows(app):
+    app.drafts.flush()
+    return app.db.q("SELECT sid, arch_id, graph_spec FROM drafts")
+
+def test_switching_without_editing_writes_no_draft(app, client):
+    before = len(draft_rows(app))
+    for arch_id in app.catalog.architectures:
+        assert client.get(f"/architecture/{arch_id}", headers=HX).status_code == 200
+    assert len(draft_rows(app)) == before
+
+def test_whitespace_around_the_spec_is_not_an_edit(app, client):
+    arch_id = app.catalog.first_id
+    spec = app.catalog.architectures[arch_id]['graph_spec']
+    before = len(draft_rows(app))
+    response = client.post('/get_code/GRAPH', headers=HX, data={'dsl': f"\n{spec.strip()}\n\n",
+                                                                'architecture_id': str(arch_id)})
+    assert response.status_code == 200
+    assert len(draft_rows(app)) == before
+
+    client.post('/get_code/GRAPH', headers=HX, data={'dsl': spec + "\nextra => END\n", 'architecture_id': str(arch_id)})
+    assert [row['graph_spec'] for row in draft_rows(app) if row['arch_id'] == arch_id][-1].endswith("extra => END\n")
+
+def test_switch_returns_the_spec_as_stored(app, client):
+    # the textarea gets exactly what the full page would render, so the editor's text matches the catalog
+    arch = next(a for a in app.catalog.architectures.values() if a['graph_spec'] != a['graph_spec'].lstrip())
+    response = client.get(f"/architecture/{arch['id']}", headers=HX)
+    assert response.text.startswith(arch['graph_spec'].rstrip('\n').replace('=>', '=&gt;')[:40])
+    assert 'architectureSwitched' in response.headers['hx-trigger-after-settle']
+
+
+def test_live_preview_resends_panes_the_client_did_not_apply(app, client):
+    arch_id = next(iter(app.catalog.architectures))
+    dsl = app.catalog.architectures[arch_id]['graph_spec']
+    edit = {'button_type': 'NODES', 'architecture_id': str(arch_id), 'page': 'live-test'}
+    with client.websocket_connect('/live') as ws:
+        ws.send_json({**edit, 'dsl': dsl, 'seq': 1, 'ack': 0})
+        first = ws.receive_json()
+        ws.send_json({**edit, 'dsl': dsl + "\nextra => END\n", 'seq': 2, 'ack': first['version']})
+        dropped = ws.receive_json()
+        assert dropped['panes']
+        # the client skipped that frame, the same edit acknowledging the first frame gets its panes again
+        ws.send_json({**edit, 'dsl': dsl + "\nextra => END\n", 'seq': 3, 'ack': first['version']})
+        again = ws.receive_json()
+        assert again['panes'].keys() == dropped['panes'].keys() and again['version'] > dropped['version']
+        ws.send_json({**edit, 'dsl': dsl + "\nextra => END\n", 'seq': 4, 'ack': again['version']})
+        assert ws.receive_json()['panes'] == {}
+
+
+@pytest.mark.parametrize("dsl, finding", [
+    ("a => b", "no START"),
+    ("  cond => A", "edge without a source node"),
+])
+@pytest.mark.parametrize("button_type", ['GRAPH', 'STATE'])
+def test_broken_spec_shows_findings_instead_of_failing(app, client, dsl, finding, button_type):
+    arch_id = next(iter(app.catalog.architectures))
+    response = client.post(f"/get_code/{button_type}", headers=HX, data={
+        'dsl': dsl, 'architecture_id': str(arch_id), 'simulation_code': 'on', 'page': 'broken'})
+    assert response.status_code == 200
+    assert finding in response.text
+
+
+def test_refreshes_from_one_editor_share_an_analyzer(app, client):
+    arch_id = next(iter(app.catalog.architectures))
+    dsl = app.catalog.architectures[arch_id]['graph_spec']
+    before = app.editor_analyzers.stats()
+    for n, button_type in enumerate(['STATE', 'NODES', 'GRAPH']):
+        client.post(f"/get_code/{button_type}", headers=HX, data={
+            'dsl': dsl + f"\nextra_{n} => END\n", 'architecture_id': str(arch_id), 'page': 'shared', 'seq': str(n)})
+    after = app.editor_analyzers.stats()
+    assert (after['misses'] - before['misses'], after['hits'] - before['hits']) == (1, 2)
+
+
+def test_refresh_overtaken_in_the_queue_does_no_work(app, monkeypatch):
+    arch_id = next(iter(app.catalog.architectures))
+    app.coalescer.begin('sid:queued', 2)
+    monkeypatch.setattr(app, 'catalog_spec', lambda *args: pytest.fail("started work"))
+    session = {'sid': 'sid'}
+    assert app.code_and_analysis(session, 'sid:queued', '/get_code/{button_type}', 'GRAPH', "START(S) => END\n",
+                                 arch_id, False, 1) is None
+
+
+def test_every_refresh_let_through_is_finished(app, client, monkeypatch):
+    arch_id = next(iter(app.catalog.architectures))
+    async def overloaded(*args):
+        raise app.workpool.Overloaded()
+    monkeypatch.setattr(app.work_pool, 'run', overloaded)
+    before = app.coalescer.stats()
+    response = client.post("/get_code/GRAPH", headers=HX, data={
+        'dsl': "START(S) => END\n", 'architecture_id': str(arch_id), 'page': 'busy', 'seq': '1'})
+    assert response.status_code == 503
+    after = app.coalescer.stats()
+    assert after['completed'] - before['completed'] == after['received'] - before['received'] == 1
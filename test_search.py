@@ -0,0 +1,61 @@
+import pytest
+from fastlite import database
+from search import CatalogSearch, MATCH_START, MATCH_END, match_query
+
+@pytest.fixture
+def db(tmp_path):
+    db = database(tmp_path / 'search.db')
+    db.t.arch.create(id=int, name=str, graph_spec=str, category=str, readme=str, tools=str, pk='id')
+    db.t.arch.insert(dict(id=1, name='React Agent', category='Examples', readme='Uses a tool loop',
+                          graph_spec='START(State) => agent\n\nagent\n  should_call_tool => call_tool\n  => END'))
+    db.t.arch.insert(dict(id=2, name='Tool Calling', category='1_How To', readme='Binding tools',
+                          graph_spec='START(State) => model', tools='def search_web(query): ...'))
+    return db
+
+def ids(results):
+    return [r['id'] for r in results]
+
+def test_match_query_quotes_words():
+    assert match_query('react  "; drop') == '"react"* "drop"*'
+    assert match_query('  ') == ''
+
+def test_existing_rows_indexed(db):
+    results, total = CatalogSearch(db).search('tool')
+    assert total == 2
+    assert ids(results) == [2, 1]  # a name match outranks a README match
+
+def test_prefix_and_node_names(db):
+    search = CatalogSearch(db)
+    assert ids(search.search('rea')[0]) == [1]
+    assert ids(search.search('call_tool')[0]) == [1]
+    assert ids(search.search('search_web')[0]) == [2]
+    assert ids(search.search('agent loop')[0]) == [1]
+    assert search.search('missing') == ([], 0)
+
+def test_snippet_marks_matches(db):
+    [result], _ = CatalogSearch(db).search('binding')
+    assert f'{MATCH_START}Binding{MATCH_END} tools' in result['snippet']
+
+def test_triggers_keep_index_in_sync(db):
+    search = CatalogSearch(db)
+    db.t.arch.insert(dict(id=3, name='Supervisor', category='Examples', graph_spec='START(S) => boss'))
+    db.t.arch.update(dict(id=1, name='Renamed Agent'))
+    db.t.arch.delete(2)
+    assert ids(search.search('supervisor')[0]) == [3]
+    assert ids(search.search('renamed')[0]) == [1]
+    assert search.search('react')[1] == 0
+    assert search.search('calling')[1] == 0
+
+def test_pagination(db):
+    for i in range(3, 28):
+        db.t.arch.insert(dict(id=i, name=f'Agent {i}', graph_spec=''))
+    search = CatalogSearch(db)
+    first, total = search.search('agent', page=1, per_page=10)
+    third, _ = search.search('agent', page=3, per_page=10)
+    assert total == 26 and len(first) == 10 and len(third) == 6
+    assert not set(ids(first)) & set(ids(third))
+
+def test_reopening_keeps_index(db):
+    CatalogSearch(db)
+    db.t.arch.insert(dict(id=3, name='Later', graph_spec=''))
+    assert ids(CatalogSearch(db).search('later')[0]) == [3]
@@ -0,0 +1,91 @@
+import random
+
+from benchmarks.synthetic import make_dsl
+from incremental import IncrementalSpec
+from validation import MAX_PER_KIND, check_ops, check_spec
+
+def messages(spec):
+    return [message for _, message in check_spec(spec)]
+
+def test_valid_graph_has_no_findings():
+    assert check_spec("START(State) => a\n\na\n  done => END\n  => b\n\nb => a\n") == []
+    assert check_spec(make_dsl(500)) == []
+
+def test_unreachable_node_reported_at_its_definition():
+    spec = "START(State) => a\n\na => END\n\n# left over\norphan => a\n"
+    assert check_spec(spec) == [(6, "'orphan' is not reachable from START")]
+
+def test_node_that_never_reaches_end():
+    spec = "START(State) => a\n\na\n  go => b\n  => END\n\nb => c\n"
+    assert check_spec(spec) == [(7, "'b' never reaches END"), (7, "'c' never reaches END")]
+
+def test_missing_start_and_end():
+    assert messages("a => b\n") == ["no START => node line, nothing runs", "no path to END, the graph never finishes"]
+
+def test_cycle_without_conditional_exit():
+    # b fans out to END, but the loop through a keeps running
+    spec = "START(State) => a\n\na => b\n\nb => a, END\n"
+    assert check_spec(spec) == [(3, "cycle a => b => a has no conditional exit")]
+
+def test_conditional_exit_breaks_cycle():
+    assert check_spec("START(State) => a\n\na => b\n\nb\n  again => a\n  => END\n") == []
+
+def test_self_loop():
+    assert messages("START(State) => a\n\na => a\n") == [
+        "no path to END, the graph never finishes", "cycle a => a has no conditional exit"]
+
+def test_duplicate_edges():
+    spec = "START(State) => a\n\na\n  ok => END\n  ok => END\n  other => END\n  => END\n\na => END\n"
+    assert check_spec(spec) == [(5, "duplicate edge a => END on 'ok'"), (9, "duplicate edge a => END")]
+
+def test_conditions_without_default():
+    spec = "START(State) => a\n\na\n  done => END\n  retry => a\n"
+    assert check_spec(spec) == [(3, "'a' has conditions but no default '=> node' branch")]
+
+def test_fan_in_and_fan_out():
+    assert check_spec("START(State) => a\n\na => b, c\n\nb, c => d\n\nd => END\n") == []
+
+def test_findings_per_kind_are_capped():
+    spec = "START(State) => a\n\na => END\n\n" + "".join(f"n{i} => END\n" for i in range(25))
+    found = messages(spec)
+    assert len(found) == MAX_PER_KIND + 1
+    assert found[-1] == f"{25 - MAX_PER_KIND} more nodes are not reachable"
+
+def test_line_numbers_follow_incremental_parse():
+    editor = IncrementalSpec()
+    spec = "START(State) => a\n\na => END\n\nb => END\n"
+    assert check_ops(editor.update(spec).ops()) == [(5, "'b' is not reachable from START")]
+    moved = "# header\n\n" + spec
+    assert check_ops(editor.update(moved).ops()) == [(7, "'b' is not reachable from START")]
+    assert editor.reused >= 3
+
+def test_large_graph():
+    spec = make_dsl(10_000) + "\nisland => END\n"
+    assert check_spec(spec)[-1][1] == "'island' is not reachable from START"
+
+def test_incremental_check_matches_check_spec():
+    rng = random.Random(7)
+    names = [f"n{i}" for i in range(12)] + ['END']
+    def block():
+        a, b, c = rng.sample(names, 3)
+        return rng.choice([f"START(State) => {a}", f"{a} => {b}", f"{a}, {b} => {c}", f"{a} => {b}, {c}",
+                           f"{a}\n  ok => {b}\n  => {c}", f"{a}\n  ok => {b}", f"  => {a}", "# note"])
+    blocks = [block() for _ in range(20)]
+    editor = IncrementalSpec()
+    for _ in range(300):
+        i = rng.randrange(len(blocks))
+        rng.choice([lambda: blocks.__setitem__(i, block()), lambda: blocks.insert(i, block()),
+                    lambda: blocks.insert(i, blocks[i]), lambda: len(blocks) > 1 and blocks.pop(i)])()
+        spec = ('\n' * rng.randrange(1, 3)).join(blocks)
+        assert editor.check(spec) == check_spec(spec)
+    assert editor._graph_check.patched > editor._graph_check.traversed
+
+def test_typing_a_line_patches_the_graph():
+    editor = IncrementalSpec()
+    spec = make_dsl(1000)
+    editor.check(spec)
+    line = "typed => node_5, END"
+    for n in range(1, len(line) + 1):
+        found = editor.check(f"{spec}\n\n{line[:n]}")
+    assert found == [(len(spec.split('\n')) + 2, "'typed' is not reachable from START")]
+    assert editor._graph_check.traversed == 1
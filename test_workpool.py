@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from workpool import Overloaded, TimedOut, WorkPool, checkpoint
+
+@pytest.fixture
+def pool():
+    pool = WorkPool(max_workers=1, max_queue=1, timeout=5.0)
+    yield pool
+    pool.shutdown()
+
+def test_run_returns_result(pool):
+    assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    assert pool.call(pow, 3, 2) == 9
+    assert pool.stats()['submitted'] == 2
+
+def test_full_queue_is_rejected(pool):
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    queued = pool.submit(release.wait)
+    try:
+        with pytest.raises(Overloaded):
+            pool.submit(release.wait)
+    finally:
+        release.set()
+    running.result(1), queued.result(1)
+    assert pool.stats()['rejected'] == 1
+    assert pool.call(pow, 2, 2) == 4  # slots are free again
+
+def test_timeout_keeps_slot_until_task_ends(pool):
+    release = threading.Event()
+    try:
+        with pytest.raises(TimedOut):
+            asyncio.run(pool.run(release.wait, timeout=0.05))
+        queued = pool.submit(release.wait)
+        with pytest.raises(Overloaded):
+            pool.submit(pow, 2, 2)
+        queued.cancel()
+        # a queued task that times out is cancelled and gives its slot back
+        with pytest.raises(TimedOut):
+            pool.call(pow, 2, 2, timeout=0.05)
+        assert pool.stats()['pending'] == 1
+    finally:
+        release.set()
+    assert pool.stats()['timed_out'] == 2
+
+def spin(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        checkpoint()
+
+def nap(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        checkpoint()
+        time.sleep(0.01)
+
+def wait_idle(pool, seconds=2.0):
+    end = time.monotonic() + seconds
+    while pool.stats()['pending'] and time.monotonic() < end:
+        time.sleep(0.01)
+    return pool.stats()['pending'] == 0
+
+def test_task_over_cpu_budget_is_stopped():
+    pool = WorkPool(max_workers=1, max_queue=0, timeout=5.0, cpu_budget=0.05)
+    try:
+        start = time.monotonic()
+        with pytest.raises(TimedOut, match="CPU time"):
+            pool.call(spin, 5)
+        assert time.monotonic() - start < 2
+        assert wait_idle(pool)
+        # sleeping uses no CPU time, the budget leaves it alone
+        assert asyncio.run(pool.run(nap, 0.2)) is None
+        assert pool.stats()['over_budget'] == 1
+    finally:
+        pool.shutdown()
+
+def test_checkpoint_outside_the_pool_does_nothing():
+    checkpoint()
+
+def test_abandoned_task_is_stopped_and_frees_its_slot(pool):
+    with pytest.raises(TimedOut, match="longer than"):
+        asyncio.run(pool.run(nap, 5, timeout=0.05))
+    assert wait_idle(pool)
+    assert pool.stats()['stopped'] == 1
+    assert pool.call(pow, 2, 3) == 8
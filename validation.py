@@ -0,0 +1,563 @@
+import threading
+from operator import itemgetter
+
+from gen_graph_x import END, OP_NODE, START, UNCONDITIONAL, parse_lines
+
+# Structural checks of a DSL graph, run on every edit.  GraphCheck keeps the
+# graph of one editor's spec and patches it with the blocks an edit changed:
+# edges are counted in and out, reachability from START and of END is
+# extended or recomputed only when a changed edge was on it, and Tarjan's
+# strongly connected components (for loops nothing conditional can leave)
+# are searched again only inside the components a removed edge may split.
+
+# per-node findings of one kind beyond this are summarized in a single message
+MAX_PER_KIND = 10
+# more changed edges than this in one update and the traversals start over
+MAX_PATCHED_EDGES = 64
+
+
+def check_spec(graph_spec: str) -> list:
+    return check_ops(parse_lines(graph_spec.splitlines()))
+
+
+def check_ops(ops) -> list:
+    """[(line number, message)] for structural problems of the graph, in line order.
+
+    Reports edges listed twice, conditional blocks without a `=> node`
+    default, nodes START does not lead to, nodes that never get to END, and
+    cycles without a conditional branch out of them.
+    """
+    return GraphCheck().update([(1, list(ops))])
+
+
+def _summarize(blocks: list) -> tuple:
+    """(findings, nodes, edges) of one chunk, lines counted from its first line.
+
+    findings: [(line, message)] that only depend on the chunk's own lines
+    nodes: {name: (first mention, first definition or None, position)}
+    edges: [(source, destination, condition or None, line)], repeats included
+    """
+    findings, nodes, edges = [], {}, []
+    sources = None
+    block = None  # [line, head, has condition, has default]
+    for offset, ops in blocks:
+        for kind, lineno, a, b in ops:
+            lineno += offset
+            if kind == OP_NODE:
+                if block is not None and block[2] and not block[3]:
+                    findings.append((block[0], f"'{block[1]}' has conditions but no default '=> node' branch"))
+                block = [lineno, a, False, False]
+                sources = []
+                for name in a.split(',') if ',' in a else (a,):
+                    name = name.strip()
+                    if name:
+                        entry = nodes.get(name)
+                        if entry is None:
+                            nodes[name] = (lineno, lineno, len(nodes))
+                        elif entry[1] is None:
+                            nodes[name] = (entry[0], lineno, entry[2])
+                        sources.append(name)
+                continue
+            if sources is None:
+                findings.append((lineno, "edge without a source node"))
+                continue
+            conditional = a not in UNCONDITIONAL
+            block[2 if conditional else 3] = True
+            label = a if conditional else None
+            for name in b.split(',') if ',' in b else (b,):
+                name = name.strip()
+                if not name:
+                    continue
+                if name not in nodes:
+                    nodes[name] = (lineno, None, len(nodes))
+                for s in sources:
+                    edges.append((s, name, label, lineno))
+    if block is not None and block[2] and not block[3]:
+        findings.append((block[0], f"'{block[1]}' has conditions but no default '=> node' branch"))
+    return findings, nodes, edges
+
+
+def _chunks(blocks: list, known: dict) -> tuple:
+    """({chunk key: first line}, {chunk key: [first lines]} of repeated chunks, {new chunk key: its blocks}).
+
+    A block whose first line is an edge continues the node of the block before
+    it, so it belongs to that block's chunk; every other chunk is independent
+    of the rest of the spec.  Keys are the ids of the blocks' operation lists,
+    which IncrementalSpec reuses for unchanged text, with their offsets.  Only
+    chunks not in `known` come with their blocks.
+    """
+    lines, opses = list(zip(*[block for block in blocks if block[1]])) or ((), ())
+    heads = list(map(itemgetter(0), map(itemgetter(0), opses)))
+    if heads.count(OP_NODE) == len(heads):
+        # the usual spec, a chunk per block (comments aside), sorted out by builtins rather than a loop in Python
+        keys = list(map(id, opses))
+        firsts = dict(zip(keys, lines))
+        if len(firsts) == len(keys):
+            new = firsts.keys() - known.keys()
+            if not new:
+                return firsts, {}, {}
+            by_key = dict(zip(keys, opses))
+            return firsts, {}, {key: [(0, by_key[key])] for key in new}
+    firsts, repeats, members = {}, {}, {}
+    key = chunk = None
+    for first, ops in blocks:
+        if not ops:
+            continue
+        if ops[0][0] is not OP_NODE and chunk is not None:
+            chunk.append((first - start, ops))
+            continue
+        if chunk is not None:
+            _close(chunk, start, known, firsts, repeats, members)
+        start, chunk = first, [(0, ops)]
+    if chunk is not None:
+        _close(chunk, start, known, firsts, repeats, members)
+    return firsts, repeats, members
+
+
+def _close(chunk: list, start: int, known: dict, firsts: dict, repeats: dict, members: dict):
+    key = id(chunk[0][1]) if len(chunk) == 1 else tuple((offset, id(ops)) for offset, ops in chunk)
+    first = firsts.setdefault(key, start)
+    if first != start:
+        repeats.setdefault(key, [first]).append(start)
+    elif key not in known:
+        members[key] = chunk
+
+
+def _count(repeats: dict, key) -> int:
+    return len(repeats[key]) if key in repeats else 1
+
+
+class GraphCheck:
+    """check_ops findings for one editor's spec, patched edit by edit.
+
+    `update()` takes ParsedSpec blocks and only summarizes chunks (a block and
+    the blocks continuing its last node) that were not in the previous
+    version.  Their edges are counted into the graph or out of it, then:
+
+    - an added edge extends reachability from its end, and merges the
+      components on the cycle it closes, if any
+    - a removed edge inside a component splits it only when its source no
+      longer reaches its destination; only that component is searched again
+    - reachability is computed again when a removed edge was on it
+
+    so a keystroke costs about the size of the edit, plus whatever the graph
+    around it really changed.  Findings are the same as check_ops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._firsts = {}  # chunk key -> first line of its first occurrence
+        self._repeats = {}  # chunk key -> first lines of all its occurrences, for chunks in the spec more than once
+        self._summaries = {}  # chunk key -> (findings, nodes, edges, blocks)
+        self._noisy = set()  # chunk keys with findings of their own
+        self.ids, self.names = {}, []
+        self.where = []  # per node: {chunk key: (mention, definition, position)}
+        self.present = 0
+        self.succ, self.pred = [], []  # per node: {neighbour: distinct edges}
+        self.conditional = []  # per node: distinct conditional edges out
+        self.edges = {}  # (source, destination, condition) -> occurrences
+        self.duplicated = set()
+        self.reached, self.finishes = bytearray(), bytearray()
+        self.comp = []  # per node: component id
+        self.members = {}  # component id -> nodes
+        self._next_comp = 0
+        self.exit = bytearray()  # per node: a conditional edge out of its component
+        self.exits = {}  # cyclic component id -> its nodes with an exit
+        self._start = self._end = None
+        self.traversed = 0  # updates that started the traversals over
+        self.patched = 0
+
+    def update(self, blocks: list) -> list:
+        with self._lock:
+            if len(self.names) > 2 * self.present + 1000:
+                # most ids belong to names that left the spec, intern the rest again
+                self._reset()
+            firsts, repeats, members = _chunks(blocks, self._summaries)
+            full = not self._firsts
+            # what the edges changed, unless the traversals start over anyway:
+            # (source, destination) -> linked before this update, and nodes whose edges out changed
+            self._pairs = None if full else {}
+            self._touched = set()
+            previous, repeated = self._firsts, self._repeats
+            for key in previous.keys() - firsts.keys():
+                self._apply(key, self._summaries.pop(key), _count(repeated, key), 0)
+            for key, chunk in members.items():
+                summary = self._summaries[key] = _summarize(chunk) + (chunk,)
+                self._apply(key, summary, 0, _count(repeats, key))
+            # a chunk in both versions only changes in number when it is repeated in one of them
+            for key in (repeats.keys() | repeated.keys()) & previous.keys() & firsts.keys():
+                before, after = _count(repeated, key), _count(repeats, key)
+                if before != after:
+                    self._apply(key, self._summaries[key], before, after)
+            self._firsts, self._repeats = firsts, repeats
+
+            added, removed = [], []
+            for (s, d), linked in (self._pairs or {}).items():
+                if linked != (d in self.succ[s]):
+                    (removed if linked else added).append((s, d))
+            if full or len(added) + len(removed) > MAX_PATCHED_EDGES:
+                self._traverse()
+                self.traversed += 1
+            else:
+                self._patch(added, removed)
+                self.patched += 1
+            return self._findings()
+
+    def _intern(self, names: list):
+        # ids for names new to the graph, each its own component until something links them
+        first, n = len(self.names), len(names)
+        ids = range(first, first + n)
+        self.ids.update(zip(names, ids))
+        self.names += names
+        self.where += [{} for _ in ids]
+        self.succ += [{} for _ in ids]
+        self.pred += [{} for _ in ids]
+        self.conditional += [0] * n
+        self.reached += bytes(n)
+        self.finishes += bytes(n)
+        self.exit += bytes(n)
+        comps = range(self._next_comp, self._next_comp + n)
+        self.comp += comps
+        self.members.update(zip(comps, ([u] for u in ids)))
+        self._next_comp += n
+
+    def _apply(self, key, summary, before: int, after: int):
+        # the chunk `key` went from `before` to `after` occurrences
+        findings, nodes, edges, _ = summary
+        ids = self.ids
+        if not before:
+            self._intern([name for name in nodes if name not in ids])
+            for name, lines in nodes.items():
+                where = self.where[ids[name]]
+                if not where:
+                    self.present += 1
+                where[key] = lines
+            if findings:
+                self._noisy.add(key)
+        counts, duplicated = self.edges, self.duplicated
+        succ, pred, conditional = self.succ, self.pred, self.conditional
+        pairs, touched = self._pairs, self._touched
+        delta = after - before
+        for s, d, label, _ in edges:
+            s, d = ids[s], ids[d]
+            edge = (s, d, label)
+            count = counts.get(edge, 0)
+            total = count + delta
+            if total > 1:
+                duplicated.add(edge)
+            elif count > 1:
+                duplicated.discard(edge)
+            if total > 0:
+                counts[edge] = total
+                if count:
+                    continue
+                sign = 1
+            else:
+                del counts[edge]
+                sign = -1
+            # the edge appeared or disappeared: link or unlink its nodes
+            n = succ[s].get(d, 0) + sign
+            if n:
+                succ[s][d] = pred[d][s] = n
+            else:
+                del succ[s][d], pred[d][s]
+            if pairs is not None and (n == 0 or n == 1 and sign > 0):
+                pairs.setdefault((s, d), sign < 0)
+                touched.add(s)
+            if label is not None:
+                conditional[s] += sign
+                if pairs is not None:
+                    touched.add(s)
+        if not after:
+            for name in nodes:
+                where = self.where[ids[name]]
+                del where[key]
+                if not where:
+                    self.present -= 1
+            self._noisy.discard(key)
+
+    def _ends(self) -> tuple:
+        start, end = self.ids.get(START), self.ids.get(END)
+        return (start if start is not None and self.where[start] else None,
+                end if end is not None and self.where[end] else None)
+
+    def _traverse(self):
+        # reachability and components of the whole graph
+        n = len(self.names)
+        start, end = self._start, self._end = self._ends()
+        self.reached = _reach(self.succ, start) if start is not None else bytearray(n)
+        self.finishes = _reach(self.pred, end) if end is not None else bytearray(n)
+        self.members, self.exits = {}, {}
+        self.exit = bytearray(n)
+        for cid, component in enumerate(_components(self.succ)):
+            self._component(cid, component)
+        self._next_comp = len(self.members)
+
+    def _patch(self, added: list, removed: list):
+        start, end = self._ends()
+        # reachability from START, and of END backwards
+        self.reached = _repair(self.reached, self.succ, self.pred, start, start != self._start, added, removed)
+        self.finishes = _repair(self.finishes, self.pred, self.succ, end, end != self._end,
+                                [(d, s) for s, d in added], [(d, s) for s, d in removed])
+        self._start, self._end = start, end
+
+        comp, succ, pred = self.comp, self.succ, self.pred
+        changed = set()
+        # a component stays strongly connected while every removed edge's source still reaches its destination
+        split = {comp[s] for s, d in removed if s != d and comp[s] == comp[d] and not _path(succ, s, d, comp)}
+        for cid in split:
+            for component in _components(succ, self.members.pop(cid)):
+                changed.add(self._new_component(component))
+        for s, d in added:
+            if comp[s] != comp[d] and pred[s] and succ[d] and _path(succ, d, s, comp, within=False):
+                forward = _reach(succ, s)
+                backward = _reach(pred, s)
+                merged = [u for u in _set(forward) if backward[u]]
+                for cid in {comp[u] for u in merged}:
+                    self.members.pop(cid, None)
+                changed.add(self._new_component(merged))
+        # nodes whose edges changed may have gained or lost their exit, or a self-loop
+        for u in self._touched:
+            cid = comp[u]
+            if cid in changed:
+                continue
+            component = self.members[cid]
+            if len(component) == 1:
+                self.exits.pop(cid, None)
+                self._component(cid, component)
+                continue
+            was, now = self.exit[u], self._exits(u)
+            if was != now:
+                self.exit[u] = now
+                if now:
+                    self.exits[cid].add(u)
+                else:
+                    self.exits[cid].discard(u)
+        for cid in list(self.exits):
+            if cid not in self.members:
+                del self.exits[cid]
+
+    def _new_component(self, component: list) -> int:
+        cid = self._next_comp
+        self._next_comp += 1
+        self._component(cid, component)
+        return cid
+
+    def _component(self, cid: int, component: list):
+        comp = self.comp
+        for u in component:
+            comp[u] = cid
+        self.members[cid] = component
+        if len(component) > 1 or component[0] in self.succ[component[0]]:
+            exits = set()
+            for u in component:
+                self.exit[u] = self._exits(u)
+                if self.exit[u]:
+                    exits.add(u)
+            self.exits[cid] = exits
+        else:
+            self.exit[component[0]] = 0
+
+    def _exits(self, u: int) -> int:
+        cid = self.comp[u]
+        return int(bool(self.conditional[u]) and any(self.comp[v] != cid for v in self.succ[u]))
+
+    def _line(self, u: int) -> tuple:
+        # (line, where first mentioned): the line is where the node is first defined,
+        # or first mentioned if it never is; the mention orders nodes reported on one line
+        definition = mention = None
+        for key, (first_mention, first_definition, position) in self.where[u].items():
+            first = self._firsts[key] - 1
+            if first_definition is not None and (definition is None or first + first_definition < definition):
+                definition = first + first_definition
+            if mention is None or (first + first_mention, position) < mention:
+                mention = (first + first_mention, position)
+        return (mention[0] if definition is None else definition), mention
+
+    def _occurrences(self, key) -> list:
+        return self._repeats.get(key) or [self._firsts[key]]
+
+    def _findings(self) -> list:
+        findings = []
+        for key in self._noisy:
+            summary = self._summaries[key]
+            for first in self._occurrences(key):
+                findings += [(first + lineno - 1, message) for lineno, message in summary[0]]
+        findings += self._duplicates()
+        findings.sort(key=lambda finding: finding[0])
+        if not self.present:
+            return findings
+
+        names, line = self.names, self._line
+        start, end = self._start, self._end
+        if start is None:
+            findings.append((1, "no START => node line, nothing runs"))
+        if end is None:
+            findings.append((line(start)[0] if start is not None else 1, "no path to END, the graph never finishes"))
+
+        looping = {cid for cid, exits in self.exits.items() if not exits}
+        cycles = []
+        for cid in looping:
+            component = sorted(self.members[cid], key=line)
+            path = ' => '.join(names[u] for u in component[:4]) + (' => ...' if len(component) > 4 else '')
+            cycles.append((line(component[0])[0], f"cycle {path} => {names[component[0]]} has no conditional exit"))
+        cycles.sort()
+
+        where, comp, reached = self.where, self.comp, self.reached
+        unreached = [u for u in _unset(reached) if where[u] and u != start] if start is not None else []
+        stuck = [u for u in _unset(self.finishes) if reached[u] and where[u] and comp[u] not in looping] \
+            if end is not None else []
+        findings += _per_node(unreached, names, line, "is not reachable from START", "more nodes are not reachable")
+        findings += _per_node(stuck, names, line, "never reaches END", "more nodes never reach END")
+        findings += cycles[:MAX_PER_KIND]
+        if len(cycles) > MAX_PER_KIND:
+            findings.append((cycles[MAX_PER_KIND][0], f"{len(cycles) - MAX_PER_KIND} more cycles have no conditional exit"))
+        findings.sort(key=lambda finding: finding[0])
+        return findings
+
+    def _duplicates(self) -> list:
+        # every occurrence of a repeated edge after the first, in the order of the spec
+        findings = []
+        for s, d, label in self.duplicated:
+            source, destination = self.names[s], self.names[d]
+            occurrences = sorted(
+                (first + lineno - 1, index)
+                for key in self.where[s] if destination in self._summaries[key][1]
+                for index, (es, ed, el, lineno) in enumerate(self._summaries[key][2])
+                if es == source and ed == destination and el == label
+                for first in self._occurrences(key))
+            message = f"duplicate edge {source} => {destination}" + (f" on '{label}'" if label else "")
+            findings += [(lineno, index, message) for lineno, index in occurrences[1:]]
+        findings.sort()
+        return [(lineno, message) for lineno, _, message in findings]
+
+
+def _per_node(nodes: list, names: list, line, problem: str, more: str) -> list:
+    ordered = sorted((line(u), u) for u in nodes)
+    findings = [(where[0], f"'{names[u]}' {problem}") for where, u in ordered[:MAX_PER_KIND]]
+    if len(ordered) > MAX_PER_KIND:
+        findings.append((ordered[MAX_PER_KIND][0][0], f"{len(ordered) - MAX_PER_KIND} {more}"))
+    return findings
+
+
+def _unset(flags: bytearray):
+    # indexes of the zero bytes, found in C rather than by a loop over every node
+    i = flags.find(0)
+    while i != -1:
+        yield i
+        i = flags.find(0, i + 1)
+
+
+def _set(flags: bytearray):
+    i = flags.find(1)
+    while i != -1:
+        yield i
+        i = flags.find(1, i + 1)
+
+
+def _reach(adjacency: list, root: int) -> bytearray:
+    seen = bytearray(len(adjacency))
+    _extend(adjacency, seen, [root])
+    return seen
+
+
+def _repair(seen: bytearray, forward: list, backward: list, root: int, moved: bool, added: list,
+            removed: list) -> bytearray:
+    """`seen`, what `root` reaches over `forward` edges, after the edges `added` and `removed`."""
+    if root is None:
+        return bytearray(len(forward))
+    lost = [d for s, d in removed if seen[s] and seen[d]]
+    if moved or any(forward[d] for d in lost):
+        return _reach(forward, root)
+    # an edge removed into a node that leads nowhere only decides whether that node is still reached
+    for d in lost:
+        seen[d] = d == root or any(seen[p] for p in backward[d])
+    _extend(forward, seen, [d for s, d in added if seen[s]])
+    return seen
+
+
+def _extend(adjacency: list, seen: bytearray, roots: list):
+    # marks what the roots lead to, stopping at nodes already marked
+    stack = []
+    for root in roots:
+        if not seen[root]:
+            seen[root] = 1
+            stack.append(root)
+    pop, push = stack.pop, stack.append
+    while stack:
+        for v in adjacency[pop()]:
+            if not seen[v]:
+                seen[v] = 1
+                push(v)
+
+
+def _path(adjacency: list, source: int, target: int, comp: list, within: bool = True) -> bool:
+    """Whether `source` reaches `target`; with `within`, through the source's component only."""
+    cid = comp[source] if within else None
+    seen = {source}
+    stack = [source]
+    while stack:
+        for v in adjacency[stack.pop()]:
+            if v == target:
+                return True
+            if v not in seen and (cid is None or comp[v] == cid):
+                seen.add(v)
+                stack.append(v)
+    return False
+
+
+def _components(adjacency: list, nodes: list = None) -> list:
+    """Strongly connected components, iterative Tarjan in O(nodes + edges).
+
+    With `nodes`, of the subgraph of those nodes only.
+    """
+    n = len(adjacency)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    inside = None
+    if nodes is not None:
+        inside = bytearray(n)
+        for u in nodes:
+            inside[u] = 1
+    stack, components = [], []
+    counter = 0
+    for root in range(n) if nodes is None else nodes:
+        if index[root] != -1:
+            continue
+        work = [(root, iter(adjacency[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            u, successors = work[-1]
+            for v in successors:
+                if inside is not None and not inside[v]:
+                    continue
+                if index[v] == -1:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                    work.append((v, iter(adjacency[v])))
+                    break
+                if on_stack[v] and index[v] < low[u]:
+                    low[u] = index[v]
+            else:
+                work.pop()
+                if work and low[u] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[u]
+                if low[u] == index[u]:
+                    component = []
+                    while True:
+                        v = stack.pop()
+                        on_stack[v] = 0
+                        component.append(v)
+                        if v == u:
+                            break
+                    components.append(component)
+    return components
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class Overloaded(Exception):
+    """Every worker is busy and the queue is full."""
+
+
+class TimedOut(Exception):
+    """A task did not finish within its time budget."""
+
+
+class _Task:
+    __slots__ = ('pool', 'cpu_start', 'abandoned')
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.cpu_start = 0.0
+        self.abandoned = False  # its caller stopped waiting
+
+
+# the task running on each worker thread, for checkpoint()
+_current = threading.local()
+
+
+def checkpoint():
+    """Raise TimedOut in a pool task past its CPU budget or whose caller gave up; elsewhere a no-op.
+
+    Tasks call it between phases, where stopping leaves no lock held and no
+    state half updated.
+    """
+    task = getattr(_current, 'task', None)
+    if task is None:
+        return
+    pool = task.pool
+    if task.abandoned:
+        with pool._lock:
+            pool.stopped += 1
+        raise TimedOut("abandoned by its caller")
+    if pool.cpu_budget is not None and time.thread_time() - task.cpu_start > pool.cpu_budget:
+        with pool._lock:
+            pool.stopped += 1
+            pool.over_budget += 1
+        raise TimedOut(f"used more than {pool.cpu_budget:g}s of CPU time")
+
+
+class WorkPool:
+    """Codegen and analysis off the request threads, with bounded admission.
+
+    At most `max_workers` tasks run and `max_queue` more wait; `submit` raises
+    Overloaded beyond that instead of queueing without limit.  A caller waits
+    `timeout` seconds of wall-clock time, and a task may use `cpu_budget`
+    seconds of CPU time (measured on its own thread, so time spent queued or
+    waiting for the GIL does not count).
+
+    Budgets are enforced cooperatively: a task past its CPU budget, or whose
+    caller has given up, raises TimedOut at its next `checkpoint()`.  Until
+    then, and in any phase that never reaches one, it keeps its slot, so the
+    queue never admits more work than the workers can take on and a burst of
+    pathological input turns into fast rejections rather than an ever-growing
+    backlog.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, timeout: float = 10.0, cpu_budget: float = None,
+                 executor=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.cpu_budget = cpu_budget
+        self.executor = executor or ThreadPoolExecutor(max_workers, thread_name_prefix='codegen')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._tasks = {}  # future -> _Task, until its slot is released
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.over_budget = 0
+        self.stopped = 0
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"{self.max_workers + self.max_queue} tasks already running or queued")
+        task = _Task(self)
+        try:
+            future = self.executor.submit(self._execute, task, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+            self._tasks[future] = task
+        future.add_done_callback(self._release)
+        return future
+
+    @staticmethod
+    def _execute(task: _Task, fn, args):
+        task.cpu_start = time.thread_time()
+        _current.task = task
+        try:
+            return fn(*args)
+        finally:
+            _current.task = None
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            self._tasks.pop(future, None)
+        self._slots.release()
+
+    def _abandon(self, future):
+        if future.cancel():
+            return  # still queued, never ran
+        with self._lock:
+            task = self._tasks.get(future)
+        if task is not None:
+            task.abandoned = True
+
+    def call(self, fn, *args, timeout: float = None):
+        """fn(*args) in the pool, waited for on the calling thread; raises Overloaded or TimedOut."""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self._abandon(future)
+            with self._lock:
+                self.timed_out += 1
+            raise TimedOut(f"took longer than {timeout:g}s") from None
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Await fn(*args) in the pool; raises Overloaded, or TimedOut after `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            with self._lock:
+                self.timed_out += 1
+            raise TimedOut(f"took longer than {timeout:g}s") from None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': self.pending,
+                'capacity': self.max_workers + self.max_queue,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'over_budget': self.over_budget,
+                'stopped': self.stopped,
+            }